@@ -1,110 +1,298 @@
 # Script de benchmarking para medir el rendimiento
+#
+# Ejemplos:
+#   python scripts/benchmark.py --families grid ncd --sizes 1e3 1e5 --output base.json
+#   python scripts/benchmark.py --sizes 1e5 --output nuevo.json --compare base.json
+import argparse
+import json
+import platform
+import subprocess
+import sys
 import time
+import tracemalloc
 import numpy as np
-from amgmc.markov import build_transition_matrix, stationary_distribution_power, build_singular_system
+import scipy
+from scipy.sparse.linalg import LinearOperator
+from amgmc.generators import GENERATORS, make_chain
+from amgmc.kernels import TransposeMatvec
+from amgmc.markov import is_stochastic_irreducible, build_singular_system
 from amgmc.hierarchy import build_amg_hierarchy
-from amgmc.preconditioner import SVDBasedPreconditioner
+from amgmc.preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+from amgmc.iad import stationary_distribution_iad
 from amgmc.solvers import solve_singular_system_lgmres, residual_norm
+from amgmc.reordering import ORDERINGS, Reordering, bandwidth, compute_ordering
 
 
-def benchmark_markov_chain(size=100):
-    """Benchmark de cadena de Markov de tamaño variable."""
-    print(f"\n{'='*60}")
-    print(f"Benchmark: Cadena de Markov {size}x{size}")
-    print(f"{'='*60}")
-    
-    # Generar matriz de transición aleatoria
-    np.random.seed(42)
-    P_dense = np.random.rand(size, size)
-    
-    # Test 1: Construcción de matriz de transición
-    start = time.perf_counter()
-    P = build_transition_matrix(P_dense)
-    t_build = time.perf_counter() - start
-    print(f"Construcción de matriz de transición: {t_build*1000:.2f} ms")
-    
-    # Test 2: Distribución estacionaria (método de potencias)
-    start = time.perf_counter()
-    pi = stationary_distribution_power(P, maxit=1000, tol=1e-10)
-    t_power = time.perf_counter() - start
-    print(f"Distribución estacionaria (power method): {t_power*1000:.2f} ms")
-    print(f"  Sum(pi) = {pi.sum():.10f}")
-    
-    # Test 3: Construcción de sistema singular
-    start = time.perf_counter()
-    A = build_singular_system(P)
-    t_singular = time.perf_counter() - start
-    print(f"Construcción de sistema singular: {t_singular*1000:.2f} ms")
-    
-    # Test 4: Construcción de jerarquía AMG
-    start = time.perf_counter()
-    hierarchy = build_amg_hierarchy(A, max_levels=3)
-    t_hierarchy = time.perf_counter() - start
-    print(f"Construcción de jerarquía AMG: {t_hierarchy*1000:.2f} ms")
-    print(f"  Niveles: {len(hierarchy.levels)}")
-    
-    # Test 5: Construcción de precondicionador SVD
-    start = time.perf_counter()
-    M = SVDBasedPreconditioner(A).as_linear_operator()
-    t_precond = time.perf_counter() - start
-    print(f"Construcción de precondicionador SVD: {t_precond*1000:.2f} ms")
-    
-    # Test 6: Solución del sistema con LGMRES
-    y = np.random.rand(A.shape[0])
-    b = A @ y
-    start = time.perf_counter()
-    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, maxit=5000)
-    t_solve = time.perf_counter() - start
-    res = residual_norm(A, x, b)
-    print(f"Solución con LGMRES: {t_solve*1000:.2f} ms")
-    print(f"  Iteraciones: {info}")
-    print(f"  Residual: {res:.2e}")
-    
-    # Resumen
-    total_time = t_build + t_power + t_singular + t_hierarchy + t_precond + t_solve
-    print(f"\nTiempo total: {total_time*1000:.2f} ms")
-    
+class StageTimer:
+    """
+    Mide tiempo de pared y, con `track_memory`, pico de memoria (tracemalloc)
+    de cada etapa. El trazado de tracemalloc encarece cada reserva, así que
+    los tiempos de un StageTimer que mide memoria no son comparables.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        if self.track_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = None
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.stages[name] = {"time": elapsed, "peak_memory": peak}
+        return result
+
+
+def _matvecs(PT, x, repeats):
+    for _ in range(repeats):
+        x = PT @ x
+    return x
+
+
+def _transpose_matvecs(PT, x, repeats):
+    out = np.empty_like(x)
+    for _ in range(repeats):
+        PT(x, out)
+    return out
+
+
+def benchmark_chain(family, size, preconditioner="amg", tol=1e-10, maxit=2000,
+                    max_levels=10, max_coarse=500, seed=42, track_memory=False,
+                    reorder=None, matvec_repeats=20):
+    """
+    Ejecuta el pipeline completo sobre una cadena sintética y retorna sus métricas.
+    Con `reorder` ("rcm", "bfs" o "scc") los estados se permutan antes de las
+    demás etapas; la etapa "matvec" mide `matvec_repeats` productos P^T x sobre
+    la matriz original y "matvec_reordered" sobre la permutada; "matvec_view"
+    y "matvec_transpose" miden los mismos productos con la vista `P.T` de
+    SciPy y con `kernels.TransposeMatvec`, que no requieren P^T en CSR.
+
+    Con `track_memory` el pipeline se repite en una segunda pasada bajo
+    tracemalloc y de ella solo se toma el pico de memoria de cada etapa: los
+    tiempos siempre provienen de la pasada sin trazado.
+    """
+    options = dict(preconditioner=preconditioner, tol=tol, maxit=maxit,
+                   max_levels=max_levels, max_coarse=max_coarse, seed=seed,
+                   reorder=reorder, matvec_repeats=matvec_repeats)
+    record = _run_pipeline(StageTimer(), family, size, **options)
+    if track_memory:
+        memory = StageTimer(track_memory=True)
+        _run_pipeline(memory, family, size, **options)
+        for name, stage in record["stages"].items():
+            stage["peak_memory"] = memory.stages[name]["peak_memory"]
+    return record
+
+
+def _run_pipeline(timer, family, size, preconditioner, tol, maxit, max_levels, max_coarse,
+                  seed, reorder, matvec_repeats):
+    P = timer.run("generate", make_chain, family, size, seed=seed)
+    x = np.full(P.shape[0], 1.0 / P.shape[0])
+    timer.run("matvec", _matvecs, P.T.tocsr(), x, matvec_repeats)
+    timer.run("matvec_view", _matvecs, P.T, x, matvec_repeats)
+    timer.run("matvec_transpose", _transpose_matvecs, TransposeMatvec(P), x, matvec_repeats)
+    reorder_record = {}
+    if reorder is not None:
+        perm = timer.run("reorder", compute_ordering, P, reorder)
+        ordering = Reordering(perm)
+        reorder_record = {"reorder": reorder, "bandwidth_before": bandwidth(P)}
+        P = timer.run("permute", ordering.apply, P)
+        reorder_record["bandwidth_after"] = bandwidth(P)
+        timer.run("matvec_reordered", _matvecs, P.T.tocsr(), x, matvec_repeats)
+    irreducible = timer.run("structure", is_stochastic_irreducible, P)
+    A = timer.run("singular_system", build_singular_system, P)
+    A = A.tocsr()
+
+    record = {
+        "family": family,
+        "size": int(P.shape[0]),
+        "nnz": int(P.nnz),
+        "irreducible": irreducible,
+        "preconditioner": preconditioner,
+        **reorder_record,
+    }
+
+    hierarchy = timer.run(
+        "hierarchy", build_amg_hierarchy, A, max_levels=max_levels, max_coarse=max_coarse
+    )
+    record["levels"] = len(hierarchy.levels)
+    record["operator_complexity"] = hierarchy.operator_complexity()
+    record["grid_complexity"] = hierarchy.grid_complexity()
+
+    M = None
+    try:
+        if preconditioner == "amg":
+            M = timer.run(
+                "preconditioner", lambda: AMGPreconditioner(hierarchy).as_linear_operator()
+            )
+        elif preconditioner == "svd":
+            M = timer.run(
+                "preconditioner",
+                lambda: SVDBasedPreconditioner(A, mode="truncated", base="ilu").as_linear_operator(),
+            )
+    except ValueError as exc:
+        # P. ej. el coarsening se estanca y el nivel grueso es demasiado grande:
+        # se registra y se resuelve sin precondicionador
+        record["preconditioner_error"] = str(exc)
+
+    pi, iad_info = timer.run(
+        "stationary_iad", stationary_distribution_iad, P, tol=tol, maxit=maxit,
+        hierarchy=hierarchy, return_info=True,
+    )
+    record["iad_iterations"] = iad_info["iterations"]
+    record["iad_converged"] = bool(iad_info["converged"])
+
+    rng = np.random.default_rng(seed)
+    b = A @ rng.random(A.shape[0])
+    # LGMRES no reporta iteraciones: se cuentan los productos con A
+    matvecs = [0]
+
+    def counted_matvec(v):
+        matvecs[0] += 1
+        return A @ v
+
+    A_op = LinearOperator(A.shape, matvec=counted_matvec, dtype=A.dtype)
+    x, info = timer.run(
+        "solve", solve_singular_system_lgmres, A_op, b, M=M, tol=tol, maxit=maxit,
+    )
+    record["solve_matvecs"] = matvecs[0]
+    record["solve_converged"] = bool(info["converged"])
+    record["residual"] = float(residual_norm(A, x, b))
+
+    record["stages"] = timer.stages
+    record["total_time"] = sum(stage["time"] for stage in timer.stages.values())
+    return record
+
+
+def compare(results, baseline, threshold=0.2, min_time=0.01):
+    """
+    Compara contra un JSON previo. Retorna las regresiones: etapas cuyo tiempo
+    creció más de `threshold` (fracción) para la misma familia, tamaño y
+    precondicionador. Las etapas de menos de `min_time` segundos se ignoran
+    (su variación es ruido).
+    """
+    def key(r):
+        return (r["family"], r["size"], r["preconditioner"])
+
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get(key(r))
+        if old is None:
+            continue
+        for stage, data in r["stages"].items():
+            before = old["stages"].get(stage, {}).get("time")
+            if before is None or max(before, data["time"]) < min_time:
+                continue
+            if data["time"] > before * (1.0 + threshold):
+                regressions.append({
+                    "family": r["family"], "size": r["size"], "stage": stage,
+                    "before": before, "after": data["time"],
+                    "ratio": data["time"] / before,
+                })
+    return regressions
+
+
+_IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import amgmc
+print(time.perf_counter() - start)
+"""
+
+
+def import_time():
+    """Tiempo de `import amgmc` en un intérprete nuevo (la importación es perezosa)."""
+    out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], capture_output=True,
+                         text=True, check=True)
+    return float(out.stdout)
+
+
+def environment():
     return {
-        'size': size,
-        'build': t_build,
-        'power': t_power,
-        'singular': t_singular,
-        'hierarchy': t_hierarchy,
-        'precond': t_precond,
-        'solve': t_solve,
-        'total': total_time
+        "platform": f"{platform.system()} {platform.release()}",
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
     }
 
 
-def main():
-    print("\n" + "="*60)
-    print("BENCHMARK DE RENDIMIENTO - AMG-MC")
-    print("Optimizado para Windows")
-    print("="*60)
-    
-    # Información del sistema
-    import platform
-    print(f"\nSistema: {platform.system()} {platform.release()}")
-    print(f"Python: {platform.python_version()}")
-    print(f"NumPy: {np.__version__}")
-    
-    # Ejecutar benchmarks de diferentes tamaños
-    sizes = [10, 50, 100]
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de AMG-MC sobre cadenas sintéticas")
+    parser.add_argument("--families", nargs="+", default=sorted(GENERATORS),
+                        choices=sorted(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=float, default=[1e3, 1e4, 1e5])
+    parser.add_argument("--preconditioner", choices=["amg", "svd", "none"], default="amg")
+    parser.add_argument("--tol", type=float, default=1e-10)
+    parser.add_argument("--maxit", type=int, default=2000)
+    parser.add_argument("--max-levels", type=int, default=10)
+    parser.add_argument("--max-coarse", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reorder", choices=ORDERINGS,
+                        help="permutar los estados antes de resolver (localidad de caché)")
+    parser.add_argument("--memory", action="store_true",
+                        help="medir además el pico de memoria con tracemalloc "
+                             "(en una segunda pasada, sin afectar los tiempos)")
+    parser.add_argument("--output", help="archivo JSON con los resultados")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="aumento relativo de tiempo considerado regresión")
+    parser.add_argument("--min-time", type=float, default=0.01,
+                        help="tiempo mínimo (s) de una etapa para compararla")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="no ejecutar una corrida previa (compilación de numba)")
+    args = parser.parse_args(argv)
+
+    preconditioner = None if args.preconditioner == "none" else args.preconditioner
+    if not args.no_warmup:
+        # La primera llamada a los kernels de numba incluye su compilación
+        for family in args.families:
+            benchmark_chain(family, 256, preconditioner=preconditioner, maxit=10,
+                            reorder=args.reorder)
+
     results = []
-    
-    for size in sizes:
-        result = benchmark_markov_chain(size)
-        results.append(result)
-    
-    # Comparación de resultados
-    print(f"\n{'='*60}")
-    print("RESUMEN DE BENCHMARKS")
-    print(f"{'='*60}")
-    print(f"{'Tamaño':<10} {'Build (ms)':<12} {'Power (ms)':<12} {'Solve (ms)':<12} {'Total (ms)':<12}")
-    print("-" * 60)
-    for r in results:
-        print(f"{r['size']:<10} {r['build']*1000:<12.2f} {r['power']*1000:<12.2f} {r['solve']*1000:<12.2f} {r['total']*1000:<12.2f}")
+    print(f"{'Familia':<14} {'n':>10} {'nnz':>11} {'Niveles':>8} {'C_op':>6} "
+          f"{'IAD it':>7} {'Total (s)':>10}")
+    print("-" * 72)
+    for family in args.families:
+        for size in args.sizes:
+            r = benchmark_chain(
+                family, int(size), preconditioner=preconditioner, tol=args.tol,
+                maxit=args.maxit, max_levels=args.max_levels, max_coarse=args.max_coarse,
+                seed=args.seed, track_memory=args.memory, reorder=args.reorder,
+            )
+            r["preconditioner"] = args.preconditioner
+            results.append(r)
+            print(f"{family:<14} {r['size']:>10} {r['nnz']:>11} {r['levels']:>8} "
+                  f"{r['operator_complexity']:>6.2f} {r['iad_iterations']:>7} "
+                  f"{r['total_time']:>10.3f}")
+
+    import_seconds = import_time()
+    print(f"import amgmc: {import_seconds * 1e3:.1f} ms")
+
+    report = {"environment": environment(), "arguments": vars(args), "results": results,
+              "import_time": import_seconds}
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, threshold=args.threshold,
+                              min_time=args.min_time)
+        for reg in regressions:
+            print(f"REGRESIÓN {reg['family']} n={reg['size']} {reg['stage']}: "
+                  f"{reg['before']:.3f}s -> {reg['after']:.3f}s (x{reg['ratio']:.2f})")
+        return 1 if regressions else 0
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
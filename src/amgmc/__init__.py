@@ -1,5 +1,40 @@
-from .markov import build_transition_matrix, stationary_distribution_power, build_singular_system, is_stochastic_irreducible
-from .hierarchy import build_amg_hierarchy
-from .preconditioner import SVDBasedPreconditioner
-from .solvers import solve_singular_system_lgmres
-from .metrics import l1_error, l2_error
+# Importación perezosa: `import amgmc` no carga SciPy ni Numba; cada nombre
+# público se resuelve (y su submódulo se importa) en el primer acceso.
+import importlib
+
+_EXPORTS = {
+    "build_transition_matrix": "markov",
+    "stationary_distribution_power": "markov",
+    "build_singular_system": "markov",
+    "is_stochastic_irreducible": "markov",
+    "chain_structure": "markov",
+    "transition_matrix_from_coo": "builders",
+    "transition_matrix_from_edges": "builders",
+    "transition_matrix_from_file": "builders",
+    "build_amg_hierarchy": "hierarchy",
+    "stationary_distribution_iad": "iad",
+    "ncd_blocks": "iad",
+    "SVDBasedPreconditioner": "preconditioner",
+    "AMGPreconditioner": "preconditioner",
+    "solve_singular_system_lgmres": "solvers",
+    "solve_singular_system_block": "solvers",
+    "l1_error": "metrics",
+    "l2_error": "metrics",
+    "Collector": "instrumentation",
+    "configure_runtime": "config",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # Los accesos siguientes no pasan por __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,172 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+
+DANGLING_POLICIES = ("self", "uniform", "hub", "keep", "error")
+
+# Entradas máximas que puede añadir dangling="uniform" (n por fila colgante)
+UNIFORM_FILL_LIMIT = 1 << 22
+
+
+def _edge_dtype(n):
+    """Tipo entero mínimo para indexar n estados en CSR."""
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
+
+
+def normalize_rows(A, dangling="self"):
+    """
+    Normaliza por filas una matriz CSR de pesos (in-place sobre `data`).
+
+    Los estados sin transiciones salientes (filas nulas) se tratan según `dangling`:
+    "self" añade un lazo (estado absorbente), "uniform" salta a cualquier estado
+    con probabilidad 1/n (cada fila añade n entradas, así que se rechaza si el
+    total supera `UNIFORM_FILL_LIMIT`), "hub" representa el mismo salto uniforme
+    con un estado auxiliar n al que van las filas colgantes y que salta de forma
+    uniforme (matriz (n + 1) x (n + 1) con O(n) entradas nuevas, como en
+    `generators.pagerank_chain`; la pi de "uniform" es la de los primeros n
+    estados, renormalizada), "keep" deja la fila en cero (matriz subestocástica)
+    y "error" lanza ValueError. Sin filas colgantes la matriz no cambia de forma.
+    """
+    if dangling not in DANGLING_POLICIES:
+        raise ValueError(f"política para estados colgantes desconocida: {dangling!r}")
+    A = sp.csr_matrix(A, dtype=np.float64)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    n = A.shape[0]
+    counts = np.diff(A.indptr)
+    row_sums = np.asarray(A.sum(axis=1)).ravel()
+    if np.any(row_sums < 0):
+        raise ValueError("los pesos de las transiciones deben ser no negativos")
+
+    dangling_rows = np.flatnonzero(row_sums == 0)
+    nonzero = row_sums > 0
+    scale = np.zeros(n, dtype=np.float64)
+    scale[nonzero] = 1.0 / row_sums[nonzero]
+    A.data *= np.repeat(scale, counts)
+
+    if dangling_rows.size == 0 or dangling == "keep":
+        return A
+    if dangling == "error":
+        raise ValueError(f"{dangling_rows.size} estados sin transiciones salientes")
+    if dangling == "hub":
+        to_hub = sp.csr_matrix(
+            (np.ones(dangling_rows.size), (dangling_rows, np.zeros(dangling_rows.size))),
+            shape=(n, 1),
+        )
+        return sp.bmat([
+            [A, to_hub],
+            [sp.csr_matrix(np.full((1, n), 1.0 / n)), None],
+        ], format="csr")
+    if dangling == "self":
+        fix = sp.csr_matrix(
+            (np.ones(dangling_rows.size), (dangling_rows, dangling_rows)), shape=A.shape
+        )
+    else:
+        if dangling_rows.size * n > UNIFORM_FILL_LIMIT:
+            raise ValueError(
+                f"dangling='uniform' añadiría {dangling_rows.size * n} entradas; "
+                "use dangling='hub'"
+            )
+        rows = np.repeat(dangling_rows, n)
+        cols = np.tile(np.arange(n), dangling_rows.size)
+        fix = sp.csr_matrix((np.full(rows.size, 1.0 / n), (rows, cols)), shape=A.shape)
+    return (A + fix).tocsr()
+
+
+def transition_matrix_from_coo(rows, cols, weights=None, n=None, dangling="self"):
+    """
+    Construye la matriz de transición CSR desde tripletas (origen, destino, peso)
+    sin intermedio denso. Las aristas duplicadas se suman. Memoria O(nnz).
+    """
+    rows = np.asarray(rows)
+    cols = np.asarray(cols)
+    if weights is None:
+        weights = np.ones(rows.shape[0], dtype=np.float64)
+    if n is None:
+        n = int(max(rows.max(initial=-1), cols.max(initial=-1))) + 1
+    dtype = _edge_dtype(n)
+    A = sp.csr_matrix(
+        (np.asarray(weights, dtype=np.float64), (rows.astype(dtype), cols.astype(dtype))),
+        shape=(n, n),
+    )
+    return normalize_rows(A, dangling=dangling)
+
+
+def transition_matrix_from_edges(chunks, n=None, dangling="self"):
+    """
+    Construye la matriz de transición desde un iterable de bloques (src, dst, peso)
+    (el peso puede ser None). Los bloques se acumulan en CSR con suma de duplicados;
+    la fusión se hace cuando el búfer iguala al acumulado, de modo que la memoria
+    se mantiene proporcional al nnz final y el costo total es O(nnz log(bloques)).
+    """
+    acc = None
+    buffer, buffered = [], 0
+    size = n or 0
+
+    def merge(acc, buffer, size):
+        rows = np.concatenate([b[0] for b in buffer])
+        cols = np.concatenate([b[1] for b in buffer])
+        data = np.concatenate([b[2] for b in buffer])
+        block = sp.csr_matrix((data, (rows, cols)), shape=(size, size))
+        if acc is None:
+            return block
+        if acc.shape[0] < size:
+            acc.resize((size, size))
+        return (acc + block).tocsr()
+
+    for src, dst, weight in chunks:
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        if weight is None:
+            weight = np.ones(src.shape[0], dtype=np.float64)
+        if n is None and src.size:
+            size = max(size, int(src.max()) + 1, int(dst.max()) + 1)
+        dtype = _edge_dtype(size)
+        buffer.append((src.astype(dtype), dst.astype(dtype), np.asarray(weight, dtype=np.float64)))
+        buffered += src.shape[0]
+        if buffered >= max(acc.nnz if acc is not None else 0, 1 << 16):
+            acc = merge(acc, buffer, size)
+            buffer, buffered = [], 0
+
+    if buffer:
+        acc = merge(acc, buffer, size)
+    if acc is None:
+        acc = sp.csr_matrix((size, size), dtype=np.float64)
+    if acc.shape[0] < size:
+        acc.resize((size, size))
+    return normalize_rows(acc, dangling=dangling)
+
+
+def iter_edge_file(path, chunk_size=1 << 20):
+    """
+    Itera bloques (src, dst, peso) de un archivo de aristas.
+
+    - `.npy`: arreglo (m, 2) o (m, 3); se abre con memory-map y se lee por bloques,
+      por lo que puede ser más grande que la memoria.
+    - `.npz`: arreglos `src`, `dst` y opcionalmente `weight` (se cargan completos).
+    """
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext == ".npy":
+        edges = np.load(path, mmap_mode="r")
+        if edges.ndim != 2 or edges.shape[1] not in (2, 3):
+            raise ValueError("el archivo .npy debe contener un arreglo (m, 2) o (m, 3)")
+        for start in range(0, edges.shape[0], chunk_size):
+            block = np.asarray(edges[start:start + chunk_size])
+            weight = block[:, 2] if block.shape[1] == 3 else None
+            yield block[:, 0].astype(np.int64), block[:, 1].astype(np.int64), weight
+    elif ext == ".npz":
+        with np.load(path) as archive:
+            weight = archive["weight"] if "weight" in archive.files else None
+            src, dst = archive["src"], archive["dst"]
+            for start in range(0, src.shape[0], chunk_size):
+                stop = start + chunk_size
+                yield src[start:stop], dst[start:stop], None if weight is None else weight[start:stop]
+    else:
+        raise ValueError(f"formato de archivo de aristas no soportado: {ext!r}")
+
+
+def transition_matrix_from_file(path, n=None, dangling="self", chunk_size=1 << 20):
+    """Construye la matriz de transición desde un archivo .npy/.npz de aristas, por bloques."""
+    return transition_matrix_from_edges(
+        iter_edge_file(path, chunk_size=chunk_size), n=n, dangling=dangling
+    )
@@ -0,0 +1,250 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import scipy.sparse as sp
+from .hierarchy import AMGHierarchy, AMGLevel, build_amg_hierarchy
+from .preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+
+
+def matrix_fingerprint(A, **params):
+    """
+    Huella de contenido de una matriz CSR (data/indices/indptr y forma) junto con
+    los parámetros de construcción. Dos matrices con la misma huella producen la
+    misma jerarquía/precondicionador.
+    """
+    A = sp.csr_matrix(A)
+    h = hashlib.blake2b(digest_size=20)
+    h.update(json.dumps([A.shape, A.dtype.str, A.indices.dtype.str]).encode())
+    for arr in (A.indptr, A.indices, A.data):
+        h.update(np.ascontiguousarray(arr).view(np.uint8))
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _csr_arrays(prefix, M):
+    return {
+        f"{prefix}.data": M.data,
+        f"{prefix}.indices": M.indices,
+        f"{prefix}.indptr": M.indptr,
+        f"{prefix}.shape": np.asarray(M.shape, dtype=np.int64),
+    }
+
+
+def _csr_from_arrays(prefix, arrays):
+    shape = tuple(int(v) for v in arrays[f"{prefix}.shape"])
+    return sp.csr_matrix(
+        (arrays[f"{prefix}.data"], arrays[f"{prefix}.indices"], arrays[f"{prefix}.indptr"]),
+        shape=shape, copy=False,
+    )
+
+
+def hierarchy_to_arrays(hierarchy):
+    """Serializa los niveles de un AMGHierarchy como arreglos planos."""
+    arrays = {}
+    for i, level in enumerate(hierarchy.levels):
+        for name in ("A", "P_op", "R_op"):
+            arrays.update(_csr_arrays(f"{i}.{name}", sp.csr_matrix(getattr(level, name))))
+        if level.aggregates is not None:
+            arrays[f"{i}.aggregates"] = np.asarray(level.aggregates)
+    arrays["levels"] = np.asarray([len(hierarchy.levels)], dtype=np.int64)
+    return arrays
+
+
+def hierarchy_from_arrays(arrays):
+    """Reconstruye un AMGHierarchy desde `hierarchy_to_arrays` (sin copiar los datos)."""
+    levels = []
+    for i in range(int(arrays["levels"][0])):
+        levels.append(AMGLevel(
+            A=_csr_from_arrays(f"{i}.A", arrays),
+            P_op=_csr_from_arrays(f"{i}.P_op", arrays),
+            R_op=_csr_from_arrays(f"{i}.R_op", arrays),
+            aggregates=arrays.get(f"{i}.aggregates"),
+        ))
+    return AMGHierarchy(levels=levels)
+
+
+def _nbytes(arrays):
+    return int(sum(np.asarray(arr).nbytes for arr in arrays.values()))
+
+
+class SetupCache:
+    """
+    Caché de jerarquías y precondicionadores indexada por `matrix_fingerprint`.
+
+    Tiene dos niveles, ambos con expulsión LRU por tamaño en bytes:
+    - memoria: objetos ya construidos (un acierto no repite ningún trabajo);
+    - disco (opcional, `directory`): un directorio por entrada con un `.npy` crudo
+      por arreglo, que se abre con memory-map al cargar.
+    """
+
+    def __init__(self, directory=None, max_memory_bytes=512 * 2**20, max_disk_bytes=8 * 2**30):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    # --- nivel en memoria -------------------------------------------------
+
+    def _memory_get(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key, obj, nbytes):
+        if nbytes > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key)[1]
+        self._memory[key] = (obj, nbytes)
+        self._memory_bytes += nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted
+
+    # --- nivel en disco ---------------------------------------------------
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def _disk_get(self, key):
+        if self.directory is None:
+            return None
+        path = self._entry_dir(key)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        arrays = {
+            name: np.load(os.path.join(path, f"{i}.npy"), mmap_mode="r")
+            for i, name in enumerate(meta["arrays"])
+        }
+        os.utime(meta_path)  # Marca de uso reciente para la política LRU
+        return arrays
+
+    def _disk_put(self, key, arrays):
+        if self.directory is None:
+            return
+        nbytes = _nbytes(arrays)
+        if nbytes > self.max_disk_bytes:
+            return
+        names = list(arrays)
+        # Escritura atómica: directorio temporal + rename
+        tmp = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            for i, name in enumerate(names):
+                np.save(os.path.join(tmp, f"{i}.npy"), np.asarray(arrays[name]))
+            with open(os.path.join(tmp, "meta.json"), "w") as fh:
+                json.dump({"arrays": names, "nbytes": nbytes}, fh)
+            os.replace(tmp, self._entry_dir(key))
+        except OSError:
+            # Otro proceso escribió la misma entrada primero
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(self._entry_dir(key)):
+                raise
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries, total = [], 0
+        for entry in os.scandir(self.directory):
+            meta_path = os.path.join(entry.path, "meta.json")
+            if entry.name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as fh:
+                nbytes = json.load(fh)["nbytes"]
+            entries.append((os.path.getmtime(meta_path), nbytes, entry.path))
+            total += nbytes
+        for _, nbytes, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= nbytes
+
+    # --- API pública ------------------------------------------------------
+
+    def _get_or_build(self, key, build, to_arrays, from_arrays):
+        obj = self._memory_get(key)
+        if obj is not None:
+            return obj
+        arrays = self._disk_get(key)
+        if arrays is not None:
+            obj = from_arrays(arrays)
+        else:
+            obj = build()
+            arrays = to_arrays(obj)
+            self._disk_put(key, arrays)
+        self._memory_put(key, obj, _nbytes(arrays))
+        return obj
+
+    def hierarchy(self, A, **params):
+        """Retorna build_amg_hierarchy(A, **params), reutilizando la caché si es posible."""
+        key = matrix_fingerprint(A, kind="hierarchy", **params)
+        return self._get_or_build(
+            key,
+            build=lambda: build_amg_hierarchy(A, **params),
+            to_arrays=hierarchy_to_arrays,
+            from_arrays=hierarchy_from_arrays,
+        )
+
+    def preconditioner(self, A, kind="amg", hierarchy_options=None, **params):
+        """
+        Retorna un AMGPreconditioner (`kind="amg"`, sobre la jerarquía de
+        `hierarchy_options`, que se toma de su propia entrada de la caché) o un
+        SVDBasedPreconditioner (`kind="svd"`) para A, restaurando sus factores
+        desde la caché cuando existen.
+        """
+        hierarchy_options = hierarchy_options or {}
+        key = matrix_fingerprint(A, kind=kind, hierarchy=hierarchy_options, **params)
+
+        if kind == "amg":
+            # La jerarquía vive en su propia entrada; esta solo guarda la
+            # pseudo-inversa gruesa y la huella de la jerarquía que la produjo
+            hierarchy_key = matrix_fingerprint(A, kind="hierarchy", **hierarchy_options)
+
+            def build():
+                return AMGPreconditioner(self.hierarchy(A, **hierarchy_options), **params)
+
+            def to_arrays(pre):
+                return {
+                    "coarse_pinv": pre.factors()["coarse_pinv"],
+                    "hierarchy_key": np.asarray(hierarchy_key),
+                }
+
+            def from_arrays(arrays):
+                if str(arrays["hierarchy_key"]) != hierarchy_key:
+                    return build()
+                return AMGPreconditioner(
+                    self.hierarchy(A, **hierarchy_options),
+                    _coarse_pinv=arrays["coarse_pinv"], **params,
+                )
+        elif kind == "svd":
+            def build():
+                return SVDBasedPreconditioner(A, **params)
+
+            def to_arrays(pre):
+                return pre.factors()
+
+            def from_arrays(arrays):
+                restored = {f"_{name}": arr for name, arr in arrays.items()}
+                return SVDBasedPreconditioner(A, **params, **restored)
+        else:
+            raise ValueError(f"tipo de precondicionador desconocido: {kind!r}")
+
+        return self._get_or_build(key, build, to_arrays, from_arrays)
+
+    def clear(self):
+        """Vacía ambos niveles de la caché."""
+        self._memory.clear()
+        self._memory_bytes = 0
+        if self.directory is not None:
+            for entry in os.scandir(self.directory):
+                shutil.rmtree(entry.path, ignore_errors=True)
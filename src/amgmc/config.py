@@ -1,39 +1,56 @@
-# Configuración de optimización para Windows
+# Configuración de rendimiento (opcional: se aplica solo al llamar configure_runtime)
 import os
-import numpy as np
 
-# Configuración de threading para mejor rendimiento en Windows
-def configure_for_windows():
+# Variables de entorno que controlan los hilos de BLAS/LAPACK y OpenMP
+THREAD_ENV_VARS = (
+    'MKL_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+)
+
+
+def limit_threads(threads):
     """
-    Configura las variables de entorno para optimizar el rendimiento
-    de NumPy/SciPy en sistemas Windows.
+    Limita los hilos de BLAS/LAPACK/OpenMP del proceso actual.
+
+    Fija las variables de entorno (efectivas para librerías que aún no se han
+    cargado) y, si threadpoolctl está disponible, ajusta en caliente los pools
+    ya cargados. Retorna el controlador de threadpoolctl o None.
     """
-    # Detectar número de núcleos disponibles
-    cpu_count = os.cpu_count() or 4
-    
-    # Configurar threading para BLAS/LAPACK (MKL en Windows)
-    os.environ['MKL_NUM_THREADS'] = str(cpu_count)
-    os.environ['NUMEXPR_NUM_THREADS'] = str(cpu_count)
-    os.environ['OMP_NUM_THREADS'] = str(cpu_count)
-    os.environ['OPENBLAS_NUM_THREADS'] = str(cpu_count)
-    
-    # Optimizaciones específicas de MKL en Windows
-    os.environ['MKL_DYNAMIC'] = 'TRUE'
-    os.environ['MKL_ENABLE_INSTRUCTIONS'] = 'AVX2'  # Usar instrucciones AVX2 si están disponibles
-    
-    # Configurar NumPy para usar todos los hilos
+    threads = max(1, int(threads))
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
     try:
-        # Intenta configurar el número de hilos en tiempo de ejecución
         import threadpoolctl
-        threadpoolctl.threadpool_limits(limits=cpu_count)
     except ImportError:
-        pass  # threadpoolctl es opcional
-    
-    print(f"Configuración de rendimiento para Windows:")
-    print(f"  - CPUs detectados: {cpu_count}")
-    print(f"  - Threads configurados: {cpu_count}")
-    print(f"  - Backend NumPy: {np.__config__.show()}")
-
-# Configuración automática al importar
-if os.name == 'nt':  # Solo en Windows
-    configure_for_windows()
+        return None  # threadpoolctl es opcional
+    return threadpoolctl.threadpool_limits(limits=threads)
+
+
+def configure_runtime(threads=None, verbose=False):
+    """
+    Ajuste opcional del entorno de ejecución; importar el paquete no lo aplica.
+
+    Limita los hilos de BLAS/LAPACK/OpenMP a `threads` (por defecto, todos los
+    núcleos) y en Windows activa además las opciones dinámicas de MKL. Debe
+    llamarse antes de cargar las librerías nativas para que las variables de
+    entorno surtan efecto. Con `verbose` imprime un resumen. Retorna el número
+    de hilos configurado.
+    """
+    threads = threads or os.cpu_count() or 4
+    limit_threads(threads)
+    if os.name == 'nt':
+        # Optimizaciones específicas de MKL en Windows
+        os.environ['MKL_DYNAMIC'] = 'TRUE'
+        os.environ['MKL_ENABLE_INSTRUCTIONS'] = 'AVX2'  # Usar instrucciones AVX2 si están disponibles
+    if verbose:
+        print("Configuración de rendimiento:")
+        print(f"  - CPUs detectados: {os.cpu_count()}")
+        print(f"  - Threads configurados: {threads}")
+    return threads
+
+
+def configure_for_windows():
+    """Configuración anterior para Windows: `configure_runtime` con todos los núcleos y resumen."""
+    return configure_runtime(verbose=True)
@@ -0,0 +1,167 @@
+import numpy as np
+import scipy.sparse as sp
+from .builders import transition_matrix_from_coo
+
+
+def grid_random_walk(shape, periodic=False, laziness=0.0):
+    """
+    Paseo aleatorio sobre una malla regular de dimensión len(shape).
+    Cada estado salta a sus vecinos con igual probabilidad; `laziness` es la
+    probabilidad de quedarse (hace la cadena aperiódica).
+    """
+    shape = tuple(int(s) for s in shape)
+    n = int(np.prod(shape))
+    idx = np.arange(n).reshape(shape)
+    rows, cols = [], []
+    for axis in range(len(shape)):
+        for step in (1, -1):
+            shifted = np.roll(idx, -step, axis=axis)
+            if periodic:
+                src, dst = idx, shifted
+            else:
+                keep = [slice(None)] * len(shape)
+                keep[axis] = slice(0, -1) if step == 1 else slice(1, None)
+                src, dst = idx[tuple(keep)], shifted[tuple(keep)]
+            rows.append(src.ravel())
+            cols.append(dst.ravel())
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    P = transition_matrix_from_coo(rows, cols, n=n)
+    if laziness:
+        P = (laziness * sp.identity(n, format="csr") + (1.0 - laziness) * P).tocsr()
+    return P
+
+
+def graph_random_walk(n, avg_degree=8, seed=42):
+    """
+    Paseo aleatorio sobre un grafo dirigido aleatorio con grado medio
+    `avg_degree`. Se añade el ciclo i -> i+1 para garantizar irreducibilidad.
+    """
+    rng = np.random.default_rng(seed)
+    m = int(n * avg_degree)
+    src = rng.integers(0, n, size=m)
+    dst = rng.integers(0, n, size=m)
+    ring = np.arange(n)
+    rows = np.concatenate([src, ring])
+    cols = np.concatenate([dst, (ring + 1) % n])
+    return transition_matrix_from_coo(rows, cols, n=n)
+
+
+def birth_death_chain(n, birth=0.4, death=0.6):
+    """
+    Cadena de nacimiento y muerte en {0, ..., n-1} (cola M/M/1/K uniformizada):
+    sube con probabilidad `birth`, baja con `death` y se queda con el resto.
+    """
+    states = np.arange(n)
+    up = np.full(n, birth)
+    up[-1] = 0.0
+    down = np.full(n, death)
+    down[0] = 0.0
+    stay = 1.0 - up - down
+    rows = np.concatenate([states[:-1], states[1:], states])
+    cols = np.concatenate([states[1:], states[:-1], states])
+    data = np.concatenate([up[:-1], down[1:], stay])
+    return transition_matrix_from_coo(rows, cols, data, n=n)
+
+
+def tandem_queue_chain(capacity, arrival=0.3, service1=0.35, service2=0.35):
+    """
+    Dos colas en tándem con capacidad `capacity` cada una (uniformizadas):
+    llegadas a la primera, servicio de la primera a la segunda y salidas de la
+    segunda. Las llegadas con la primera cola llena se pierden; el servicio se
+    bloquea si la segunda está llena. Tiene (capacity + 1)^2 estados.
+    """
+    c = capacity + 1
+    q1, q2 = np.meshgrid(np.arange(c), np.arange(c), indexing="ij")
+    q1, q2 = q1.ravel(), q2.ravel()
+    state = q1 * c + q2
+    rows, cols, data = [], [], []
+    for mask, dst, rate in (
+        (q1 < capacity, state + c, arrival),
+        ((q1 > 0) & (q2 < capacity), state - c + 1, service1),
+        (q2 > 0, state - 1, service2),
+    ):
+        rows.append(state[mask])
+        cols.append(dst[mask])
+        data.append(np.full(mask.sum(), rate))
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    data = np.concatenate(data)
+    stay = 1.0 - np.bincount(rows, weights=data, minlength=c * c)
+    rows = np.concatenate([rows, state])
+    cols = np.concatenate([cols, state])
+    data = np.concatenate([data, stay])
+    return transition_matrix_from_coo(rows, cols, data, n=c * c)
+
+
+def ncd_chain(n_blocks, block_size, avg_degree=8, eps=1e-4, seed=42):
+    """
+    Cadena casi completamente descomponible: `n_blocks` bloques densamente
+    conectados internamente (grado medio `avg_degree`) y acoplados entre sí
+    con probabilidad total `eps` por estado.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_blocks * block_size
+    m = int(n * avg_degree)
+    src = rng.integers(0, n, size=m)
+    dst = (src // block_size) * block_size + rng.integers(0, block_size, size=m)
+    # Ciclo dentro de cada bloque para que sea irreducible
+    ring = np.arange(n)
+    ring_dst = (ring // block_size) * block_size + (ring % block_size + 1) % block_size
+    inner = transition_matrix_from_coo(
+        np.concatenate([src, ring]), np.concatenate([dst, ring_dst]), n=n
+    )
+    # Acoplamiento: cada estado salta a un estado de otro bloque
+    other = (ring // block_size + rng.integers(1, max(n_blocks, 2), size=n)) % n_blocks
+    coupling = sp.csr_matrix(
+        (np.ones(n), (ring, other * block_size + rng.integers(0, block_size, size=n))),
+        shape=(n, n),
+    )
+    return ((1.0 - eps) * inner + eps * coupling).tocsr()
+
+
+def pagerank_chain(n, avg_degree=8, alpha=0.85, dangling_fraction=0.1, seed=42):
+    """
+    Grafo web tipo PageRank con grados de salida de cola pesada y estados sin
+    enlaces. El teletransporte uniforme (1 - alpha) se representa con un estado
+    auxiliar n (centro) para no densificar la matriz: todo estado salta al
+    centro con probabilidad 1 - alpha (1 si no tiene enlaces) y el centro salta
+    de forma uniforme. La pi de PageRank es la de los primeros n estados,
+    renormalizada. Retorna una matriz (n + 1) x (n + 1) con O(n + aristas) entradas.
+    """
+    rng = np.random.default_rng(seed)
+    degree = np.minimum(rng.zipf(2.0, size=n), n) * max(avg_degree // 2, 1)
+    degree[rng.random(n) < dangling_fraction] = 0
+    src = np.repeat(np.arange(n), degree)
+    # Destinos con preferencia por índices bajos (popularidad de cola pesada)
+    dst = np.minimum((n * rng.random(src.size) ** 2).astype(np.int64), n - 1)
+    links = transition_matrix_from_coo(src, dst, n=n, dangling="keep")
+
+    hub = n
+    has_links = degree > 0
+    to_hub = np.where(has_links, 1.0 - alpha, 1.0)
+    P = sp.bmat([
+        [alpha * links, sp.csr_matrix(to_hub[:, None])],
+        [sp.csr_matrix(np.full((1, n), 1.0 / n)), None],
+    ], format="csr")
+    return P
+
+
+GENERATORS = {
+    "grid": lambda n, seed=42: grid_random_walk(
+        (int(round(np.sqrt(n))),) * 2, laziness=0.1),
+    "graph": lambda n, seed=42: graph_random_walk(n, seed=seed),
+    "birth_death": lambda n, seed=42: birth_death_chain(n),
+    "tandem_queue": lambda n, seed=42: tandem_queue_chain(int(round(np.sqrt(n))) - 1),
+    "ncd": lambda n, seed=42: ncd_chain(max(n // 100, 2), 100, seed=seed),
+    "pagerank": lambda n, seed=42: pagerank_chain(n, seed=seed),
+}
+
+
+def make_chain(family, n, seed=42):
+    """Genera una cadena de la familia `family` con aproximadamente n estados."""
+    try:
+        generator = GENERATORS[family]
+    except KeyError:
+        raise ValueError(f"familia de cadenas desconocida: {family!r}") from None
+    return generator(n, seed=seed)
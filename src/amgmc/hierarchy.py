@@ -1,17 +1,56 @@
 from dataclasses import dataclass
 import numpy as np
 import scipy.sparse as sp
+from .markov import jit
+from .instrumentation import stage
+from .kernels import galerkin_aggregate, use_numba
+
+# Un nivel que conserva más de esta fracción de estados no justifica su costo
+MAX_COARSENING_RATIO = 0.8
+
 
 @dataclass
 class AMGLevel:
     A: sp.csr_matrix
     P_op: sp.csr_matrix
     R_op: sp.csr_matrix
+    aggregates: np.ndarray = None  # Agregado de cada estado del nivel anterior
 
 @dataclass
 class AMGHierarchy:
     levels: list
 
+    def operator_complexity(self):
+        """Suma de nnz de todos los niveles dividida entre nnz del nivel fino."""
+        nnz = [level.A.nnz for level in self.levels]
+        return float(sum(nnz)) / max(nnz[0], 1)
+
+    def grid_complexity(self):
+        """Suma de estados de todos los niveles dividida entre estados del nivel fino."""
+        sizes = [level.A.shape[0] for level in self.levels]
+        return float(sum(sizes)) / max(sizes[0], 1)
+
+    def astype(self, dtype):
+        """Copia de la jerarquía con operadores almacenados en `dtype` (p. ej. float32)."""
+        return AMGHierarchy(levels=[
+            AMGLevel(
+                A=level.A.astype(dtype), P_op=level.P_op.astype(dtype),
+                R_op=level.R_op.astype(dtype), aggregates=level.aggregates,
+            )
+            for level in self.levels
+        ])
+
+    def summary(self):
+        """Tamaño y nnz por nivel junto con las complejidades (para instrumentación)."""
+        return {
+            "levels": [
+                {"level": i, "size": int(level.A.shape[0]), "nnz": int(level.A.nnz)}
+                for i, level in enumerate(self.levels)
+            ],
+            "operator_complexity": self.operator_complexity(),
+            "grid_complexity": self.grid_complexity(),
+        }
+
 
 def naive_aggregate_coarsening(A, ratio=0.5):
     """Coarsening por agregación naive optimizado para Windows."""
@@ -44,23 +83,325 @@ def naive_aggregate_coarsening(A, ratio=0.5):
     return A_c, P_op, R_op
 
 
-def build_amg_hierarchy(A, max_levels=3):
-    """Construye jerarquía AMG con optimizaciones para rendimiento."""
+def _row_max(indptr, values, default):
+    """Máximo por fila de un arreglo alineado con la estructura CSR (filas vacías -> default)."""
+    n = indptr.shape[0] - 1
+    out = np.full(n, default, dtype=values.dtype)
+    nonempty = np.diff(indptr) > 0
+    if values.size:
+        out[nonempty] = np.maximum.reduceat(values, indptr[:-1][nonempty])
+    return out
+
+
+def strength_of_connection(A, theta=0.25):
+    """
+    Grafo de conexiones fuertes de A (simetrizado, sin diagonal), con peso
+    |a_ij| + |a_ji| en cada conexión retenida.
+    j es vecino fuerte de i si |a_ij| >= theta * max_{k != i} |a_ik|.
+    Costo O(nnz).
+    """
+    A = sp.csr_matrix(A)
+    S = abs(A)
+    S = sp.triu(S, k=1) + sp.tril(S, k=-1)
+    S = (S + S.transpose()).tocsr()
+    S.sum_duplicates()
+
+    row_max = _row_max(S.indptr, S.data, 0.0)
+    rows = np.repeat(np.arange(S.shape[0]), np.diff(S.indptr))
+    keep = S.data >= theta * row_max[rows]
+    S.data[~keep] = 0.0
+    S.eliminate_zeros()
+    return S
+
+
+@jit(nopython=True, cache=True)
+def _strongest_aggregate(indptr, indices, weights, agg, sizes, i, limit):
+    """Agregado vecino de i con mayor peso de conexión y menos de `limit` estados (-1 si no hay)."""
+    best = -1
+    best_weight = -1.0
+    for k in range(indptr[i], indptr[i + 1]):
+        a = agg[indices[k]]
+        if a != -1 and sizes[a] < limit and weights[k] > best_weight:
+            best = a
+            best_weight = weights[k]
+    return best
+
+
+@jit(nopython=True, cache=True)
+def _greedy_aggregate(indptr, indices, weights, n, max_size):
+    """
+    Agregación greedy (Vanek) en tres pasadas con tamaño objetivo `max_size`.
+
+    Los estados que quedan sin agregado tras las raíces se unen al agregado
+    vecino más fuertemente conectado con espacio; los restantes forman
+    agregados con los libres a distancia 1 y 2. Solo si eso dejaría un
+    agregado de un único estado se anexan al vecino más fuerte aunque esté
+    lleno (hasta 2 * `max_size`): así únicamente los estados aislados quedan
+    solos y el coarsening no se estanca.
+    """
+    agg = np.full(n, -1, dtype=np.int64)
+    sizes = np.zeros(n, dtype=np.int64)
+    # Primer vecino aún no revisado por fila (los estados solo pasan de libres a agregados)
+    cursor = indptr[:-1].copy()
+    m = 0
+
+    # Pasada 1: raíces cuyos vecinos fuertes están todos libres
+    for i in range(n):
+        if agg[i] != -1:
+            continue
+        free = True
+        for k in range(indptr[i], indptr[i + 1]):
+            if agg[indices[k]] != -1:
+                free = False
+                break
+        if not free or indptr[i] == indptr[i + 1]:
+            continue
+        agg[i] = m
+        sizes[m] = 1
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if sizes[m] >= max_size:
+                break
+            if agg[j] == -1:
+                agg[j] = m
+                sizes[m] += 1
+        m += 1
+
+    # Pasada 2: anexar estados libres al agregado vecino más fuerte con espacio
+    for i in range(n):
+        if agg[i] != -1:
+            continue
+        a = _strongest_aggregate(indptr, indices, weights, agg, sizes, i, max_size)
+        if a != -1:
+            agg[i] = a
+            sizes[a] += 1
+
+    # Pasada 3: los estados restantes se agrupan con los libres a distancia 1 y 2
+    for i in range(n):
+        if agg[i] != -1:
+            continue
+        agg[i] = m
+        sizes[m] = 1
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if sizes[m] >= max_size:
+                break
+            if agg[j] == -1:
+                agg[j] = m
+                sizes[m] += 1
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            while sizes[m] < max_size and cursor[j] < indptr[j + 1]:
+                q = indices[cursor[j]]
+                if agg[q] == -1:
+                    agg[q] = m
+                    sizes[m] += 1
+                cursor[j] += 1
+            if sizes[m] >= max_size:
+                break
+        if sizes[m] == 1:
+            a = _strongest_aggregate(indptr, indices, weights, agg, sizes, i, 2 * max_size)
+            if a != -1 and a != m:
+                agg[i] = a
+                sizes[a] += 1
+                sizes[m] = 0
+                continue
+        m += 1
+
+    return agg, m
+
+
+def greedy_aggregation(S, max_size=8):
+    """
+    Agregados greedy sobre el grafo de conexiones fuertes S (los pesos de S
+    eligen el agregado al que se anexan los estados sueltos). Retorna (agregados, m).
+    """
+    S = sp.csr_matrix(S, dtype=np.float64)
+    agg, m = _greedy_aggregate(S.indptr, S.indices, S.data, S.shape[0], max_size)
+    return np.asarray(agg, dtype=np.int64), int(m)
+
+
+def _split_oversized(S, agg, m, max_size):
+    """
+    Parte los agregados con más de `max_size` estados aplicando la agregación
+    greedy sobre el subgrafo de S restringido a cada uno de ellos, de modo que
+    las piezas siguen conectadas y no cruzan los límites del agregado original.
+    """
+    sizes = np.bincount(agg, minlength=m)
+    big = sizes[agg] > max_size
+    if not np.any(big):
+        return agg, m
+    nodes = np.flatnonzero(big)
+    local = np.full(agg.shape[0], -1, dtype=np.int64)
+    local[nodes] = np.arange(nodes.shape[0])
+    S = S.tocoo()
+    inside = big[S.row] & (agg[S.row] == agg[S.col])
+    sub = sp.csr_matrix(
+        (S.data[inside], (local[S.row[inside]], local[S.col[inside]])),
+        shape=(nodes.shape[0], nodes.shape[0]),
+    )
+    sub_agg, sub_m = greedy_aggregation(sub, max_size=max_size)
+
+    kept = np.flatnonzero((sizes > 0) & (sizes <= max_size))
+    relabel = np.full(m, -1, dtype=np.int64)
+    relabel[kept] = np.arange(kept.shape[0])
+    out = relabel[agg]
+    out[nodes] = kept.shape[0] + sub_agg
+    return out, kept.shape[0] + sub_m
+
+
+def mis_aggregation(S, seed=42, max_size=None):
+    """
+    Agregación basada en un conjunto independiente maximal de distancia 2
+    (Luby vectorizado). Cada ronda cuesta O(nnz). Con `max_size` los agregados
+    que lo superan se parten en piezas conectadas. Retorna (agregados, m).
+    """
+    S = sp.csr_matrix(S)
+    n = S.shape[0]
+    # Incluir la diagonal para que cada vecindario contenga al propio estado
+    G = (S + sp.identity(n, format="csr")).tocsr()
+    indptr, indices = G.indptr, G.indices
+
+    rng = np.random.default_rng(seed)
+    weights = rng.random(n)
+    UNDECIDED, IN, OUT = 0, 1, 2
+    state = np.zeros(n, dtype=np.int8)
+
+    while np.any(state == UNDECIDED):
+        w = np.where(state == UNDECIDED, weights, -1.0)
+        # Máximo en la bola de radio 2
+        m1 = _row_max(indptr, w[indices], -1.0)
+        m2 = _row_max(indptr, m1[indices], -1.0)
+        new = (state == UNDECIDED) & (w == m2)
+        state[new] = IN
+        # Excluir estados a distancia <= 2 de las nuevas raíces
+        near = new.astype(np.int8)
+        near = _row_max(indptr, near[indices], 0)
+        near = _row_max(indptr, near[indices], 0)
+        state[(state == UNDECIDED) & (near > 0)] = OUT
+
+    roots = np.flatnonzero(state == IN)
+    m = roots.shape[0]
+    agg = np.full(n, -1, dtype=np.int64)
+    agg[roots] = np.arange(m)
+    # Dos rondas de propagación: vecinos directos y luego a distancia 2
+    for _ in range(2):
+        candidate = _row_max(indptr, agg[indices], -1)
+        free = agg == -1
+        agg[free] = candidate[free]
+    # Estados aislados (sin conexiones fuertes) forman su propio agregado
+    lonely = np.flatnonzero(agg == -1)
+    agg[lonely] = m + np.arange(lonely.shape[0])
+    m += lonely.shape[0]
+    if max_size is not None:
+        agg, m = _split_oversized(S, agg, m, max_size)
+    return agg, m
+
+
+def aggregation_operators(aggregates, m):
+    """Prolongador por tramos constantes (0/1) y su restricción transpuesta."""
+    n = aggregates.shape[0]
+    P_op = sp.csr_matrix(
+        (np.ones(n, dtype=np.float64), (np.arange(n), aggregates)),
+        shape=(n, m), dtype=np.float64,
+    )
+    R_op = P_op.transpose().tocsr()
+    return P_op, R_op
+
+
+def aggregate_coarsening(A, method="greedy", theta=0.25, max_agg_size=8, backend="scipy"):
+    """
+    Coarsening por agregación guiada por la estructura CSR de A.
+    El prolongador 0/1 preserva el vector de unos del núcleo derecho de I - P.
+    Con `backend="numba"` el producto de Galerkin se arma en una sola pasada
+    (kernels.galerkin_aggregate). Retorna (A_c, P_op, R_op, agregados).
+    """
+    A = sp.csr_matrix(A)
+    S = strength_of_connection(A, theta=theta)
+    if method == "greedy":
+        aggregates, m = greedy_aggregation(S, max_size=max_agg_size)
+    elif method == "mis":
+        aggregates, m = mis_aggregation(S, max_size=max_agg_size)
+    else:
+        raise ValueError(f"método de agregación desconocido: {method!r}")
+
+    P_op, R_op = aggregation_operators(aggregates, m)
+    if use_numba(backend):
+        A_c = galerkin_aggregate(A, aggregates, m, backend=backend)
+    else:
+        A_c = (R_op @ A @ P_op).tocsr()
+        A_c.sum_duplicates()
+    return A_c, P_op, R_op, aggregates
+
+
+def build_amg_hierarchy(A, max_levels=3, max_coarse=4, method="greedy",
+                        theta=0.25, max_agg_size=8, collector=None, dtype=np.float64,
+                        backend="scipy"):
+    """
+    Construye jerarquía AMG con optimizaciones para rendimiento.
+    El engrosamiento se detiene al alcanzar `max_levels`, cuando el nivel
+    actual tiene `max_coarse` estados o menos o cuando el siguiente conservaría
+    más de `MAX_COARSENING_RATIO` de los estados.
+
+    `method` selecciona el coarsening: "greedy" o "mis" (agregación por
+    conexiones fuertes con umbral `theta` y tamaño acotado) o "naive"
+    (agrupación aleatoria, solo para comparación).
+
+    Con un `collector` se mide la etapa "hierarchy" y se registran sus niveles.
+    Los productos de Galerkin se calculan en float64; con `dtype=np.float32` los
+    operadores se almacenan en simple precisión (mitad de tráfico de memoria)
+    a medida que se construye cada nivel, de modo que solo el nivel en curso
+    existe también en float64.
+    `backend="numba"` usa el producto de Galerkin compilado.
+    """
+    with stage(collector, "hierarchy", method=method):
+        hierarchy = _build_levels(A, max_levels, max_coarse, method, theta, max_agg_size,
+                                  backend, np.dtype(dtype))
+    if collector is not None:
+        collector.record_hierarchy(hierarchy)
+    return hierarchy
+
+
+def _store(level, dtype):
+    """Nivel con sus operadores en `dtype` (sin copia si ya lo están)."""
+    if dtype == np.float64:
+        return level
+    return AMGLevel(
+        A=level.A.astype(dtype, copy=False), P_op=level.P_op.astype(dtype, copy=False),
+        R_op=level.R_op.astype(dtype, copy=False), aggregates=level.aggregates,
+    )
+
+
+def _build_levels(A, max_levels, max_coarse, method, theta, max_agg_size, backend,
+                  dtype=np.dtype(np.float64)):
     levels = []
     A_curr = A.tocsr()
     
     # Nivel más fino
     n = A_curr.shape[0]
-    identity = sp.identity(n, format='csr', dtype=np.float64)
-    levels.append(AMGLevel(A=A_curr, P_op=identity, R_op=identity))
+    identity = sp.identity(n, format='csr', dtype=dtype)
+    levels.append(AMGLevel(A=A_curr.astype(dtype, copy=False), P_op=identity, R_op=identity))
+    A_curr = A_curr.astype(np.float64, copy=False)
     
     # Niveles subsecuentes
     for level_idx in range(1, max_levels):
-        if A_curr.shape[0] <= 4:
+        if A_curr.shape[0] <= max_coarse:
             break
         
-        A_c, P_op, R_op = naive_aggregate_coarsening(A_curr, ratio=0.5)
-        levels.append(AMGLevel(A=A_c, P_op=P_op, R_op=R_op))
+        if method == "naive":
+            A_c, P_op, R_op = naive_aggregate_coarsening(A_curr, ratio=0.5)
+            aggregates = P_op.indices
+        else:
+            A_c, P_op, R_op, aggregates = aggregate_coarsening(
+                A_curr, method=method, theta=theta, max_agg_size=max_agg_size,
+                backend=backend,
+            )
+        # Con una reducción débil el coarsening se estanca: más niveles solo suman costo
+        if A_c.shape[0] > MAX_COARSENING_RATIO * A_curr.shape[0]:
+            break
+        # El nivel se guarda ya en `dtype`; solo A_c sigue en float64 para el siguiente producto
+        levels.append(_store(AMGLevel(A=A_c, P_op=P_op, R_op=R_op, aggregates=aggregates),
+                             dtype))
         A_curr = A_c
     
     return AMGHierarchy(levels=levels)
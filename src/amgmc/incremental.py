@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+from .markov import jit, build_singular_system, replace_csr_rows
+from .hierarchy import build_amg_hierarchy
+from .preconditioner import AMGPreconditioner
+from .iad import stationary_distribution_iad
+from .solvers import solve_singular_system_lgmres
+
+
+@jit(nopython=True, cache=True)
+def _push(indptr, indices, data, pi, r, seeds, queue, queued, threshold, max_pushes):
+    """
+    Gauss-Southwell sobre pi P = pi con residuo r = P^T pi - pi.
+
+    La cola se siembra solo con `seeds` (los estados cuyo residuo cambió);
+    cada empuje anula r_i ajustando pi_i y reparte el cambio por la fila i de P
+    (acceso CSR por filas), de modo que el trabajo es proporcional a la zona
+    afectada. `queue` y `queued` son búferes de tamaño n reutilizados entre
+    llamadas (`queued` vuelve a quedar en False). Retorna el número de
+    empujes, el cambio en la norma L1 de r y el cambio en la masa de pi.
+    """
+    n = pi.shape[0]
+    head = 0
+    size = 0
+    for s in range(seeds.shape[0]):
+        i = seeds[s]
+        if not queued[i] and abs(r[i]) > threshold:
+            queue[(head + size) % n] = i
+            queued[i] = True
+            size += 1
+
+    pushes = 0
+    l1_change = 0.0
+    mass_change = 0.0
+    while size > 0 and pushes < max_pushes:
+        i = queue[head]
+        head = (head + 1) % n
+        size -= 1
+        queued[i] = False
+        if abs(r[i]) <= threshold:
+            continue
+        p_ii = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            if indices[k] == i:
+                p_ii += data[k]
+        if p_ii >= 1.0:
+            continue  # Estado absorbente: su ecuación no determina pi_i
+        delta = r[i] / (1.0 - p_ii)
+        pi[i] += delta
+        mass_change += delta
+        l1_change -= abs(r[i])
+        r[i] = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if j == i:
+                continue
+            old = abs(r[j])
+            r[j] += delta * data[k]
+            l1_change += abs(r[j]) - old
+            if not queued[j] and abs(r[j]) > threshold:
+                queue[(head + size) % n] = j
+                queued[j] = True
+                size += 1
+        pushes += 1
+
+    # Presupuesto agotado: limpiar las marcas de los que quedaron en la cola
+    for t in range(size):
+        queued[queue[(head + t) % n]] = False
+    return pushes, l1_change, mass_change
+
+
+def _propagate_delta(hierarchy, rows, delta):
+    """
+    Propaga un cambio en filas del nivel fino por la jerarquía:
+    Delta A_c = R_op[:, filas] @ Delta @ P_op, aplicado solo a las filas gruesas
+    afectadas. Retorna la lista de filas modificadas por nivel.
+    """
+    changed = [rows]
+    levels = hierarchy.levels
+    for lvl in range(1, len(levels)):
+        level = levels[lvl]
+        # Cada estado fino pertenece a un único agregado: solo cambian esas filas gruesas
+        coarse_rows = np.unique(level.aggregates[rows])
+        if coarse_rows.size == 0:
+            changed.append(coarse_rows)
+            continue
+        R_cols = level.R_op[coarse_rows][:, rows]
+        delta_c = (R_cols @ delta @ level.P_op).tocsr()
+        new_rows = (level.A[coarse_rows] + delta_c).tocsr()
+        delta = replace_csr_rows(level.A, coarse_rows, new_rows)
+        rows = coarse_rows
+        changed.append(rows)
+    return changed
+
+
+@dataclass
+class IncrementalChain:
+    """
+    Cadena de Markov con actualizaciones de filas de bajo rango.
+
+    Mantiene P, A = I - P, la jerarquía AMG, el precondicionador y la
+    distribución estacionaria pi. `update_rows` modifica solo las filas
+    cambiadas en cada nivel (los agregados se conservan), refresca los
+    suavizadores en esas filas, recalcula la pseudo-inversa gruesa y corrige
+    pi con empujes locales de Gauss-Southwell sobre el residuo persistente.
+    Si los empujes no alcanzan la tolerancia se recurre a IAD en caliente.
+    """
+    P: sp.csr_matrix
+    tol: float = 1e-12
+    push_budget: float = 20.0  # Empujes máximos por actualización, en múltiplos de n
+    hierarchy_options: dict = None
+    preconditioner_options: dict = None
+    A: sp.csr_matrix = None
+    hierarchy: object = None
+    preconditioner: AMGPreconditioner = None
+    pi: np.ndarray = None
+    _residual: np.ndarray = None
+    _residual_l1: float = 0.0
+    _mass: float = 1.0
+    _queue: np.ndarray = None
+    _queued: np.ndarray = None
+
+    def __post_init__(self):
+        self.P = sp.csr_matrix(self.P, dtype=np.float64, copy=True)
+        self.P.sum_duplicates()
+        options = dict({"max_levels": 10, "max_coarse": 50}, **(self.hierarchy_options or {}))
+        self.hierarchy = build_amg_hierarchy(build_singular_system(self.P).tocsr(), **options)
+        self.A = self.hierarchy.levels[0].A
+        self.preconditioner = AMGPreconditioner(
+            self.hierarchy, **(self.preconditioner_options or {})
+        )
+        n = self.P.shape[0]
+        self._queue = np.empty(n, dtype=np.int64)
+        self._queued = np.zeros(n, dtype=np.bool_)
+        self._solve_stationary()
+
+    def _solve_stationary(self, x0=None):
+        self.pi, info = stationary_distribution_iad(
+            self.P, tol=self.tol, hierarchy=self.hierarchy, return_info=True, x0=x0
+        )
+        # pi ya cumple la tolerancia: el residuo restante se descarta, para que
+        # los empujes siguientes partan solo de lo que cambie
+        self._residual = np.zeros_like(self.pi)
+        self._residual_l1 = 0.0
+        self._mass = 1.0
+        return info
+
+    def update_rows(self, rows, new_rows):
+        """
+        Reemplaza las filas `rows` de P por `new_rows` (k x n, estocásticas).
+        Retorna un diccionario con el método usado ("push" o "iad"), el número
+        de empujes y el residuo L1 final de pi.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        new_rows = sp.csr_matrix(new_rows, dtype=np.float64)
+        if not np.allclose(np.asarray(new_rows.sum(axis=1)).ravel(), 1.0):
+            raise ValueError("las filas nuevas deben sumar 1")
+
+        delta = replace_csr_rows(self.P, rows, new_rows)
+        n = self.P.shape[0]
+        k = rows.shape[0]
+        identity_rows = sp.csr_matrix((np.ones(k), (np.arange(k), rows)), shape=(k, n))
+        delta_A = replace_csr_rows(self.A, rows, identity_rows - new_rows)
+        changed = _propagate_delta(self.hierarchy, rows, delta_A)
+        self.preconditioner.refresh_rows(changed)
+
+        # r = P^T pi - pi cambia solo en las columnas de las filas nuevas: r += Delta^T pi[filas]
+        touched = np.unique(delta.indices)
+        before = np.abs(self._residual[touched]).sum()
+        np.add.at(self._residual, delta.indices,
+                  delta.data * np.repeat(self.pi[rows], np.diff(delta.indptr)))
+        self._residual_l1 += np.abs(self._residual[touched]).sum() - before
+
+        pushes, l1_change, mass_change = _push(
+            self.P.indptr, self.P.indices, self.P.data, self.pi, self._residual,
+            touched, self._queue, self._queued, self.tol / n, int(self.push_budget * n),
+        )
+        self._residual_l1 += l1_change
+        self._mass += mass_change
+        if abs(self._mass - 1.0) > 0.5 * self.tol:
+            # Normalizar (O(n)) solo cuando la masa de pi se aparta de 1 más que la tolerancia
+            scale = self._mass
+            self.pi /= scale
+            self._residual /= scale
+            self._residual_l1 /= scale
+            self._mass = 1.0
+        residual = float(max(self._residual_l1, 0.0))
+        if residual < self.tol:
+            return {"method": "push", "pushes": int(pushes), "residual": residual}
+
+        info = self._solve_stationary(x0=self.pi)
+        return {"method": "iad", "pushes": int(pushes), "residual": info["residual"]}
+
+    def solve(self, b, tol=1e-10, maxit=10000):
+        """Resuelve (I - P) x = b con LGMRES precondicionado por la jerarquía actual."""
+        return solve_singular_system_lgmres(
+            self.A, b, M=self.preconditioner.as_linear_operator(), tol=tol, maxit=maxit
+        )
@@ -0,0 +1,103 @@
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+import json
+import time
+import numpy as np
+import scipy.sparse.linalg as spla
+
+
+@dataclass
+class Collector:
+    """
+    Recolector opcional de métricas del pipeline.
+
+    Las funciones que aceptan `collector=` solo lo usan si no es None, de modo
+    que sin recolector no hay ningún costo adicional. Acumula:
+    - tiempos por etapa (`stage`), como totales y como registros individuales;
+    - contadores (`count`), p. ej. productos con A ("matvec") y aplicaciones
+      del precondicionador ("precond") de los solvers; las demás etapas usan
+      nombres calificados ("stationary.matvec", "stationary.sweep");
+    - historial de residuos por iteración (`residual`), que además se reenvía
+      a los `callbacks` registrados (`callback(etapa, iteración, residuo)`);
+    - estadísticas por nivel de las jerarquías AMG (`record_hierarchy`).
+    """
+    callbacks: list = field(default_factory=list)
+    records: list = field(default_factory=list)
+    timers: dict = field(default_factory=dict)
+    counters: Counter = field(default_factory=Counter)
+    residuals: dict = field(default_factory=dict)
+    _stack: list = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name, **fields):
+        """Mide el tiempo de pared del bloque como la etapa `name`."""
+        self._stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            self.timers[name] = self.timers.get(name, 0.0) + elapsed
+            self.records.append({"kind": "stage", "name": name, "time": elapsed, **fields})
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def residual(self, value, stage=None):
+        """Registra el residuo de la siguiente iteración de `stage` (por defecto, la etapa actual)."""
+        stage = stage or (self._stack[-1] if self._stack else "solve")
+        history = self.residuals.setdefault(stage, [])
+        history.append(float(value))
+        for callback in self.callbacks:
+            callback(stage, len(history), float(value))
+
+    def record_hierarchy(self, hierarchy, name="hierarchy"):
+        """Guarda tamaños y nnz por nivel y las complejidades de un AMGHierarchy."""
+        self.records.append({"kind": "hierarchy", "name": name, **hierarchy.summary()})
+
+    def operator(self, op, name="matvec"):
+        """Envuelve un operador para contar sus aplicaciones (un bloque n x s cuenta s)."""
+        if op is None:
+            return None
+
+        def matvec(v):
+            self.counters[name] += 1
+            return op @ v
+
+        def matmat(V):
+            self.counters[name] += V.shape[1]
+            return op.matmat(V) if isinstance(op, spla.LinearOperator) else op @ V
+
+        return spla.LinearOperator(op.shape, matvec=matvec, matmat=matmat, dtype=op.dtype)
+
+    def to_records(self):
+        """Registros planos: etapas, jerarquías, contadores y residuos."""
+        records = list(self.records)
+        records.extend({"kind": "counter", "name": k, "value": v} for k, v in self.counters.items())
+        records.extend(
+            {"kind": "residuals", "name": k, "history": v} for k, v in self.residuals.items()
+        )
+        return records
+
+    def to_json(self, path=None):
+        """Serializa `to_records()`; si se da `path` se escribe al archivo."""
+        text = json.dumps(self.to_records(), indent=2, default=float)
+        if path is not None:
+            with open(path, "w") as fh:
+                fh.write(text)
+        return text
+
+    def reset(self):
+        self.records.clear()
+        self.timers.clear()
+        self.counters.clear()
+        self.residuals.clear()
+
+
+def stage(collector, name, **fields):
+    """`collector.stage(name)` o un contexto vacío si no hay recolector."""
+    if collector is None:
+        return nullcontext()
+    return collector.stage(name, **fields)
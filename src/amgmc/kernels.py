@@ -0,0 +1,240 @@
+import numpy as np
+import scipy.sparse as sp
+
+# Numba es opcional: sin él, las funciones públicas recurren a SciPy
+try:
+    from numba import get_num_threads, jit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def get_num_threads():
+        return 1
+
+    def jit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+BACKENDS = ("scipy", "numba")
+
+
+def use_numba(backend):
+    """True si `backend` pide los kernels compilados y Numba está disponible."""
+    if backend not in BACKENDS:
+        raise ValueError(f"backend desconocido: {backend!r}")
+    return backend == "numba" and NUMBA_AVAILABLE
+
+
+def _chunks(n, parts):
+    bounds = np.linspace(0, n, parts + 1).astype(np.int64)
+    return bounds
+
+
+# --- P^T x sin construir P^T ---------------------------------------------
+
+@jit(nopython=True, parallel=True, cache=True)
+def _csc_rmatvec(indptr, indices, data, x, out, bounds):
+    """
+    out <- A^T x con A en CSC: la columna j de A es la fila j de A^T, así que
+    cada hilo reúne (gather) su bloque de columnas y escribe solo su tramo de
+    `out`, sin conflictos, búferes por hilo ni reducción final.
+    """
+    for t in prange(bounds.shape[0] - 1):
+        for j in range(bounds[t], bounds[t + 1]):
+            s = 0.0
+            for k in range(indptr[j], indptr[j + 1]):
+                s += data[k] * x[indices[k]]
+            out[j] = s
+    return out
+
+
+class TransposeMatvec:
+    """
+    Operador x -> A^T x sobre una CSR.
+
+    Con `backend="numba"` guarda una vez la estructura por columnas de A (CSC,
+    el mismo nnz que A) y cada producto es un gather paralelo por bloques de
+    columnas de nnz similar, sin reservar memoria. Con un solo hilo el gather
+    lo hace SciPy sobre esa misma CSC (su bucle es más rápido que el
+    compilado). Con "scipy" (o sin Numba) usa la vista CSC `A.T`, que no copia
+    la matriz pero dispersa (scatter) las filas de A, algo más lento.
+    """
+
+    def __init__(self, A, backend="numba"):
+        self.A = sp.csr_matrix(A)
+        self.shape = (self.A.shape[1], self.A.shape[0])
+        self.compiled = use_numba(backend)
+        if self.compiled:
+            self._csc = self.A.tocsc()
+            m = self.shape[0]
+            parts = max(1, min(get_num_threads(), m))
+            targets = np.linspace(0, self._csc.nnz, parts + 1)[1:-1]
+            inner = np.searchsorted(self._csc.indptr, targets)
+            self._bounds = np.unique(np.concatenate([[0], inner, [m]])).astype(np.int64)
+
+    def __call__(self, x, out=None):
+        if out is None:
+            out = np.empty(self.shape[0], dtype=np.result_type(self.A.dtype, x.dtype))
+        if not self.compiled:
+            out[...] = self.A.T @ x
+            return out
+        C = self._csc
+        if self._bounds.shape[0] == 2:
+            out[...] = C.T @ x
+            return out
+        return _csc_rmatvec(C.indptr, C.indices, C.data, x, out, self._bounds)
+
+    def __matmul__(self, x):
+        return self(np.asarray(x))
+
+
+# --- Suavizadores in-place -----------------------------------------------
+
+@jit(nopython=True, parallel=True, cache=True)
+def _jacobi_sweep(indptr, indices, data, d_inv, x, b, out):
+    """out <- x + d_inv * (b - A x), en paralelo por filas."""
+    n = x.shape[0]
+    for i in prange(n):
+        s = b[i]
+        for k in range(indptr[i], indptr[i + 1]):
+            s -= data[k] * x[indices[k]]
+        out[i] = x[i] + d_inv[i] * s
+    return out
+
+
+@jit(nopython=True, cache=True)
+def _sor_sweep(indptr, indices, data, x, b, omega, start, stop, step):
+    """
+    Barrido SOR in-place en el orden start:stop:step. Equivale a
+    x <- x + (D/omega + L)^{-1} (b - A x) (o con U en el barrido hacia atrás);
+    las diagonales nulas se tratan como 1 sin relajar. Es secuencial por
+    naturaleza (cada fila usa los valores ya actualizados).
+    """
+    for i in range(start, stop, step):
+        s = b[i]
+        diag = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            if j == i:
+                diag += data[k]
+            s -= data[k] * x[j]
+        if diag != 0.0:
+            x[i] += omega * s / diag
+        else:
+            x[i] += s
+    return x
+
+
+def jacobi_sweeps(A, d_inv, x, b, iterations, work=None):
+    """
+    `iterations` barridos de Jacobi ponderado (d_inv ya incluye omega) sobre x,
+    alternando con el búfer `work`; el resultado queda siempre en x.
+    """
+    if work is None:
+        work = np.empty_like(x)
+    current, other = x, work
+    for _ in range(iterations):
+        _jacobi_sweep(A.indptr, A.indices, A.data, d_inv, current, b, other)
+        current, other = other, current
+    if current is not x:
+        x[:] = current
+    return x
+
+
+def sor_sweep(A, x, b, omega=1.0, reverse=False):
+    """Un barrido SOR/Gauss-Seidel in-place sobre x (hacia atrás si `reverse`)."""
+    n = A.shape[0]
+    if reverse:
+        return _sor_sweep(A.indptr, A.indices, A.data, x, b, omega, n - 1, -1, -1)
+    return _sor_sweep(A.indptr, A.indices, A.data, x, b, omega, 0, n, 1)
+
+
+# --- Producto de Galerkin por agregación ---------------------------------
+
+@jit(nopython=True, parallel=True, cache=True)
+def _galerkin_aggregate(indptr, indices, data, order, agg_ptr, row_start, aggregates,
+                        m, out_indices, out_data, counts, bounds):
+    """
+    A_c[I, J] = suma de a_ij con agg(i) = I y agg(j) = J, en una sola pasada sobre A.
+
+    Los estados se recorren agrupados por agregado (`order`, `agg_ptr`). La fila
+    gruesa I se escribe en el tramo reservado `row_start[I]` (a lo sumo el nnz de
+    sus filas finas) y un marcador por hilo localiza las columnas ya vistas.
+    `counts[I]` recibe el número de entradas de cada fila gruesa.
+    """
+    parts = bounds.shape[0] - 1
+    for t in prange(parts):
+        mark_row = np.full(m, -1, dtype=np.int64)
+        mark_pos = np.empty(m, dtype=np.int64)
+        for I in range(bounds[t], bounds[t + 1]):
+            pos = row_start[I]
+            for p in range(agg_ptr[I], agg_ptr[I + 1]):
+                i = order[p]
+                for k in range(indptr[i], indptr[i + 1]):
+                    J = aggregates[indices[k]]
+                    if mark_row[J] != I:
+                        mark_row[J] = I
+                        mark_pos[J] = pos
+                        out_indices[pos] = J
+                        out_data[pos] = data[k]
+                        pos += 1
+                    else:
+                        out_data[mark_pos[J]] += data[k]
+            counts[I] = pos - row_start[I]
+    return counts
+
+
+@jit(nopython=True, parallel=True, cache=True)
+def _compact_rows(row_start, indptr, src_indices, src_data, dst_indices, dst_data):
+    """Copia cada fila gruesa de su tramo reservado a su posición CSR definitiva."""
+    m = indptr.shape[0] - 1
+    for I in prange(m):
+        offset = row_start[I] - indptr[I]
+        for k in range(indptr[I], indptr[I + 1]):
+            dst_indices[k] = src_indices[k + offset]
+            dst_data[k] = src_data[k + offset]
+
+
+def galerkin_aggregate(A, aggregates, m, backend="numba"):
+    """
+    Operador grueso A_c = Q^T A Q con Q la matriz de agregación 0/1, sin formar
+    Q ni el producto intermedio A Q (que tiene tantas entradas como A). Con
+    "scipy" (o sin Numba) se calcula como Q^T (A Q).
+    """
+    A = sp.csr_matrix(A)
+    aggregates = np.asarray(aggregates, dtype=np.int64)
+    n = A.shape[0]
+    if not use_numba(backend):
+        Q = sp.csr_matrix(
+            (np.ones(n, dtype=A.dtype), (np.arange(n), aggregates)), shape=(n, m)
+        )
+        A_c = (Q.T.tocsr() @ A @ Q).tocsr()
+        A_c.sum_duplicates()
+        return A_c
+
+    order = np.argsort(aggregates, kind="stable")
+    agg_ptr = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(np.bincount(aggregates, minlength=m), out=agg_ptr[1:])
+    row_nnz = np.bincount(aggregates, weights=np.diff(A.indptr), minlength=m).astype(np.int64)
+    row_start = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(row_nnz, out=row_start[1:])
+
+    # El nnz grueso está acotado por el fino: la salida se reserva una sola vez
+    work_indices = np.empty(A.nnz, dtype=np.int64)
+    work_data = np.empty(A.nnz, dtype=A.dtype)
+    counts = np.zeros(m, dtype=np.int64)
+    bounds = _chunks(m, max(1, min(get_num_threads(), m)))
+    _galerkin_aggregate(A.indptr, A.indices, A.data, order, agg_ptr, row_start, aggregates,
+                        m, work_indices, work_data, counts, bounds)
+
+    indptr = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    index_dtype = A.indices.dtype if indptr[-1] <= np.iinfo(A.indices.dtype).max else np.int64
+    indices = np.empty(indptr[-1], dtype=index_dtype)
+    data = np.empty(indptr[-1], dtype=A.dtype)
+    _compact_rows(row_start, indptr, work_indices, work_data, indices, data)
+    A_c = sp.csr_matrix((data, indices, indptr.astype(index_dtype)), shape=(m, m))
+    A_c.sort_indices()
+    return A_c
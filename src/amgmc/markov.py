@@ -1,17 +1,21 @@
+from dataclasses import dataclass
+import time
 import numpy as np
 import scipy.sparse as sp
+import scipy.linalg as la
+import scipy.sparse.linalg as spla
+from scipy.sparse import csgraph
+from .instrumentation import stage
 
 # Numba es opcional - si está disponible, se usará para optimizaciones JIT
-try:
-    from numba import jit
-    NUMBA_AVAILABLE = True
-except ImportError:
-    NUMBA_AVAILABLE = False
-    # Decorador dummy si Numba no está disponible
-    def jit(*args, **kwargs):
-        def decorator(func):
-            return func
-        return decorator
+# (el decorador de reemplazo vive en kernels junto con los kernels compilados)
+from .kernels import NUMBA_AVAILABLE, TransposeMatvec, jit, sor_sweep, use_numba
+from .outofcore import MemmapCSR, singular_operator
+from .partitioned import _csr_matvec_rows, partitioned
+
+# Por debajo de este tamaño "eigs" usa la descomposición densa (ARPACK exige k < n - 1)
+_DENSE_EIGS_SIZE = 64
+
 
 def build_transition_matrix(P_dense):
     """Construye matriz de transición normalizada y la convierte a formato sparse CSR."""
@@ -22,76 +26,473 @@ def build_transition_matrix(P_dense):
     return sp.csr_matrix(P, dtype=np.float64)
 
 
+@dataclass
+class ChainStructure:
+    """
+    Diagnóstico estructural de una cadena: componentes fuertemente conexas (SCC),
+    clases cerradas (recurrentes) y estados transitorios. Evalúa como True solo
+    si la matriz es estocástica e irreducible.
+    """
+    stochastic: bool
+    n_components: int
+    labels: np.ndarray
+    closed_classes: list
+    transient_states: np.ndarray
+
+    @property
+    def irreducible(self):
+        return self.n_components == 1
+
+    def __bool__(self):
+        return bool(self.stochastic and self.irreducible)
+
+
+@jit(nopython=True, cache=True)
+def _tarjan_scc(indptr, indices, data, tol):
+    """
+    Tarjan iterativo sobre los arreglos CSR crudos (aristas con data > tol).
+    Las etiquetas quedan en orden topológico inverso: las SCC sumidero primero.
+    """
+    n = indptr.shape[0] - 1
+    index = np.full(n, -1, dtype=np.int64)
+    low = np.zeros(n, dtype=np.int64)
+    on_stack = np.zeros(n, dtype=np.bool_)
+    labels = np.full(n, -1, dtype=np.int32)
+    stack = np.empty(n, dtype=np.int64)
+    call_node = np.empty(n, dtype=np.int64)
+    call_edge = np.empty(n, dtype=np.int64)
+    sp_top = 0
+    counter = 0
+    n_components = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = counter
+        low[root] = counter
+        counter += 1
+        stack[sp_top] = root
+        sp_top += 1
+        on_stack[root] = True
+        call_node[0] = root
+        call_edge[0] = indptr[root]
+        depth = 1
+        while depth > 0:
+            v = call_node[depth - 1]
+            e = call_edge[depth - 1]
+            if e < indptr[v + 1]:
+                call_edge[depth - 1] = e + 1
+                if data[e] <= tol:
+                    continue
+                w = indices[e]
+                if index[w] == -1:
+                    index[w] = counter
+                    low[w] = counter
+                    counter += 1
+                    stack[sp_top] = w
+                    sp_top += 1
+                    on_stack[w] = True
+                    call_node[depth] = w
+                    call_edge[depth] = indptr[w]
+                    depth += 1
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                depth -= 1
+                if low[v] == index[v]:
+                    while True:
+                        sp_top -= 1
+                        w = stack[sp_top]
+                        on_stack[w] = False
+                        labels[w] = n_components
+                        if w == v:
+                            break
+                    n_components += 1
+                if depth > 0:
+                    u = call_node[depth - 1]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+    return n_components, labels
+
+
+@jit(nopython=True, cache=True)
+def _open_components(indptr, indices, data, tol, labels, n_components):
+    """Marca las SCC con alguna arista saliente (no cerradas)."""
+    is_open = np.zeros(n_components, dtype=np.bool_)
+    for i in range(indptr.shape[0] - 1):
+        for k in range(indptr[i], indptr[i + 1]):
+            if data[k] > tol and labels[indices[k]] != labels[i]:
+                is_open[labels[i]] = True
+                break
+    return is_open
+
+
+def chain_structure(P, tol=1e-12):
+    """
+    Calcula las SCC del grafo de transiciones (p_ij > tol) en O(n + nnz) y, a
+    partir del grafo condensado, las clases cerradas y los estados transitorios.
+    Con Numba se usa un Tarjan compilado sobre indptr/indices; sin Numba,
+    scipy.sparse.csgraph.
+    """
+    P = sp.csr_matrix(P)
+    rowsums = np.abs(np.asarray(P.sum(axis=1)).ravel() - 1.0)
+    stochastic = not np.any(rowsums > 1e-10)
+
+    if NUMBA_AVAILABLE:
+        n_components, labels = _tarjan_scc(P.indptr, P.indices, P.data, tol)
+        is_open = _open_components(P.indptr, P.indices, P.data, tol, labels, n_components)
+    else:
+        G = sp.csr_matrix(
+            (np.where(P.data > tol, 1.0, 0.0), P.indices, P.indptr), shape=P.shape
+        )
+        G.eliminate_zeros()
+        n_components, labels = csgraph.connected_components(G, directed=True, connection="strong")
+        # Una SCC es cerrada si ninguna arista sale de ella
+        rows = np.repeat(np.arange(G.shape[0]), np.diff(G.indptr))
+        leaving = labels[rows] != labels[G.indices]
+        is_open = np.zeros(n_components, dtype=np.bool_)
+        is_open[labels[rows[leaving]]] = True
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(n_components + 1))
+    closed_classes = [
+        order[bounds[c]:bounds[c + 1]] for c in np.flatnonzero(~is_open)
+    ]
+    transient_states = np.flatnonzero(is_open[labels])
+    return ChainStructure(
+        stochastic=stochastic,
+        n_components=int(n_components),
+        labels=labels,
+        closed_classes=closed_classes,
+        transient_states=transient_states,
+    )
+
+
 def is_stochastic_irreducible(P, tol=1e-12):
-    """Verifica si una matriz es estocástica e irreducible usando algoritmo BFS optimizado."""
-    # Verificación rápida de estocasticidad
-    rowsums = np.abs(P.sum(axis=1).A.ravel() - 1.0)
-    if np.any(rowsums > 1e-10):
-        return False
-    
-    n = P.shape[0]
-    # Construcción más eficiente del grafo
-    G = (P > tol).astype(np.int8)
-    
-    # BFS forward optimizado
-    vis = np.zeros(n, dtype=np.bool_)
-    vis[0] = True
-    frontier = [0]
-    idx = 0
-    while idx < len(frontier):
-        u = frontier[idx]
-        idx += 1
-        for v in G[u].indices:
-            if not vis[v]:
-                vis[v] = True
-                frontier.append(v)
-    
-    if not np.all(vis):
-        return False
-    
-    # BFS backward optimizado
-    GT = G.transpose().tocsr()
-    vis.fill(False)
-    vis[0] = True
-    frontier = [0]
-    idx = 0
-    while idx < len(frontier):
-        u = frontier[idx]
-        idx += 1
-        for v in GT[u].indices:
-            if not vis[v]:
-                vis[v] = True
-                frontier.append(v)
-    
-    return np.all(vis)
-
-
-def stationary_distribution_power(P, maxit=10000, tol=1e-12):
-    """Calcula la distribución estacionaria usando el método de potencias optimizado."""
-    PT = P.transpose().tocsr()
-    n = P.shape[0]
-    x = np.ones(n, dtype=np.float64) / n
-    
-    # Pre-alocar para evitar creaciones repetidas
-    norm_diff = np.empty(n, dtype=np.float64)
-    
-    for iteration in range(maxit):
-        x_new = PT @ x
-        # Normalización in-place
-        x_sum = x_new.sum()
-        x_new /= x_sum
-        
-        # Cálculo optimizado de convergencia
-        np.subtract(x_new, x, out=norm_diff)
-        if np.sum(np.abs(norm_diff)) < tol:
-            return x_new
+    """
+    Verifica si una matriz es estocástica e irreducible mediante SCC en O(n + nnz).
+    El diagnóstico completo (SCC, clases cerradas, estados transitorios) lo
+    da `chain_structure`.
+    """
+    return bool(chain_structure(P, tol=tol))
+
+
+def _csr_matvec_into(A, x, out):
+    """
+    out <- A @ x. Sin reservar memoria con Numba (kernel CSR por filas); sin
+    Numba SciPy no ofrece un producto público sobre un búfer existente y se
+    copia el resultado de `A @ x` (un temporal por producto).
+    """
+    if isinstance(A, TransposeMatvec):
+        return A(x, out)
+    if hasattr(A, "matvec_into"):
+        return A.matvec_into(x, out)  # Operadores en disco o particionados por hilos
+    if NUMBA_AVAILABLE and A.dtype == x.dtype == out.dtype:
+        _csr_matvec_rows(A.indptr, A.indices, A.data, x, out, 0, A.shape[0])
+    else:
+        np.copyto(out, A @ x)
+    return out
+
+
+def _l1_change(x_new, x, work):
+    """||x_new - x||_1 usando `work` como búfer."""
+    np.subtract(x_new, x, out=work)
+    np.abs(work, out=work)
+    return float(work.sum())
+
+
+def _power_iteration(PT, x, maxit, tol, history):
+    """Método de potencias con dos búferes que se intercambian (sin reservas por iteración)."""
+    x_new = np.empty_like(x)
+    work = np.empty_like(x)
+    iteration = 0
+    for iteration in range(1, maxit + 1):
+        _csr_matvec_into(PT, x, x_new)
+        x_new /= x_new.sum()
+        history.append(_l1_change(x_new, x, work))
+        x, x_new = x_new, x
+        if history[-1] < tol:
+            break
+    return x, iteration
+
+
+def _anderson_iteration(PT, x, maxit, tol, history, depth=5):
+    """
+    Potencias con aceleración de Anderson (tipo II) sobre g(x) = normalize(P^T x).
+    Las diferencias de residuos e iterados se guardan en búferes circulares (n x depth).
+    """
+    n = x.shape[0]
+    dF = np.zeros((n, depth))
+    dG = np.zeros((n, depth))
+    g = np.empty_like(x)
+    g_prev = np.empty_like(x)
+    f = np.empty_like(x)
+    f_prev = np.empty_like(x)
+    work = np.empty_like(x)
+    stored = 0
+    iteration = 0
+    for iteration in range(1, maxit + 1):
+        _csr_matvec_into(PT, x, g)
+        g /= g.sum()
+        np.subtract(g, x, out=f)
+        history.append(_l1_change(g, x, work))
+        if history[-1] < tol:
+            x[:] = g
+            break
+
+        if iteration > 1:
+            col = (iteration - 2) % depth
+            np.subtract(f, f_prev, out=dF[:, col])
+            np.subtract(g, g_prev, out=dG[:, col])
+            stored = min(stored + 1, depth)
+        g_prev[:] = g
+        f_prev[:] = f
+
+        if stored == 0:
+            x[:] = g
+            continue
+        gamma = np.linalg.lstsq(dF[:, :stored], f, rcond=None)[0]
+        np.dot(dG[:, :stored], gamma, out=work)
+        np.subtract(g, work, out=x)
+        # Salvaguarda: la extrapolación debe seguir siendo una distribución
+        np.maximum(x, 0.0, out=x)
+        total = x.sum()
+        if total > 0:
+            x /= total
+        else:
+            x[:] = g
+    return x, iteration
+
+
+def _sor_iteration(PT, x, maxit, tol, history, omega=1.0, compiled=False):
+    """
+    Barridos SOR (Gauss-Seidel con omega=1) sobre (I - P^T) x = 0:
+    (D/omega + L) x_new = ((1/omega - 1) D - U) x, normalizando en cada barrido.
+    Con `compiled` el barrido se hace in-place con el kernel de Numba; sin él,
+    `spsolve_triangular` devuelve un vector nuevo en cada barrido.
+    """
+    A = (sp.identity(PT.shape[0], format="csr") - PT).tocsr()
+    if compiled:
+        rhs = np.zeros_like(x)
+        x_old = np.empty_like(x)
+        work = np.empty_like(x)
+        iteration = 0
+        for iteration in range(1, maxit + 1):
+            x_old[:] = x
+            sor_sweep(A, x, rhs, omega)
+            x /= x.sum()
+            history.append(_l1_change(x, x_old, work))
+            if history[-1] < tol:
+                break
+        return x, iteration
+
+    d = A.diagonal()
+    d = np.where(d != 0, d, 1.0)
+    lower = (sp.tril(A, k=-1) + sp.diags(d / omega)).tocsr()
+    upper = (sp.triu(A, k=1) - sp.diags((1.0 / omega - 1.0) * d)).tocsr()
+    rhs = np.empty_like(x)
+    work = np.empty_like(x)
+    iteration = 0
+    for iteration in range(1, maxit + 1):
+        _csr_matvec_into(upper, x, rhs)
+        np.negative(rhs, out=rhs)
+        x_new = spla.spsolve_triangular(lower, rhs, lower=True, overwrite_b=True)
+        x_new /= x_new.sum()
+        history.append(_l1_change(x_new, x, work))
         x = x_new
-    
+        if history[-1] < tol:
+            break
+    return x, iteration
+
+
+def _dense_eigs_solve(PT, x, history):
+    """Cadenas pequeñas: P^T densa (un producto por columna) y autovalor más cercano a 1."""
+    n = x.shape[0]
+    D = np.empty((n, n))
+    e = np.zeros(n)
+    for j in range(n):
+        e[j] = 1.0
+        _csr_matvec_into(PT, e, D[:, j])
+        e[j] = 0.0
+    values, vecs = la.eig(D)
+    x = np.abs(vecs[:, np.argmin(np.abs(values - 1.0))].real)
+    x /= x.sum()
+    history.append(float(np.abs(D @ x - x).sum()))
+    return x, n
+
+
+def _eigs_solve(PT, x, maxit, tol, history):
+    """Vector propio izquierdo dominante con ARPACK (Arnoldi implícitamente reiniciado)."""
+    if x.shape[0] <= _DENSE_EIGS_SIZE:
+        return _dense_eigs_solve(PT, x, history)
+    matvecs = [0]
+
+    def matvec(v):
+        matvecs[0] += 1
+        return PT @ v
+
+    op = spla.LinearOperator(PT.shape, matvec=matvec, dtype=np.float64)
+    _, vecs = spla.eigs(op, k=1, which="LM", v0=x, tol=tol, maxiter=maxit)
+    x = np.abs(vecs[:, 0].real)
+    x /= x.sum()
+    history.append(float(np.abs(PT @ x - x).sum()))
+    return x, matvecs[0]
+
+
+STATIONARY_METHODS = ("power", "anderson", "gauss_seidel", "sor", "eigs")
+
+
+def stationary_distribution_power(P, maxit=10000, tol=1e-12, return_info=False,
+                                  method="power", omega=1.2, depth=5, x0=None,
+                                  collector=None, backend="scipy", threads=None):
+    """
+    Calcula la distribución estacionaria usando el método de potencias optimizado.
+
+    `method` selecciona la variante: "power" (potencias simple), "anderson"
+    (potencias con aceleración de Anderson de profundidad `depth`),
+    "gauss_seidel"/"sor" (barridos sobre (I - P)^T con relajación `omega`) o
+    "eigs" (vector propio dominante con ARPACK). Las iteraciones trabajan sobre
+    búferes pre-alocados. `x0` permite un arranque en caliente (p. ej. la pi
+    anterior tras una pequeña actualización). Con `return_info=True` retorna
+    también un diccionario con iteraciones, historial de residuos y tiempo de pared.
+    Con un `collector` (instrumentation.Collector) se registran además la etapa
+    "stationary", el historial de residuos y los productos con P^T
+    ("stationary.matvec"; los barridos de "gauss_seidel"/"sor" se cuentan
+    como "stationary.sweep").
+
+    Con `backend="numba"` (si Numba está instalado) los productos P^T x se hacen
+    con un kernel sobre las filas de P sin construir P^T, y los barridos
+    Gauss-Seidel/SOR in-place sin resolver sistemas triangulares.
+
+    `P` puede ser una `outofcore.MemmapCSR` (matriz en disco): los productos
+    P^T x recorren el archivo por bloques de filas. Los métodos
+    "gauss_seidel"/"sor" necesitan la matriz en memoria y no la admiten.
+
+    Con `threads` los productos P^T x de "power"/"anderson"/"eigs" se reparten
+    por bloques de filas en un pool de hilos (partitioned.PartitionedOperator).
+    """
+    if method not in STATIONARY_METHODS:
+        raise ValueError(f"método desconocido: {method!r}")
+    start = time.perf_counter()
+    compiled = use_numba(backend)
+    if isinstance(P, MemmapCSR):
+        if method in ("gauss_seidel", "sor"):
+            raise ValueError(f"el método {method!r} requiere la matriz en memoria")
+        PT = P.T
+    elif compiled and method in ("power", "anderson", "eigs"):
+        PT = TransposeMatvec(P, backend=backend)
+    else:
+        PT = P.transpose().tocsr()
+        if method in ("power", "anderson", "eigs"):
+            PT = partitioned(PT, threads)
+    n = P.shape[0]
+    if x0 is None:
+        x = np.ones(n, dtype=np.float64) / n
+    else:
+        x = np.array(x0, dtype=np.float64)
+        x /= x.sum()
+    history = []
+
+    with stage(collector, "stationary", method=method):
+        if method == "power":
+            x, iterations = _power_iteration(PT, x, maxit, tol, history)
+        elif method == "anderson":
+            x, iterations = _anderson_iteration(PT, x, maxit, tol, history, depth=depth)
+        elif method == "eigs":
+            x, iterations = _eigs_solve(PT, x, maxit, tol, history)
+        else:
+            relax = 1.0 if method == "gauss_seidel" else omega
+            x, iterations = _sor_iteration(PT, x, maxit, tol, history, omega=relax,
+                                           compiled=compiled)
+
+    if collector is not None:
+        # Contadores con el nombre de la etapa: los productos con P^T no se mezclan
+        # con los de A del solver, y los barridos SOR no son productos
+        if method in ("gauss_seidel", "sor"):
+            collector.count("stationary.sweep", iterations)
+        else:
+            collector.count("stationary.matvec", iterations)
+        for value in history:
+            collector.residual(value, stage="stationary")
+
+    if return_info:
+        residual = history[-1] if history else np.inf
+        return x, {
+            "method": method,
+            "iterations": iterations,
+            "residual": residual,
+            "residual_history": history,
+            "converged": residual < tol,
+            "time": time.perf_counter() - start,
+        }
     return x
 
 
+def replace_csr_rows(A, rows, new_rows):
+    """
+    Reemplaza las filas `rows` de la matriz CSR `A` por las de `new_rows`
+    (CSR de len(rows) x n), modificando el objeto A.
+
+    Si cada fila conserva su patrón de dispersión solo se sobrescriben los
+    valores (costo proporcional a la actualización); si no, se reescriben los
+    arreglos CSR en O(nnz). Retorna el cambio (nuevas - antiguas) como CSR
+    de len(rows) x n.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    new_rows = sp.csr_matrix(new_rows, dtype=A.dtype)
+    new_rows.sum_duplicates()
+    A.sum_duplicates()
+    old_rows = A[rows]
+    delta = (new_rows - old_rows).tocsr()
+
+    new_counts = np.diff(new_rows.indptr)
+    old_counts = A.indptr[rows + 1] - A.indptr[rows]
+    same_pattern = (
+        np.array_equal(new_counts, old_counts)
+        and np.array_equal(new_rows.indices, old_rows.indices)
+    )
+    if same_pattern:
+        # Posiciones de las filas afectadas dentro de A.data
+        offsets = np.arange(new_rows.nnz) - np.repeat(new_rows.indptr[:-1], new_counts)
+        positions = np.repeat(A.indptr[rows], new_counts) + offsets
+        A.data[positions] = new_rows.data
+        return delta
+
+    n = A.shape[0]
+    counts = np.diff(A.indptr)
+    changed = np.zeros(n, dtype=np.bool_)
+    changed[rows] = True
+    counts[rows] = new_counts
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=A.indices.dtype)
+    data = np.empty(indptr[-1], dtype=A.data.dtype)
+
+    row_ids = np.repeat(np.arange(n), np.diff(A.indptr))
+    keep = ~changed[row_ids]
+    kept_pos = np.flatnonzero(keep)
+    target = kept_pos - A.indptr[row_ids[kept_pos]] + indptr[row_ids[kept_pos]]
+    indices[target] = A.indices[kept_pos]
+    data[target] = A.data[kept_pos]
+
+    offsets = np.arange(new_rows.nnz) - np.repeat(new_rows.indptr[:-1], new_counts)
+    target = np.repeat(indptr[rows], new_counts) + offsets
+    indices[target] = new_rows.indices
+    data[target] = new_rows.data
+
+    if indptr[-1] <= np.iinfo(np.int32).max:
+        indptr = indptr.astype(A.indices.dtype)
+    A.data, A.indices, A.indptr = data, indices, indptr
+    return delta
+
+
 def build_singular_system(P):
-    """Construye el sistema singular (I - P) de forma eficiente."""
+    """
+    Construye el sistema singular (I - P) de forma eficiente.
+    Para una MemmapCSR retorna el LinearOperator I - P (sin escribir otra matriz).
+    """
+    if isinstance(P, MemmapCSR):
+        return singular_operator(P)
     n = P.shape[0]
     I = sp.identity(n, format='csr', dtype=np.float64)
     # Operación más eficiente aprovechando que P ya es CSR
@@ -0,0 +1,208 @@
+import json
+import os
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from .kernels import NUMBA_AVAILABLE, jit
+
+# Entradas por bloque de filas: acota la memoria de trabajo de cada producto
+DEFAULT_BLOCK_NNZ = 1 << 22
+
+_FILES = ("indptr", "indices", "data")
+
+
+@jit(nopython=True, cache=True)
+def _scatter_block(indptr, indices, data, x, out):
+    """out += B^T x para un bloque de filas B (indptr local), sin vector temporal de tamaño n."""
+    for i in range(x.shape[0]):
+        xi = x[i]
+        if xi == 0.0:
+            continue
+        for k in range(indptr[i], indptr[i + 1]):
+            out[indices[k]] += data[k] * xi
+
+
+class MemmapCSR(spla.LinearOperator):
+    """
+    Matriz CSR cuyos arreglos `indptr`/`indices`/`data` viven en disco (np.memmap).
+
+    Los productos recorren la matriz por bloques de filas consecutivas con unas
+    `block_nnz` entradas cada uno, de modo que la lectura es secuencial y la
+    memoria de trabajo no depende del nnz total: solo se mantienen en memoria
+    los vectores (x, y) y el bloque en curso, que el sistema operativo puede
+    desalojar. Es un LinearOperator, así que sirve directamente para LGMRES;
+    `stationary_distribution_power` y `build_singular_system` también lo aceptan.
+    """
+
+    def __init__(self, indptr, indices, data, shape, block_nnz=DEFAULT_BLOCK_NNZ, path=None):
+        super().__init__(dtype=np.dtype(data.dtype), shape=tuple(int(s) for s in shape))
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.block_nnz = max(int(block_nnz), 1)
+        self.path = path
+        # Cortes de filas con nnz balanceado (una fila más larga que el bloque va sola)
+        targets = np.arange(0, self.nnz, self.block_nnz)
+        starts = np.searchsorted(indptr, targets, side="right") - 1
+        self._bounds = np.unique(np.concatenate([[0], starts, [self.shape[0]]]))
+
+    @property
+    def nnz(self):
+        return int(self.indptr[-1])
+
+    def row_blocks(self):
+        """Itera (inicio, fin, bloque CSR) sobre las filas, en orden y sin copiar los datos."""
+        n_cols = self.shape[1]
+        for start, stop in zip(self._bounds[:-1], self._bounds[1:]):
+            ptr = np.asarray(self.indptr[start:stop + 1])
+            lo, hi = int(ptr[0]), int(ptr[-1])
+            block = sp.csr_matrix(
+                (np.asarray(self.data[lo:hi]), np.asarray(self.indices[lo:hi]), ptr - lo),
+                shape=(int(stop - start), n_cols),
+            )
+            yield int(start), int(stop), block
+
+    def matvec_into(self, x, out):
+        """out <- A x, bloque a bloque."""
+        for start, stop, block in self.row_blocks():
+            out[start:stop] = block @ x
+        return out
+
+    def rmatvec_into(self, x, out):
+        """out <- A^T x acumulando cada bloque de filas sobre `out`."""
+        out.fill(0.0)
+        for start, stop, block in self.row_blocks():
+            xs = x[start:stop]
+            if NUMBA_AVAILABLE:
+                _scatter_block(block.indptr, block.indices, block.data, xs, out)
+            else:
+                out += block.T @ xs
+        return out
+
+    def tocsr(self):
+        """Carga la matriz completa en memoria (solo para matrices que caben)."""
+        return sp.csr_matrix(
+            (np.array(self.data), np.array(self.indices), np.array(self.indptr)), shape=self.shape
+        )
+
+    def _matvec(self, x):
+        x = np.asarray(x).ravel()
+        out = np.empty(self.shape[0], dtype=np.result_type(self.dtype, x.dtype))
+        return self.matvec_into(x, out)
+
+    def _rmatvec(self, x):
+        x = np.asarray(x).ravel()
+        out = np.empty(self.shape[1], dtype=np.result_type(self.dtype, x.dtype))
+        return self.rmatvec_into(x, out)
+
+    def _matmat(self, X):
+        out = np.empty((self.shape[0], X.shape[1]), dtype=np.result_type(self.dtype, X.dtype))
+        for start, stop, block in self.row_blocks():
+            out[start:stop] = block @ X
+        return out
+
+    def _transpose(self):
+        return MemmapTranspose(self)
+
+    _adjoint = _transpose
+
+
+class MemmapTranspose(spla.LinearOperator):
+    """Vista A^T de una MemmapCSR (recorre A por filas, sin construir la transpuesta)."""
+
+    def __init__(self, A):
+        super().__init__(dtype=A.dtype, shape=(A.shape[1], A.shape[0]))
+        self.A = A
+
+    def matvec_into(self, x, out):
+        return self.A.rmatvec_into(x, out)
+
+    def _matvec(self, x):
+        return self.A._rmatvec(x)
+
+    def _rmatvec(self, x):
+        return self.A._matvec(x)
+
+    def _transpose(self):
+        return self.A
+
+    _adjoint = _transpose
+
+
+def singular_operator(P):
+    """Operador I - P sobre una MemmapCSR, sin materializar la diferencia en disco."""
+    def matvec(x):
+        x = np.asarray(x).ravel()
+        return x - P.matvec(x)
+
+    def rmatvec(x):
+        x = np.asarray(x).ravel()
+        return x - P.rmatvec(x)
+
+    return spla.LinearOperator(P.shape, matvec=matvec, rmatvec=rmatvec, dtype=P.dtype)
+
+
+def write_memmap_csr(path, row_blocks, n_cols, dtype=np.float64):
+    """
+    Escribe en el directorio `path` una CSR a partir de bloques de filas
+    consecutivos (matrices sparse k x n_cols), sin reunirlos en memoria.
+    Los arreglos se guardan como binarios crudos junto a `meta.json`.
+    Retorna la MemmapCSR abierta en modo lectura.
+    """
+    os.makedirs(path, exist_ok=True)
+    index_dtype = np.int32 if n_cols < np.iinfo(np.int32).max else np.int64
+    n_rows = 0
+    nnz = 0
+    handles = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in _FILES}
+    try:
+        np.zeros(1, dtype=np.int64).tofile(handles["indptr"])
+        for block in row_blocks:
+            block = sp.csr_matrix(block, dtype=dtype)
+            if block.shape[1] != n_cols:
+                raise ValueError("todos los bloques deben tener n_cols columnas")
+            block.sum_duplicates()
+            (block.indptr[1:].astype(np.int64) + nnz).tofile(handles["indptr"])
+            block.indices.astype(index_dtype).tofile(handles["indices"])
+            block.data.tofile(handles["data"])
+            n_rows += block.shape[0]
+            nnz += block.nnz
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    meta = {
+        "shape": [n_rows, int(n_cols)],
+        "nnz": nnz,
+        "indptr_dtype": "int64",
+        "indices_dtype": np.dtype(index_dtype).name,
+        "data_dtype": np.dtype(dtype).name,
+    }
+    with open(os.path.join(path, "meta.json"), "w") as fh:
+        json.dump(meta, fh)
+    return open_memmap_csr(path)
+
+
+def save_memmap_csr(A, path, block_rows=1 << 20):
+    """Guarda una matriz sparse en memoria en el formato de `open_memmap_csr`."""
+    A = sp.csr_matrix(A)
+    blocks = (A[start:start + block_rows] for start in range(0, A.shape[0], block_rows))
+    return write_memmap_csr(path, blocks, A.shape[1], dtype=A.dtype)
+
+
+def open_memmap_csr(path, block_nnz=DEFAULT_BLOCK_NNZ):
+    """Abre en modo lectura una CSR escrita con `write_memmap_csr`/`save_memmap_csr`."""
+    with open(os.path.join(path, "meta.json")) as fh:
+        meta = json.load(fh)
+    n_rows, _ = meta["shape"]
+    lengths = {"indptr": n_rows + 1, "indices": meta["nnz"], "data": meta["nnz"]}
+    arrays = {}
+    for name in _FILES:
+        dtype = np.dtype(meta[f"{name}_dtype"])
+        if lengths[name] == 0:
+            arrays[name] = np.empty(0, dtype=dtype)  # np.memmap no admite archivos vacíos
+        else:
+            arrays[name] = np.memmap(
+                os.path.join(path, f"{name}.bin"), dtype=dtype, mode="r", shape=(lengths[name],)
+            )
+    return MemmapCSR(arrays["indptr"], arrays["indices"], arrays["data"], meta["shape"],
+                     block_nnz=block_nnz, path=path)
@@ -0,0 +1,157 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+import os
+import numpy as np
+import scipy.sparse as sp
+from .config import limit_threads
+from .markov import build_transition_matrix, build_singular_system
+from .hierarchy import build_amg_hierarchy
+from .preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+from .solvers import solve_singular_system_lgmres
+
+
+def _share_array(arr):
+    """Copia un arreglo a un bloque de memoria compartida. Retorna (bloque, descriptor)."""
+    arr = np.ascontiguousarray(arr)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+    view[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach_array(descriptor):
+    """Adjunta un bloque compartido creado por el proceso padre (sin copiar los datos)."""
+    name, shape, dtype = descriptor
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: el registro del hijo va al mismo resource_tracker que el
+        # del padre (un conjunto, sin duplicados); el padre lo retira al liberar
+        # el bloque. Desregistrarlo aquí dejaba al padre sin entrada (KeyError).
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _share_chain(P, b):
+    """Publica P (densa o CSR) y b en memoria compartida."""
+    blocks = []
+    if sp.issparse(P):
+        P = sp.csr_matrix(P, dtype=np.float64)
+        arrays = {"data": P.data, "indices": P.indices, "indptr": P.indptr}
+        layout = ("csr", P.shape)
+    else:
+        arrays = {"dense": np.asarray(P, dtype=np.float64)}
+        layout = ("dense", None)
+    arrays["b"] = np.asarray(b, dtype=np.float64)
+
+    descriptors = {}
+    for key, arr in arrays.items():
+        shm, descriptors[key] = _share_array(arr)
+        blocks.append(shm)
+    return blocks, (layout, descriptors)
+
+
+# Controlador de threadpoolctl del proceso trabajador (debe sobrevivir a la inicialización)
+_THREAD_LIMITER = None
+
+
+def _init_worker(threads):
+    """Inicializador de cada proceso: limita los hilos de BLAS para no sobresuscribir núcleos."""
+    global _THREAD_LIMITER
+    _THREAD_LIMITER = limit_threads(threads)
+
+
+def _solve_shared(index, shared, preconditioner, options):
+    """Ejecuta el pipeline completo sobre una cadena publicada en memoria compartida."""
+    (kind, shape), descriptors = shared
+    blocks, arrays = [], {}
+    for key, descriptor in descriptors.items():
+        shm, arrays[key] = _attach_array(descriptor)
+        blocks.append(shm)
+    try:
+        if kind == "csr":
+            P = sp.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape)
+        else:
+            P = build_transition_matrix(arrays["dense"])
+        A = build_singular_system(P)
+
+        M = None
+        if preconditioner == "amg":
+            hierarchy = build_amg_hierarchy(A, **options.get("hierarchy", {}))
+            M = AMGPreconditioner(hierarchy, **options.get("preconditioner", {})).as_linear_operator()
+        elif preconditioner == "svd":
+            M = SVDBasedPreconditioner(A, **options.get("preconditioner", {})).as_linear_operator()
+        elif preconditioner is not None:
+            raise ValueError(f"precondicionador desconocido: {preconditioner!r}")
+
+        x, info = solve_singular_system_lgmres(A, arrays["b"], M=M, **options.get("solver", {}))
+        return index, np.array(x), info
+    finally:
+        # Soltar todas las vistas antes de cerrar los bloques compartidos
+        arrays = P = A = M = None
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # Aún hay vistas vivas; el bloque se libera al recolectarlas
+
+
+def solve_many(chains, workers=None, threads_per_worker=1, preconditioner="amg",
+               hierarchy_options=None, preconditioner_options=None, tol=1e-10,
+               maxit=10000, max_pending=None):
+    """
+    Resuelve (I - P) x = b para muchas cadenas independientes en un pool de procesos.
+
+    `chains` es un iterable de pares (P, b) con P densa (se normaliza con
+    build_transition_matrix) o sparse ya estocástica. Las matrices viajan a los
+    procesos por memoria compartida, sin serializarse, y cada proceso limita sus
+    hilos de BLAS a `threads_per_worker`. Es un generador que entrega
+    (índice, x, info) a medida que cada solución termina; como mucho
+    `max_pending` cadenas están publicadas a la vez.
+
+    Los procesos se crean con "spawn": un fork desde un proceso con hilos vivos
+    (kernels paralelos de Numba, BLAS) puede heredar sus cerrojos y bloquearse.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    options = {
+        "hierarchy": dict({"max_levels": 10, "max_coarse": 200}, **(hierarchy_options or {})),
+        "preconditioner": preconditioner_options or {},
+        "solver": {"tol": tol, "maxit": maxit},
+    }
+
+    pending = {}
+    chains = enumerate(chains)
+    exhausted = False
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as pool:
+        try:
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_pending:
+                    try:
+                        index, (P, b) = next(chains)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    blocks, shared = _share_chain(P, b)
+                    future = pool.submit(_solve_shared, index, shared, preconditioner, options)
+                    pending[future] = blocks
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    blocks = pending.pop(future)
+                    try:
+                        yield future.result()
+                    finally:
+                        for shm in blocks:
+                            shm.close()
+                            shm.unlink()
+        finally:
+            # Liberar los bloques de las tareas que no llegaron a consumirse
+            for blocks in pending.values():
+                for shm in blocks:
+                    shm.close()
+                    shm.unlink()
@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from .kernels import NUMBA_AVAILABLE, jit
+
+# Un pool por número de hilos, compartido por todos los operadores del proceso
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool(threads):
+    with _POOLS_LOCK:
+        pool = _POOLS.get(threads)
+        if pool is None:
+            pool = _POOLS[threads] = ThreadPoolExecutor(
+                max_workers=threads, thread_name_prefix="amgmc-matvec"
+            )
+        return pool
+
+
+@jit(nopython=True, nogil=True, cache=True)
+def _csr_matvec_rows(indptr, indices, data, x, out, start, stop):
+    """out[start:stop] <- (A x)[start:stop] sin el GIL."""
+    for i in range(start, stop):
+        s = 0.0
+        for k in range(indptr[i], indptr[i + 1]):
+            s += data[k] * x[indices[k]]
+        out[i] = s
+
+
+def nnz_balanced_bounds(indptr, parts):
+    """Cortes de filas en `parts` bloques consecutivos con nnz similar."""
+    n = indptr.shape[0] - 1
+    targets = np.linspace(0, indptr[-1], parts + 1)[1:-1]
+    inner = np.searchsorted(indptr, targets, side="left")
+    return np.unique(np.concatenate([[0], np.clip(inner, 0, n), [n]])).astype(np.int64)
+
+
+class PartitionedOperator(spla.LinearOperator):
+    """
+    A x por bloques de filas con nnz balanceado, repartidos en un pool de hilos.
+
+    Cada bloque escribe su tramo de la salida, así que no hay sincronización
+    más allá de esperar a los bloques. Con Numba los bloques usan un kernel
+    `nogil`; sin él, el producto CSR de SciPy sobre una vista de las filas (que
+    también libera el GIL). Los arreglos de A se leen en cada producto, de modo
+    que las modificaciones in-place de A (`replace_csr_rows`) se ven sin
+    reconstruir el operador; los cortes se recalculan si cambia `A.indptr`.
+    """
+
+    def __init__(self, A, threads=None, blocks=None):
+        A = A if sp.issparse(A) and A.format == "csr" else sp.csr_matrix(A)
+        super().__init__(dtype=A.dtype, shape=A.shape)
+        self.A = A
+        self.threads = max(1, int(threads or os.cpu_count() or 1))
+        self.blocks = max(1, int(blocks or self.threads))
+        self._indptr = None
+        self._bounds = None
+
+    def _partition(self):
+        if self._indptr is not self.A.indptr:
+            self._indptr = self.A.indptr
+            self._bounds = nnz_balanced_bounds(self.A.indptr, self.blocks)
+        return self._bounds
+
+    def _row_view(self, start, stop):
+        A = self.A
+        lo, hi = A.indptr[start], A.indptr[stop]
+        return sp.csr_matrix(
+            (A.data[lo:hi], A.indices[lo:hi], A.indptr[start:stop + 1] - lo),
+            shape=(stop - start, A.shape[1]),
+        )
+
+    def _run(self, task):
+        bounds = self._partition()
+        ranges = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        if self.threads == 1 or len(ranges) == 1:
+            for start, stop in ranges:
+                task(start, stop)
+            return
+        for future in [_pool(self.threads).submit(task, start, stop) for start, stop in ranges]:
+            future.result()
+
+    def matvec_into(self, x, out):
+        """out <- A x sin reservar la salida."""
+        A = self.A
+        x = np.asarray(x)
+        if NUMBA_AVAILABLE and x.dtype == A.dtype == out.dtype:
+            def task(start, stop):
+                _csr_matvec_rows(A.indptr, A.indices, A.data, x, out, start, stop)
+        else:
+            def task(start, stop):
+                out[start:stop] = self._row_view(start, stop) @ x
+        self._run(task)
+        return out
+
+    def _matvec(self, x):
+        x = np.asarray(x).ravel()
+        out = np.empty(self.shape[0], dtype=np.result_type(self.dtype, x.dtype))
+        return self.matvec_into(x, out)
+
+    def _matmat(self, X):
+        out = np.empty((self.shape[0], X.shape[1]), dtype=np.result_type(self.dtype, X.dtype))
+
+        def task(start, stop):
+            out[start:stop] = self._row_view(start, stop) @ X
+
+        self._run(task)
+        return out
+
+    def _rmatvec(self, x):
+        return self.A.T @ x
+
+    def _adjoint(self):
+        return PartitionedOperator(self.A.T.tocsr(), self.threads, self.blocks)
+
+    _transpose = _adjoint
+
+
+def partitioned(A, threads=None, blocks=None):
+    """`PartitionedOperator(A)`; si `threads` es None o A no es sparse retorna A sin cambios."""
+    if threads is None or not sp.issparse(A):
+        return A
+    return PartitionedOperator(A, threads=threads, blocks=blocks)
@@ -2,16 +2,82 @@ from dataclasses import dataclass
 import numpy as np
 import scipy.sparse as sp
 import scipy.sparse.linalg as spla
+from .hierarchy import AMGHierarchy
+from .partitioned import partitioned
+from .smoothers import make_smoother
 
 @dataclass
 class SVDBasedPreconditioner:
+    """
+    Precondicionador basado en SVD.
+
+    - mode="full": pseudo-inversa densa completa (solo para cadenas pequeñas).
+    - mode="truncated": nunca densifica A. Calcula los k modos singulares más
+      lentos por iteración de subespacio inversa (LU sparse de A desplazada,
+      descartada tras la construcción) y los combina con un precondicionador
+      base barato B (Jacobi o ILU), que se encarga del resto del espectro:
+
+          M^{-1} v = Q v + (I - Q A) B^{-1} (v - U U^T v),   Q = V S^+ U^T
+
+      La construcción y la aplicación requieren memoria O(n k).
+
+    Con `dtype=np.float32` los factores y la base se almacenan y aplican en
+    simple precisión (para usarse dentro de un refinamiento iterativo en float64).
+    """
     A: sp.csr_matrix
     k: int = 4
     reg: float = 1e-8
+    mode: str = "full"
+    base: str = "jacobi"
+    oversample: int = 8
+    power_iterations: int = 4
+    seed: int = 42
+    dtype: object = np.float64
     _A_pinv: np.ndarray = None  # Cache de la pseudo-inversa
+    _U: np.ndarray = None
+    _s_inv: np.ndarray = None
+    _V: np.ndarray = None
+    _null: np.ndarray = None
+    _base_solve: object = None
     
     def __post_init__(self):
-        """Pre-calcula la pseudo-inversa para mejor rendimiento."""
+        """Pre-calcula la pseudo-inversa (o sus factores truncados) para mejor rendimiento."""
+        self.dtype = np.dtype(self.dtype)
+        if self.mode == "full":
+            if self._A_pinv is None:
+                self._setup_full()
+        elif self.mode == "truncated":
+            if self._U is None:
+                self._setup_truncated()
+            else:
+                # Factores restaurados (p. ej. desde caché): solo se rehace la base barata
+                self._base_solve = self._setup_base()
+        else:
+            raise ValueError(f"modo desconocido: {self.mode!r}")
+        if self.dtype != np.float64:
+            self._cast_factors()
+
+    def factors(self):
+        """Arreglos costosos de la construcción (para caché); se restauran con los campos `_`."""
+        if self.mode == "full":
+            return {"A_pinv": self._A_pinv}
+        factors = {"U": self._U, "s_inv": self._s_inv, "V": self._V}
+        if self._null is not None:
+            factors["null"] = self._null
+        return factors
+
+    def _cast_factors(self):
+        """Almacena A y los factores densos en `dtype` (la construcción se hace en float64)."""
+        self.A = sp.csr_matrix(self.A).astype(self.dtype)
+        for name in ("_A_pinv", "_U", "_s_inv", "_V", "_null"):
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, np.ascontiguousarray(value, dtype=self.dtype))
+        if self.mode == "truncated":
+            self._base_solve = self._setup_base()
+
+    def _setup_full(self):
+        """Pseudo-inversa densa completa (O(n^2) memoria, O(n^3) tiempo)."""
         A_dense = self.A.toarray()
         
         # SVD con mejores opciones de rendimiento
@@ -22,10 +88,96 @@ class SVDBasedPreconditioner:
         
         # Pre-cálculo de la pseudo-inversa (más eficiente que recalcular cada vez)
         self._A_pinv = (Vt.T * s_inv) @ U.T
-    
+
+    def _setup_base(self):
+        """Precondicionador base B^{-1}: Jacobi o ILU de A ligeramente desplazada."""
+        A = sp.csr_matrix(self.A)
+        if self.base == "jacobi":
+            d = A.diagonal()
+            d_inv = np.where(np.abs(d) > self.reg, 1.0 / np.where(d == 0, 1.0, d), 0.0)
+            d_inv = d_inv.astype(A.dtype)
+
+            def jacobi(v):
+                return d_inv[:, None] * v if v.ndim == 2 else d_inv * v
+            return jacobi
+        if self.base == "ilu":
+            # El desplazamiento evita el pivote nulo del sistema singular I - P
+            shifted = (A + self.reg * sp.identity(A.shape[0], format="csr", dtype=A.dtype)).tocsc()
+            ilu = spla.spilu(shifted)
+            return ilu.solve
+        raise ValueError(f"precondicionador base desconocido: {self.base!r}")
+
+    def _right_null(self, A):
+        """Vector de unos normalizado si es núcleo derecho de A (sistemas I - P), si no None."""
+        n = A.shape[0]
+        ones = np.full(n, 1.0 / np.sqrt(n))
+        if np.linalg.norm(A @ ones) <= np.sqrt(self.reg) * max(spla.norm(A, 1), 1.0):
+            return ones[:, None]
+        return None
+
+    def _slow_subspace(self, null):
+        """
+        Base ortonormal (n x (k + oversample)) de los modos singulares lentos de A.
+
+        Iteración de subespacio inversa sobre A^T A: Y <- (A + reg I)^{-1}
+        (A + reg I)^{-T} Y con una factorización LU sparse del sistema
+        desplazado, que solo se usa durante la construcción. Cada iteración
+        reduce las componentes de los modos rápidos en (sigma_i / sigma_j)^2, así
+        que unas pocas bastan para los k valores singulares más pequeños. El
+        núcleo conocido (`null`) se proyecta fuera en cada paso: de lo contrario
+        se amplifica en 1/reg^2 y arrastra a los demás modos al redondeo.
+        """
+        A = sp.csr_matrix(self.A, dtype=np.float64)
+        n = A.shape[0]
+        k = min(self.k, n - 2)
+        # El desplazamiento evita el pivote nulo del sistema singular I - P
+        lu = spla.splu((A + self.reg * sp.identity(n, format="csr")).tocsc())
+
+        def deflate(Y):
+            if null is not None:
+                Y -= null @ (null.T @ Y)
+            return np.linalg.qr(Y)[0]
+
+        rng = np.random.default_rng(self.seed)
+        Y = deflate(rng.standard_normal((n, min(k + self.oversample, n - 1))))
+        for _ in range(self.power_iterations):
+            Y = deflate(lu.solve(lu.solve(Y, trans="T")))
+        return Y
+
+    def _setup_truncated(self):
+        """Factores truncados U, S^+, V con A V = U S sobre el subespacio lento."""
+        self._base_solve = self._setup_base()
+        null = self._right_null(sp.csr_matrix(self.A))
+        Z = self._slow_subspace(null)
+        # SVD delgada de A Z: A (Z W) = U S, con V = Z W
+        U, s, Wt = np.linalg.svd(self.A @ Z, full_matrices=False)
+        V = Z @ Wt.T
+        k = min(self.k, s.shape[0])
+        # Conservar los k modos con valores singulares más pequeños
+        U, s, V = U[:, -k:], s[-k:], V[:, -k:]
+        self._U = np.ascontiguousarray(U)
+        self._V = np.ascontiguousarray(V)
+        self._s_inv = np.where(s > self.reg, 1.0 / np.where(s > 0, s, 1.0), 0.0)
+        zero = self._s_inv == 0
+        if null is not None:
+            self._null = np.ascontiguousarray(null)
+        elif np.any(zero):
+            self._null = np.ascontiguousarray(V[:, zero])
+
     def _approx_inverse_with_svd(self, b):
-        """Aplica la pseudo-inversa pre-calculada."""
-        return self._A_pinv @ b
+        """Aplica la pseudo-inversa pre-calculada o su aproximación truncada."""
+        if self._A_pinv is not None:
+            return self._A_pinv @ b
+        s_inv = self._s_inv[:, None] if b.ndim == 2 else self._s_inv
+        c = self._U.T @ b
+        y = self._base_solve(b - self._U @ c)
+        # Proyección oblicua (I - Q A) con Q = V S^+ U^T
+        y -= self._V @ (s_inv * (self._U.T @ (self.A @ y)))
+        # Las direcciones del núcleo de A (valores singulares descartados) se eliminan
+        if self._null is not None:
+            y -= self._null @ (self._null.T @ y)
+        y += self._V @ (s_inv * c)
+        return y
 
     def as_linear_operator(self):
         """Retorna un operador lineal optimizado para usar como precondicionador."""
@@ -33,11 +185,167 @@ class SVDBasedPreconditioner:
         
         def matvec(v):
             # Conversión eficiente a array
-            v_arr = np.asarray(v, dtype=np.float64)
+            v_arr = np.asarray(v, dtype=self.dtype).ravel()
             return self._approx_inverse_with_svd(v_arr)
         
+        def matmat(V):
+            # Bloques de vectores en un solo producto (varios lados derechos)
+            return self._approx_inverse_with_svd(np.asarray(V, dtype=self.dtype))
+        
         return spla.LinearOperator(
             (n, n), 
             matvec=matvec, 
-            dtype=np.float64
+            matmat=matmat,
+            dtype=self.dtype
+        )
+
+
+@dataclass
+class AMGPreconditioner:
+    """
+    Precondicionador multigrid que recorre los niveles de un AMGHierarchy con
+    ciclos V, W o F. Solo el nivel más grueso se resuelve con una pseudo-inversa
+    densa; el resto del trabajo son productos sparse y barridos del suavizador,
+    por lo que el costo por aplicación crece linealmente con nnz.
+
+    El ciclo trabaja en el tipo de los operadores de la jerarquía (ver
+    `build_amg_hierarchy(dtype=...)`). Con `threads` los productos con los
+    operadores de cada nivel y los residuos de los suavizadores registrados se
+    reparten por bloques de filas en un pool de hilos.
+    """
+    hierarchy: AMGHierarchy
+    cycle: str = "V"
+    smoother: object = "jacobi"
+    presmooth: int = 1
+    postsmooth: int = 1
+    smoother_options: dict = None
+    max_coarse_direct: int = 2000
+    threads: int = None
+    _smoothers: list = None
+    _operators: list = None
+    _coarse_pinv: np.ndarray = None
+
+    def __post_init__(self):
+        """Prepara los suavizadores por nivel y la pseudo-inversa del nivel grueso."""
+        if self.cycle not in ("V", "W", "F"):
+            raise ValueError(f"ciclo desconocido: {self.cycle!r}")
+        levels = self.hierarchy.levels
+        options = self._smoother_options()
+        self._smoothers = [
+            make_smoother(self.smoother, level.A, **options) for level in levels[:-1]
+        ]
+        self._operators = [partitioned(level.A, self.threads) for level in levels[:-1]]
+        # Una pseudo-inversa ya calculada (p. ej. desde caché) se reutiliza tal cual
+        if self._coarse_pinv is not None:
+            return
+        A_coarse = levels[-1].A
+        if A_coarse.shape[0] > self.max_coarse_direct:
+            raise ValueError(
+                f"el nivel más grueso tiene {A_coarse.shape[0]} estados "
+                f"(máximo {self.max_coarse_direct}); aumente max_levels al construir la jerarquía"
+            )
+        self._coarse_pinv = self._pinv(A_coarse)
+
+    @property
+    def dtype(self):
+        return self.hierarchy.levels[0].A.dtype
+
+    def _smoother_options(self):
+        options = dict(self.smoother_options or {})
+        if self.threads is not None and not callable(self.smoother):
+            options.setdefault("threads", self.threads)
+        return options
+
+    def _roundoff_level(self):
+        """
+        Error de redondeo absoluto esperado en los valores singulares del nivel
+        grueso: cada entrada gruesa suma las de todos los estados finos de su
+        agregado, así que el vector del núcleo queda en ~eps * (estados finos
+        por estado grueso) * max_i sum_j |a_ij| del nivel fino.
+        """
+        levels = self.hierarchy.levels
+        fine = sp.csr_matrix(levels[0].A)
+        counts = np.ones(fine.shape[0])
+        for level in levels[1:]:
+            if level.aggregates is None:
+                counts = np.full(level.A.shape[0], fine.shape[0] / level.A.shape[0])
+                continue
+            counts = np.bincount(level.aggregates, weights=counts, minlength=level.A.shape[0])
+        row_scale = float(abs(fine).sum(axis=1).max()) if fine.nnz else 0.0
+        return np.finfo(self.dtype).eps * float(counts.max()) * row_scale
+
+    def _pinv(self, A_coarse):
+        """
+        Pseudo-inversa del nivel grueso calculada en float64 y guardada en el tipo
+        de la jerarquía. Se descartan los valores singulares por debajo del
+        redondeo acumulado en el producto de Galerkin: el núcleo de I - P ya no
+        es exactamente singular en el nivel grueso y invertirlo amplifica ese
+        ruido en ~1/eps.
+        """
+        A_dense = A_coarse.toarray().astype(np.float64)
+        U, sigma, Vt = np.linalg.svd(A_dense)
+        # En simple precisión las filas ya no suman exactamente cero: se usa su eps
+        rcond = np.finfo(self.dtype).eps * A_dense.shape[0]
+        cutoff = max(rcond * sigma[0] if sigma.size else 0.0, self._roundoff_level())
+        keep = sigma > cutoff
+        pinv = (Vt[keep].T / sigma[keep]) @ U[:, keep].T
+        return pinv.astype(self.dtype)
+
+    def factors(self):
+        """Arreglos costosos de la construcción (para caché); se restauran con `_coarse_pinv=`."""
+        return {"coarse_pinv": self._coarse_pinv}
+
+    def refresh_rows(self, level_rows):
+        """
+        Actualiza el precondicionador tras modificar in-place filas de los
+        operadores de la jerarquía. `level_rows[l]` son las filas cambiadas del
+        nivel l; los suavizadores se refrescan solo en esas filas y la
+        pseudo-inversa gruesa se recalcula si el último nivel cambió.
+        """
+        levels = self.hierarchy.levels
+        for lvl, rows in enumerate(level_rows[:len(levels) - 1]):
+            if len(rows) and hasattr(self._smoothers[lvl], "refresh_rows"):
+                self._smoothers[lvl].refresh_rows(rows)
+            elif len(rows):
+                options = self._smoother_options()
+                self._smoothers[lvl] = make_smoother(self.smoother, levels[lvl].A, **options)
+        if len(level_rows) >= len(levels) and len(level_rows[len(levels) - 1]):
+            self._coarse_pinv = self._pinv(levels[-1].A)
+
+    def _cycle(self, lvl, b, x=None, cycle=None):
+        """Aplica un ciclo multigrid desde el nivel `lvl` partiendo de `x`."""
+        cycle = cycle or self.cycle
+        levels = self.hierarchy.levels
+        if lvl == len(levels) - 1:
+            return self._coarse_pinv @ b
+
+        A = self._operators[lvl]
+        smoother = self._smoothers[lvl]
+        if x is None:
+            x = np.zeros_like(b)
+        x = smoother(x, b, self.presmooth)
+
+        coarse = levels[lvl + 1]
+        r_c = coarse.R_op @ (b - A @ x)
+        if cycle == "V":
+            e_c = self._cycle(lvl + 1, r_c, cycle="V")
+        elif cycle == "W":
+            e_c = self._cycle(lvl + 1, r_c, cycle="W")
+            e_c = self._cycle(lvl + 1, r_c, e_c, cycle="W")
+        else:
+            e_c = self._cycle(lvl + 1, r_c, cycle="F")
+            e_c = self._cycle(lvl + 1, r_c, e_c, cycle="V")
+        x += coarse.P_op @ e_c
+
+        return smoother(x, b, self.postsmooth)
+
+    def apply(self, b):
+        """Aplica un ciclo completo a b (vector o bloque n x s) con aproximación inicial nula."""
+        return self._cycle(0, np.asarray(b, dtype=self.dtype))
+
+    def as_linear_operator(self):
+        """Retorna el ciclo multigrid como operador lineal para usar como precondicionador."""
+        n = self.hierarchy.levels[0].A.shape[0]
+        return spla.LinearOperator(
+            (n, n), matvec=self.apply, matmat=self.apply, dtype=self.dtype
         )
@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from .markov import chain_structure
+from .iad import stationary_distribution_iad
+
+
+def _class_stationary(P_class, tol=1e-12, direct_size=50000):
+    """
+    pi de una clase cerrada (irreducible, posiblemente periódica). Hasta
+    `direct_size` estados se resuelve (I - P)^T pi = 0 con una ecuación
+    reemplazada por sum(pi) = 1 (LU sparse); por encima, IAD.
+    """
+    m = P_class.shape[0]
+    if m == 1:
+        return np.ones(1)
+    if m > direct_size:
+        return stationary_distribution_iad(P_class, tol=tol)
+    M = (sp.identity(m, format="csr") - P_class.T).tocsr()
+    M = sp.vstack([M[:-1], sp.csr_matrix(np.ones((1, m)))], format="csc")
+    rhs = np.zeros(m)
+    rhs[-1] = 1.0
+    pi = np.maximum(spla.spsolve(M, rhs), 0.0)
+    return pi / pi.sum()
+
+
+@dataclass
+class LimitingDistributions:
+    """
+    Comportamiento límite de una cadena reducible.
+
+    - `classes[c]`: estados de la clase cerrada c y `stationary[c]` su pi (sobre
+      esos estados, suma 1).
+    - `absorption`: matriz n x K con la probabilidad de terminar en cada clase
+      cerrada partiendo de cada estado (filas de estados recurrentes son
+      indicadoras de su clase).
+    """
+    structure: object
+    classes: list
+    stationary: list
+    absorption: np.ndarray
+
+    def limit(self, x0):
+        """Distribución límite (promedio de Cesàro) partiendo de la distribución x0."""
+        x0 = np.asarray(x0, dtype=np.float64)
+        mass = x0 @ self.absorption
+        out = np.zeros_like(x0)
+        for c, (states, pi) in enumerate(zip(self.classes, self.stationary)):
+            out[states] = mass[c] * pi
+        return out
+
+    def stationary_vector(self, c):
+        """pi de la clase c extendida con ceros a los n estados."""
+        out = np.zeros(self.absorption.shape[0])
+        out[self.classes[c]] = self.stationary[c]
+        return out
+
+
+def _transient_segments(labels, transient):
+    """
+    SCC transitorias en orden topológico inverso (destinos primero), agrupando
+    en un mismo tramo las SCC consecutivas de un solo estado: dentro de un tramo
+    I - Q es triangular inferior y se resuelve por sustitución.
+    """
+    if transient.size == 0:
+        return []
+    order = transient[np.argsort(labels[transient], kind="stable")]
+    sorted_labels = labels[order]
+    cuts = np.flatnonzero(np.diff(sorted_labels)) + 1
+    sccs = np.split(order, cuts)
+    segments = []
+    run = []
+    for scc in sccs:
+        if scc.size == 1:
+            run.append(scc)
+            continue
+        if run:
+            segments.append((np.concatenate(run), True))
+            run = []
+        segments.append((scc, False))
+    if run:
+        segments.append((np.concatenate(run), True))
+    return segments
+
+
+def limiting_distributions(P, tol=1e-12, solver=None, workers=None, direct_size=50000):
+    """
+    Descompone P en SCC en orden topológico y calcula su comportamiento límite:
+    la pi de cada clase cerrada (resueltas por separado, en `workers` hilos si
+    se indica) y las probabilidades de absorción de los estados transitorios
+    por sustitución hacia atrás por bloques sobre el orden de las SCC.
+
+    `solver(P_clase)` permite sustituir el cálculo de pi por clase (por
+    defecto LU sparse hasta `direct_size` estados e IAD por encima). La matriz
+    de absorción es densa n x K (K = número de clases cerradas).
+    """
+    P = sp.csr_matrix(P, dtype=np.float64)
+    structure = chain_structure(P, tol=tol)
+    if not structure.stochastic:
+        raise ValueError("la matriz no es estocástica")
+    n = P.shape[0]
+    classes = structure.closed_classes
+    solve_class = solver or (lambda P_class: _class_stationary(P_class, tol, direct_size))
+    blocks = (P[states][:, states] for states in classes)
+    if workers and len(classes) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            stationary = list(pool.map(solve_class, blocks))
+    else:
+        stationary = [solve_class(block) for block in blocks]
+
+    K = len(classes)
+    absorption = np.zeros((n, K))
+    for c, states in enumerate(classes):
+        absorption[states, c] = 1.0
+
+    # Las etiquetas de Tarjan están en orden topológico inverso: cada SCC solo
+    # tiene aristas hacia SCC de etiqueta menor, ya resueltas
+    for states, triangular in _transient_segments(structure.labels, structure.transient_states):
+        rows = P[states]
+        Q = rows[:, states]
+        # Las filas del tramo en `absorption` aún son cero: rhs solo usa estados resueltos
+        rhs = rows @ absorption
+        M = (sp.identity(states.size, format="csr") - Q).tocsr()
+        if triangular:
+            absorption[states] = spla.spsolve_triangular(M, rhs, lower=True)
+        else:
+            solution = spla.spsolve(M.tocsc(), rhs)
+            absorption[states] = solution.reshape(states.size, K)
+    return LimitingDistributions(structure, classes, stationary, absorption)
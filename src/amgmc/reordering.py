@@ -0,0 +1,137 @@
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from .markov import build_singular_system, chain_structure, stationary_distribution_power
+from .solvers import solve_singular_system_lgmres
+
+ORDERINGS = ("rcm", "bfs", "scc")
+
+
+def _symmetric_pattern(P):
+    """Patrón de P + P^T (sin valores) para los recorridos no dirigidos."""
+    G = sp.csr_matrix((np.ones(P.nnz), P.indices, P.indptr), shape=P.shape)
+    return (G + G.T).tocsr()
+
+
+def _bfs_order(P):
+    """Recorrido en anchura por componente conexa (no dirigida), desde el estado de menor grado."""
+    G = _symmetric_pattern(P)
+    degree = np.diff(G.indptr)
+    n_components, labels = csgraph.connected_components(G, directed=False)
+    parts = []
+    for c in range(n_components):
+        members = np.flatnonzero(labels == c)
+        root = members[np.argmin(degree[members])]
+        order = csgraph.breadth_first_order(G, root, directed=False, return_predecessors=False)
+        parts.append(order)
+    return np.concatenate(parts) if parts else np.arange(0)
+
+
+def _scc_order(P):
+    """
+    Estados agrupados por SCC en orden topológico (fuentes primero): P queda
+    triangular superior por bloques y las clases cerradas al final.
+    """
+    structure = chain_structure(P)
+    # Las etiquetas están en orden topológico inverso (sumideros primero)
+    return np.argsort(-structure.labels.astype(np.int64), kind="stable")
+
+
+def compute_ordering(P, method="rcm"):
+    """
+    Permutación de los estados para mejorar la localidad de los accesos CSR:
+    "rcm" (Cuthill-McKee inverso sobre P + P^T: reduce el ancho de banda),
+    "bfs" (recorrido en anchura) o "scc" (bloques triangulares por SCC).
+    Retorna `perm` tal que el estado nuevo k es el estado original perm[k].
+    """
+    P = sp.csr_matrix(P)
+    if method == "rcm":
+        perm = csgraph.reverse_cuthill_mckee(_symmetric_pattern(P), symmetric_mode=True)
+    elif method == "bfs":
+        perm = _bfs_order(P)
+    elif method == "scc":
+        perm = _scc_order(P)
+    else:
+        raise ValueError(f"reordenamiento desconocido: {method!r}")
+    return np.asarray(perm, dtype=np.int64)
+
+
+@dataclass
+class Reordering:
+    """Permutación simétrica de estados y su inversa."""
+    perm: np.ndarray
+    inverse: np.ndarray = None
+
+    def __post_init__(self):
+        self.perm = np.asarray(self.perm, dtype=np.int64)
+        if self.inverse is None:
+            self.inverse = np.empty_like(self.perm)
+            self.inverse[self.perm] = np.arange(self.perm.shape[0])
+
+    def apply(self, A):
+        """A[perm][:, perm] en CSR (P, I - P o cualquier operador sobre los estados)."""
+        A = sp.csr_matrix(A)
+        A = A[self.perm]
+        # Renumerar columnas en lugar de indexarlas evita una segunda copia con ordenamiento
+        A.indices = self.inverse[A.indices].astype(A.indices.dtype)
+        A.has_sorted_indices = False
+        A.sort_indices()
+        return A
+
+    def to_internal(self, x):
+        """Vector (o bloque n x s) en el orden original -> orden permutado."""
+        return np.asarray(x)[self.perm]
+
+    def to_original(self, y):
+        """Vector (o bloque n x s) en el orden permutado -> orden original."""
+        return np.asarray(y)[self.inverse]
+
+
+@dataclass
+class ReorderedChain:
+    """
+    Cadena con sus estados reordenados para la localidad de caché.
+
+    `P` es la matriz en el orden permutado; todos los operadores derivados
+    (`singular_system`, jerarquías, precondicionadores construidos sobre ella)
+    viven en ese orden. `stationary_distribution` y `solve` reciben y retornan
+    vectores en el orden original de los estados.
+    """
+    P: sp.csr_matrix
+    ordering: Reordering
+    method: str = "rcm"
+
+    @classmethod
+    def from_matrix(cls, P, method="rcm"):
+        ordering = Reordering(compute_ordering(P, method))
+        return cls(P=ordering.apply(P), ordering=ordering, method=method)
+
+    def singular_system(self):
+        return build_singular_system(self.P)
+
+    def stationary_distribution(self, solver=stationary_distribution_power, **options):
+        """pi en el orden original; `solver(P, **options)` se ejecuta sobre la P permutada."""
+        result = solver(self.P, **options)
+        if isinstance(result, tuple):
+            pi, info = result
+            return self.ordering.to_original(pi), info
+        return self.ordering.to_original(result)
+
+    def solve(self, b, A=None, M=None, solver=solve_singular_system_lgmres, **options):
+        """
+        Resuelve (I - P) x = b con b y x en el orden original. `A` y `M` (si se
+        dan) deben estar construidos sobre el orden permutado.
+        """
+        A = self.singular_system() if A is None else A
+        x, info = solver(A, self.ordering.to_internal(b), M=M, **options)
+        return self.ordering.to_original(x), info
+
+
+def bandwidth(A):
+    """Ancho de banda máximo |i - j| de las entradas de A (indicador de localidad)."""
+    A = sp.csr_matrix(A)
+    if A.nnz == 0:
+        return 0
+    rows = np.repeat(np.arange(A.shape[0]), np.diff(A.indptr))
+    return int(np.abs(rows - A.indices).max())
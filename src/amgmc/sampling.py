@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+from .kernels import jit, use_numba
+
+SAMPLING_METHODS = ("alias", "cdf")
+
+
+@jit(nopython=True, cache=True)
+def _build_alias(indptr, data, prob, alias):
+    """
+    Tablas de alias de Vose por fila sobre los arreglos CSR: para la entrada k
+    de la fila i, `prob[k]` es la probabilidad de quedarse con k y `alias[k]`
+    la posición (global) alternativa. O(nnz) en total.
+    """
+    n = indptr.shape[0] - 1
+    max_deg = 0
+    for i in range(n):
+        max_deg = max(max_deg, indptr[i + 1] - indptr[i])
+    small = np.empty(max_deg, dtype=np.int64)
+    large = np.empty(max_deg, dtype=np.int64)
+    for i in range(n):
+        start, stop = indptr[i], indptr[i + 1]
+        deg = stop - start
+        if deg == 0:
+            continue
+        total = 0.0
+        for k in range(start, stop):
+            total += data[k]
+        n_small = 0
+        n_large = 0
+        for k in range(start, stop):
+            prob[k] = data[k] * deg / total
+            alias[k] = k
+            if prob[k] < 1.0:
+                small[n_small] = k
+                n_small += 1
+            else:
+                large[n_large] = k
+                n_large += 1
+        while n_small > 0 and n_large > 0:
+            n_small -= 1
+            s = small[n_small]
+            l = large[n_large - 1]
+            alias[s] = l
+            prob[l] -= 1.0 - prob[s]
+            if prob[l] < 1.0:
+                n_large -= 1
+                small[n_small] = l
+                n_small += 1
+        # Los restantes valen 1 salvo por redondeo
+        for t in range(n_small):
+            prob[small[t]] = 1.0
+        for t in range(n_large):
+            prob[large[t]] = 1.0
+
+
+@jit(nopython=True, cache=True)
+def _walk(indptr, indices, prob, alias, states, steps, burn_in, counts, seed):
+    """Avanza cada caminante `steps` pasos acumulando visitas tras `burn_in`."""
+    np.random.seed(seed)
+    for w in range(states.shape[0]):
+        s = states[w]
+        for t in range(steps):
+            deg = indptr[s + 1] - indptr[s]
+            if deg > 0:
+                k = indptr[s] + int(np.random.random() * deg)
+                if np.random.random() >= prob[k]:
+                    k = alias[k]
+                s = indices[k]
+            if t >= burn_in:
+                counts[s] += 1
+        states[w] = s
+
+
+@dataclass
+class TrajectorySampler:
+    """
+    Simulador de la cadena P con muchos caminantes avanzando a la vez.
+
+    `method="alias"` precalcula tablas de alias por fila (un paso es O(1) por
+    caminante); "cdf" usa la suma acumulada global de `data` con el índice de
+    fila como desplazamiento y un `searchsorted` vectorizado (O(log nnz), sin
+    construcción). Los pasos se vectorizan con NumPy sobre todos los
+    caminantes; con `backend="numba"` (tablas de alias) `run` avanza cada
+    caminante en un kernel compilado que además acumula las visitas.
+    Las filas vacías (matrices subestocásticas) dejan al caminante en su estado.
+    """
+    P: sp.csr_matrix
+    method: str = "alias"
+    backend: str = "scipy"
+    seed: int = 42
+    _prob: np.ndarray = None
+    _alias: np.ndarray = None
+    _cdf: np.ndarray = None
+    _degree: np.ndarray = None
+    _rng: np.random.Generator = None
+
+    def __post_init__(self):
+        if self.method not in SAMPLING_METHODS:
+            raise ValueError(f"método de muestreo desconocido: {self.method!r}")
+        self.P = sp.csr_matrix(self.P, dtype=np.float64)
+        self.P.sum_duplicates()
+        self._rng = np.random.default_rng(self.seed)
+        self._degree = np.diff(self.P.indptr)
+        if self.method == "alias" or use_numba(self.backend):
+            self._prob = np.empty(self.P.nnz, dtype=np.float64)
+            self._alias = np.empty(self.P.nnz, dtype=np.int64)
+            _build_alias(self.P.indptr, self.P.data, self._prob, self._alias)
+        if self.method == "cdf":
+            rows = np.repeat(np.arange(self.P.shape[0]), self._degree)
+            row_sums = np.asarray(self.P.sum(axis=1)).ravel()
+            scale = np.divide(1.0, row_sums, out=np.zeros_like(row_sums), where=row_sums > 0)
+            within = np.cumsum(self.P.data * scale[rows])
+            # Restar el acumulado de las filas anteriores deja cada fila en (i, i + 1]
+            offsets = np.concatenate([[0.0], within])[self.P.indptr[:-1]]
+            self._cdf = rows + (within - np.repeat(offsets, self._degree))
+
+    def step(self, states):
+        """Un paso de todos los caminantes (arreglo de estados, modificado in-place)."""
+        P = self.P
+        moving = self._degree[states] > 0
+        current = states[moving]
+        u = self._rng.random(current.shape[0])
+        if self.method == "alias":
+            k = P.indptr[current] + (u * self._degree[current]).astype(np.int64)
+            reject = self._rng.random(current.shape[0]) >= self._prob[k]
+            k[reject] = self._alias[k[reject]]
+        else:
+            k = np.searchsorted(self._cdf, current + u, side="right")
+            # Protección ante redondeo en los extremos de la fila
+            k = np.clip(k, P.indptr[current], P.indptr[current + 1] - 1)
+        states[moving] = P.indices[k]
+        return states
+
+    def run(self, states, steps, burn_in=0):
+        """
+        Avanza los caminantes `states` (modificados in-place) `steps` pasos y
+        retorna el número de visitas por estado tras los `burn_in` primeros,
+        sin guardar las trayectorias.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        counts = np.zeros(self.P.shape[0], dtype=np.int64)
+        if use_numba(self.backend):
+            seed = int(self._rng.integers(np.iinfo(np.int32).max))
+            _walk(self.P.indptr, self.P.indices, self._prob, self._alias, states, steps,
+                  burn_in, counts, seed)
+            return counts
+        for t in range(steps):
+            self.step(states)
+            if t >= burn_in:
+                counts += np.bincount(states, minlength=self.P.shape[0])
+        return counts
+
+    def empirical_distribution(self, n_walkers, steps, burn_in=0, initial=None):
+        """
+        Distribución empírica de las visitas de `n_walkers` caminantes (estados
+        iniciales uniformes o `initial`), para contrastar con la pi calculada.
+        """
+        if initial is None:
+            states = self._rng.integers(0, self.P.shape[0], size=n_walkers)
+        else:
+            states = np.resize(np.asarray(initial, dtype=np.int64), n_walkers)
+        counts = self.run(states, steps, burn_in=burn_in)
+        return counts / counts.sum()
@@ -0,0 +1,218 @@
+import asyncio
+from dataclasses import dataclass, field
+import hashlib
+import json
+import numpy as np
+import scipy.sparse as sp
+from .cache import matrix_fingerprint
+from .hierarchy import build_amg_hierarchy
+from .markov import build_singular_system, stationary_distribution_power
+from .preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+from .solvers import solve_singular_system_block
+
+
+@dataclass
+class _Chain:
+    """Estado por cadena registrada: operador, precondicionador compartido y lote pendiente."""
+    P: sp.csr_matrix
+    A: sp.csr_matrix
+    M: object = None
+    setup: asyncio.Future = None
+    pending: list = field(default_factory=list)
+    flush: asyncio.TimerHandle = None
+
+
+def _vector_key(b):
+    b = np.ascontiguousarray(b, dtype=np.float64)
+    return hashlib.blake2b(b.view(np.uint8), digest_size=16).hexdigest()
+
+
+class SolveService:
+    """
+    Frente asyncio para resolver (I - P) x = b y calcular pi sin bloquear el lazo.
+
+    - Los cálculos se ejecutan en `executor` (por defecto el del lazo); deben ser
+      hilos, porque el precondicionador se comparte en memoria entre lotes.
+    - Contrapresión: a lo sumo `max_pending` solicitudes admitidas a la vez; las
+      demás esperan su turno.
+    - Agrupación: las solicitudes de una misma cadena (huella de contenido) que
+      llegan dentro de `batch_window` segundos, hasta `max_batch`, se resuelven
+      juntas con `solve_singular_system_block` sobre un único precondicionador,
+      construido una vez por cadena (`preconditioner="amg"`, por defecto, o
+      "svd"; con "svd" conviene `mode="truncated"`, pues el modo completo
+      factoriza una matriz densa de n x n).
+    - Deduplicación: una solicitud idéntica a otra aún en curso espera el mismo
+      resultado en lugar de repetir el cálculo.
+    """
+
+    def __init__(self, executor=None, max_pending=64, max_batch=32, batch_window=0.002,
+                 preconditioner="amg", preconditioner_options=None, tol=1e-10, maxit=1000):
+        if preconditioner not in ("svd", "amg", None):
+            raise ValueError(f"tipo de precondicionador desconocido: {preconditioner!r}")
+        self.executor = executor
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.preconditioner = preconditioner
+        self.preconditioner_options = preconditioner_options or {}
+        self.tol = tol
+        self.maxit = maxit
+        self._slots = asyncio.Semaphore(max_pending)
+        self._chains = {}
+        self._inflight = {}
+
+    def register(self, P):
+        """Registra la cadena P y retorna su huella, con la que se identifican las solicitudes."""
+        P = sp.csr_matrix(P, dtype=np.float64)
+        key = matrix_fingerprint(P)
+        if key not in self._chains:
+            self._chains[key] = _Chain(P=P, A=build_singular_system(P))
+        return key
+
+    def _chain(self, chain):
+        key = chain if isinstance(chain, str) else self.register(chain)
+        try:
+            return key, self._chains[key]
+        except KeyError:
+            raise KeyError(f"cadena no registrada: {key}") from None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _build_preconditioner(self, A):
+        options = dict(self.preconditioner_options)
+        if self.preconditioner == "svd":
+            return SVDBasedPreconditioner(A, **options).as_linear_operator()
+        hierarchy_options = options.pop("hierarchy_options", {"max_levels": 10})
+        hierarchy = build_amg_hierarchy(A, **hierarchy_options)
+        return AMGPreconditioner(hierarchy, **options).as_linear_operator()
+
+    async def _ensure_setup(self, state):
+        if self.preconditioner is None:
+            return
+        if state.setup is None:
+            state.setup = asyncio.ensure_future(self._run(self._build_preconditioner, state.A))
+        setup = state.setup
+        try:
+            state.M = await asyncio.shield(setup)
+        except Exception:
+            if state.setup is setup:  # La siguiente solicitud reintenta la construcción
+                state.setup = None
+            raise
+
+    async def _dedup(self, key, start):
+        """Comparte el resultado de una solicitud idéntica en curso (si la hay)."""
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(start())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def solve(self, chain, b):
+        """x con (I - P) x = b para la cadena `chain` (huella o matriz); retorna (x, info)."""
+        key, state = self._chain(chain)
+        b = np.asarray(b, dtype=np.float64)
+        return await self._dedup((key, "solve", _vector_key(b)),
+                                 lambda: self._enqueue(key, state, b))
+
+    async def _enqueue(self, key, state, b):
+        async with self._slots:
+            await self._ensure_setup(state)
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            state.pending.append((b, future))
+            if len(state.pending) >= self.max_batch:
+                self._flush(state)
+            elif state.flush is None:
+                state.flush = loop.call_later(self.batch_window, self._flush, state)
+            return await future
+
+    def _flush(self, state):
+        if state.flush is not None:
+            state.flush.cancel()
+            state.flush = None
+        batch, state.pending = state.pending, []
+        if batch:
+            asyncio.ensure_future(self._solve_batch(state, batch))
+
+    async def _solve_batch(self, state, batch):
+        B = np.column_stack([b for b, _ in batch])
+        try:
+            X, info = await self._run(self._block_solve, state, B)
+        except Exception as exc:  # Se propaga a cada solicitud del lote
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for j, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((X[:, j], {
+                    "info": int(info["info"][j]),
+                    "converged": bool(info["converged"][j]),
+                    "residual": float(info["residuals"][j]),
+                    "batch_size": len(batch),
+                }))
+
+    def _block_solve(self, state, B):
+        return solve_singular_system_block(state.A, B, M=state.M, tol=self.tol, maxit=self.maxit)
+
+    async def stationary(self, chain, **options):
+        """pi de la cadena (`stationary_distribution_power(P, **options)`), deduplicada."""
+        key, state = self._chain(chain)
+        request = (key, "stationary", json.dumps(options, sort_keys=True, default=str))
+
+        async def start():
+            async with self._slots:
+                return await self._run(lambda: stationary_distribution_power(state.P, **options))
+
+        return await self._dedup(request, start)
+
+
+async def handle_connection(service, reader, writer):
+    """
+    Protocolo de líneas JSON sobre un socket: cada solicitud es
+    {"op": "solve", "chain": huella, "b": [...]} o {"op": "stationary", "chain": huella}
+    y cada respuesta {"x"/"pi": [...], ...} o {"error": mensaje}. Las solicitudes
+    de una conexión se atienden concurrentemente (las respuestas llevan su "id").
+    """
+    async def answer(line):
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                request = {}
+                raise ValueError("la solicitud debe ser un objeto JSON")
+            if request.get("op") == "solve":
+                x, info = await service.solve(request["chain"], request["b"])
+                response = {"x": x.tolist(), **info}
+            elif request.get("op") == "stationary":
+                pi = await service.stationary(request["chain"], **request.get("options", {}))
+                response = {"pi": pi.tolist()}
+            else:
+                response = {"error": f"operación desconocida: {request.get('op')!r}"}
+        except Exception as exc:
+            response = {"error": str(exc)}
+        response["id"] = request.get("id")
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    tasks = set()
+    try:
+        while line := await reader.readline():
+            task = asyncio.ensure_future(answer(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        writer.close()
+
+
+async def start_server(service, path=None, host="127.0.0.1", port=0):
+    """Servidor del protocolo de `handle_connection` en un socket Unix (`path`) o TCP."""
+    def handler(reader, writer):
+        return handle_connection(service, reader, writer)
+
+    if path is not None:
+        return await asyncio.start_unix_server(handler, path=path)
+    return await asyncio.start_server(handler, host=host, port=port)
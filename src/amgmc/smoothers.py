@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from .markov import replace_csr_rows
+from .kernels import jacobi_sweeps, sor_sweep, use_numba
+from .partitioned import partitioned
+
+
+def _safe_inverse_diagonal(A):
+    """Inversa de la diagonal de A; las entradas nulas (estados absorbentes) se dejan en cero."""
+    d = A.diagonal()
+    d_inv = np.zeros_like(d)
+    mask = np.abs(d) > 0
+    d_inv[mask] = 1.0 / d[mask]
+    return d_inv
+
+
+@dataclass
+class JacobiSmoother:
+    """
+    Jacobi ponderado: x <- x + omega * D^{-1} (b - A x). Con `backend="numba"`
+    los barridos sobre vectores se hacen con un kernel paralelo sin reservas;
+    con `threads` el residuo b - A x se calcula por bloques de filas en hilos.
+    """
+    A: sp.csr_matrix
+    omega: float = 2.0 / 3.0
+    backend: str = "scipy"
+    threads: int = None
+    _d_inv: np.ndarray = None
+    _compiled: bool = False
+    _work: np.ndarray = None
+    _op: object = None
+
+    def __post_init__(self):
+        self.A = self.A.tocsr()
+        self._op = partitioned(self.A, self.threads)
+        self._d_inv = (self.omega * _safe_inverse_diagonal(self.A)).astype(self.A.dtype)
+        self._compiled = use_numba(self.backend)
+
+    def refresh_rows(self, rows):
+        """Actualiza la diagonal tras modificar in-place las filas `rows` de A."""
+        rows = np.asarray(rows, dtype=np.int64)
+        d = np.asarray(self.A[rows, rows]).ravel()
+        d_inv = np.zeros_like(d)
+        mask = np.abs(d) > 0
+        d_inv[mask] = self.omega / d[mask]
+        self._d_inv[rows] = d_inv
+
+    def __call__(self, x, b, iterations=1):
+        if self._compiled and x.ndim == 1:
+            if self._work is None or self._work.dtype != x.dtype:
+                self._work = np.empty_like(x)
+            return jacobi_sweeps(self.A, self._d_inv, x, b, iterations, self._work)
+        d_inv = self._d_inv[:, None] if x.ndim == 2 else self._d_inv
+        for _ in range(iterations):
+            r = b - self._op @ x
+            r *= d_inv
+            x += r
+        return x
+
+
+@dataclass
+class SORSmoother:
+    """
+    SOR: x <- x + (D/omega + L)^{-1} (b - A x). Con omega=1 es Gauss-Seidel.
+    Con `backend="numba"` los barridos se hacen in-place sobre las filas de A,
+    sin factores triangulares. Con `threads` el residuo b - A x se reparte en
+    hilos; la resolución triangular sigue siendo secuencial.
+    """
+    A: sp.csr_matrix
+    omega: float = 1.0
+    sweep: str = "forward"
+    backend: str = "scipy"
+    threads: int = None
+    _lower: sp.csr_matrix = None
+    _upper: sp.csr_matrix = None
+    _compiled: bool = False
+    _op: object = None
+
+    def __post_init__(self):
+        if self.sweep not in ("forward", "backward", "symmetric"):
+            raise ValueError(f"sweep desconocido: {self.sweep!r}")
+        self.A = self.A.tocsr()
+        self._op = partitioned(self.A, self.threads)
+        self._compiled = use_numba(self.backend)
+        if not self._compiled:
+            self._build_factors()
+
+    def _build_factors(self):
+        self._lower = self._triangle(self.A, np.arange(self.A.shape[0]), lower=True)
+        self._upper = self._triangle(self.A, np.arange(self.A.shape[0]), lower=False)
+
+    def _triangle(self, A_rows, rows, lower):
+        """Parte triangular de las filas `rows` de A con la diagonal escalada por 1/omega."""
+        A_rows = A_rows.tocoo()
+        global_rows = rows[A_rows.row]
+        keep = A_rows.col < global_rows if lower else A_rows.col > global_rows
+        d = np.zeros(rows.shape[0], dtype=A_rows.dtype)
+        on_diag = A_rows.col == global_rows
+        np.add.at(d, A_rows.row[on_diag], A_rows.data[on_diag])
+        # Las diagonales nulas se sustituyen por 1 para que el sistema triangular sea resoluble
+        d_scaled = np.where(np.abs(d) > 0, d / self.omega, 1.0)
+        local = np.arange(rows.shape[0])
+        return sp.csr_matrix(
+            (np.concatenate([A_rows.data[keep], d_scaled]),
+             (np.concatenate([A_rows.row[keep], local]),
+              np.concatenate([A_rows.col[keep], rows]))),
+            shape=(rows.shape[0], A_rows.shape[1]), dtype=A_rows.dtype,
+        )
+
+    def refresh_rows(self, rows):
+        """Actualiza los factores triangulares tras modificar in-place las filas `rows` de A."""
+        if self._lower is None:
+            return  # Los barridos compilados leen A directamente
+        rows = np.asarray(rows, dtype=np.int64)
+        A_rows = self.A[rows]
+        replace_csr_rows(self._lower, rows, self._triangle(A_rows, rows, lower=True))
+        replace_csr_rows(self._upper, rows, self._triangle(A_rows, rows, lower=False))
+
+    def _sweep(self, M, x, b, lower):
+        r = b - self._op @ x
+        x += spla.spsolve_triangular(M, r, lower=lower)
+        return x
+
+    def __call__(self, x, b, iterations=1):
+        if self._compiled and x.ndim == 1:
+            for _ in range(iterations):
+                if self.sweep in ("forward", "symmetric"):
+                    sor_sweep(self.A, x, b, self.omega)
+                if self.sweep in ("backward", "symmetric"):
+                    sor_sweep(self.A, x, b, self.omega, reverse=True)
+            return x
+        if self._lower is None:
+            self._build_factors()  # Bloques n x s con el backend compilado
+        for _ in range(iterations):
+            if self.sweep in ("forward", "symmetric"):
+                x = self._sweep(self._lower, x, b, lower=True)
+            if self.sweep in ("backward", "symmetric"):
+                x = self._sweep(self._upper, x, b, lower=False)
+        return x
+
+
+def GaussSeidelSmoother(A, sweep="forward", backend="scipy", threads=None):
+    """Gauss-Seidel como caso particular de SOR con omega=1."""
+    return SORSmoother(A, omega=1.0, sweep=sweep, backend=backend, threads=threads)
+
+
+SMOOTHERS = {
+    "jacobi": JacobiSmoother,
+    "gauss_seidel": GaussSeidelSmoother,
+    "sor": SORSmoother,
+}
+
+
+def make_smoother(smoother, A, **options):
+    """
+    Crea un suavizador para A. `smoother` puede ser un nombre registrado en
+    SMOOTHERS o una fábrica `f(A, **options)` que retorne un invocable `s(x, b, iterations)`.
+    """
+    if callable(smoother):
+        return smoother(A, **options)
+    try:
+        factory = SMOOTHERS[smoother]
+    except KeyError:
+        raise ValueError(f"suavizador desconocido: {smoother!r}") from None
+    return factory(A, **options)
@@ -1,25 +1,302 @@
 import numpy as np
 import scipy.sparse.linalg as spla
+from .instrumentation import stage
+from .partitioned import partitioned
 
-def solve_singular_system_lgmres(A, b, M=None, tol=1e-10, maxit=10000):
+# Una columna cuyo residuo baja menos de esta fracción en _STALL_RESTARTS
+# reinicios seguidos se da por estancada y se bloquea
+_STALL_DECREASE = 1e-3
+_STALL_RESTARTS = 2
+
+def solve_singular_system_lgmres(A, b, M=None, tol=1e-10, maxit=10000, collector=None,
+                                 dtype=None, inner_tol=1e-3, inner_maxit=10, max_refinements=50,
+                                 threads=None, A_low=None):
     """
     Resuelve un sistema singular usando LGMRES con precondicionador.
     Optimizado para rendimiento en Windows.
+
+    Con un `collector` (instrumentation.Collector) se mide la etapa "solve", se
+    cuentan los productos con A ("matvec") y con M ("precond") y se registra
+    el residuo de cada iteración externa.
+
+    Con `dtype=np.float32` se usa precisión mixta: LGMRES trabaja con una copia
+    de A (y M, que debe construirse en ese tipo) en simple precisión hasta una
+    reducción relativa `inner_tol` del residuo o `inner_maxit` reinicios, y un
+    lazo externo de refinamiento iterativo en float64 (r = b - A x, x += d)
+    recupera la tolerancia `tol` sobre el sistema original. La reducción
+    alcanzable por corrección está limitada por eps(float32) * cond(A), por lo
+    que conviene pedir poco a cada corrección y refinar más veces. `A_low`
+    permite pasar la copia en `dtype` ya construida (p. ej. `levels[0].A` de
+    una jerarquía en float32) en lugar de convertir A en cada llamada.
+
+    Con `threads` los productos con A (sparse) se reparten por bloques de filas
+    con nnz balanceado en un pool de hilos (partitioned.PartitionedOperator).
     """
+    if dtype is not None and np.dtype(dtype) != np.float64:
+        return _solve_refined(A, b, M, tol, collector, np.dtype(dtype),
+                              inner_tol, min(maxit, inner_maxit), max_refinements, threads,
+                              A_low)
+
+    A = partitioned(A, threads)
+
+    callback = None
+    if collector is not None:
+        A_op = A
+        A, M = collector.operator(A, "matvec"), collector.operator(M, "precond")
+
+        def callback(xk):
+            collector.residual(np.linalg.norm(b - A_op @ xk), stage="solve")
+
     # Configuración optimizada de LGMRES
     # Nota: scipy usa 'atol' y 'rtol' en lugar de 'tol'
-    x, info = spla.lgmres(
-        A, 
-        b, 
-        M=M, 
-        atol=tol,     # Tolerancia absoluta
-        rtol=0.0,     # Tolerancia relativa (usamos solo absoluta)
-        maxiter=maxit,
-        inner_m=30,   # Tamaño óptimo para memoria cache
-        outer_k=3     # Balance entre memoria y convergencia
-    )
+    with stage(collector, "solve", solver="lgmres"):
+        x, info = spla.lgmres(
+            A, 
+            b, 
+            M=M, 
+            atol=tol,     # Tolerancia absoluta
+            rtol=0.0,     # Tolerancia relativa (usamos solo absoluta)
+            maxiter=maxit,
+            inner_m=30,   # Tamaño óptimo para memoria cache
+            outer_k=3,    # Balance entre memoria y convergencia
+            callback=callback,
+        )
     return x, {"info": info, "converged": info == 0}
 
+
+def _solve_refined(A, b, M, tol, collector, dtype, inner_tol, inner_maxit, max_refinements,
+                   threads=None, A_low=None):
+    """Refinamiento iterativo en float64 con correcciones LGMRES en `dtype`."""
+    b = np.asarray(b, dtype=np.float64)
+    if A_low is None:
+        A_low = A.astype(dtype) if hasattr(A, "astype") else A
+    elif A_low.shape != A.shape or A_low.dtype != dtype:
+        raise ValueError(f"A_low debe tener la forma de A y tipo {dtype.name}")
+    A, A_low = partitioned(A, threads), partitioned(A_low, threads)
+    if collector is not None:
+        A_low, M = collector.operator(A_low, "matvec"), collector.operator(M, "precond")
+
+    x = np.zeros_like(b)
+    r = b.copy()
+    residual = float(np.linalg.norm(r))
+    refinements = 0
+    info = 0
+    with stage(collector, "solve", solver="lgmres", dtype=dtype.name):
+        while residual > tol and refinements < max_refinements:
+            # Corrección con el residuo normalizado: evita el desbordamiento por
+            # abajo en simple precisión cuando el residuo ya es pequeño
+            d, info = spla.lgmres(
+                A_low, (r / residual).astype(dtype), M=M, atol=inner_tol, rtol=0.0,
+                maxiter=inner_maxit, inner_m=30, outer_k=3,
+            )
+            x += residual * d.astype(np.float64)
+            r = b - A @ x
+            new_residual = float(np.linalg.norm(r))
+            refinements += 1
+            if collector is not None:
+                collector.residual(new_residual, stage="solve")
+            if new_residual >= residual:
+                break  # La corrección ya no reduce el residuo
+            residual = new_residual
+    converged = residual <= tol
+    return x, {
+        "info": 0 if converged else max(int(info), 1),
+        "converged": converged,
+        "refinements": refinements,
+        "residual": residual,
+    }
+
+
+def _unit(v):
+    v = np.asarray(v, dtype=np.float64).ravel()
+    return v / np.linalg.norm(v)
+
+
+def solve_singular_system_deflated(A, b, M=None, tol=1e-10, maxit=10000, left_null=None,
+                                   right_null=None, constraint=None, constraint_value=0.0,
+                                   recycle=None, recycle_size=10, collector=None, threads=None):
+    """
+    Resuelve el sistema singular A x = b con LGMRES proyectado sobre su núcleo conocido.
+
+    Para A = I - P el núcleo derecho es el vector de unos (`right_null` permite
+    otro) y el izquierdo es pi (`left_null`, opcional). Las direcciones del
+    precondicionador se proyectan sobre el complemento ortogonal del núcleo
+    derecho, de modo que los iterados no derivan hacia él; si se da el núcleo
+    izquierdo, b y cada producto A v se proyectan sobre el rango de A (b
+    inconsistente se reemplaza por su parte consistente).
+
+    La solución se normaliza con la restricción c^T x = `constraint_value`
+    (`constraint` = c, por defecto los unos: suma fija), así que es
+    reproducible con independencia de la trayectoria de LGMRES.
+
+    `recycle` es una lista (inicialmente vacía) de pares (v, A v) que se
+    conserva entre solves con el mismo A: el punto inicial es la combinación
+    de los v que minimiza el residuo (sin productos adicionales) y al terminar
+    se añade la solución, conservando las `recycle_size` más recientes. Para
+    lados derechos relacionados (p. ej. una secuencia de actualizaciones)
+    reduce las iteraciones.
+    """
+    n = A.shape[0]
+    u = _unit(np.ones(n) if right_null is None else right_null)
+    w = None if left_null is None else _unit(left_null)
+    A = partitioned(A, threads)
+    b = np.asarray(b, dtype=np.float64)
+    if w is not None:
+        b = b - w * (w @ b)
+
+    def matvec(v):
+        y = A @ v
+        return y - w * (w @ y) if w is not None else y
+
+    def psolve(v):
+        z = M @ v if M is not None else np.array(v, dtype=np.float64)
+        return z - u * (u @ z)
+
+    x0 = None
+    if recycle:
+        V = np.column_stack([v for v, _ in recycle])
+        AV = np.column_stack([av for _, av in recycle])
+        x0 = V @ np.linalg.lstsq(AV, b, rcond=None)[0]
+
+    A_op = spla.LinearOperator((n, n), matvec=matvec, dtype=np.float64)
+    M_op = spla.LinearOperator((n, n), matvec=psolve, dtype=np.float64)
+    callback = None
+    if collector is not None:
+        A_op, M_op = collector.operator(A_op, "matvec"), collector.operator(M_op, "precond")
+
+        def callback(xk):
+            collector.residual(np.linalg.norm(b - matvec(xk)), stage="solve")
+
+    with stage(collector, "solve", solver="lgmres_deflated"):
+        x, info = spla.lgmres(
+            A_op, b, x0=x0, M=M_op, atol=tol, rtol=0.0, maxiter=maxit, inner_m=30, outer_k=3,
+            callback=callback,
+        )
+
+    if recycle is not None:
+        recycle.append((x.copy(), matvec(x)))
+        del recycle[:-recycle_size]
+    c = np.ones(n) if constraint is None else np.asarray(constraint, dtype=np.float64)
+    cu = c @ u
+    if abs(cu) > 0:
+        x -= u * ((c @ x - constraint_value) / cu)
+    return x, {"info": info, "converged": info == 0}
+
+
+def _apply_block(op, X):
+    """Aplica un operador (matriz sparse/densa o LinearOperator) a un bloque de columnas."""
+    if isinstance(op, spla.LinearOperator):
+        return op.matmat(X)
+    return op @ X
+
+
+def solve_singular_system_block(A, B, M=None, tol=1e-10, maxit=1000, restart=10, block_size=8,
+                                collector=None, threads=None):
+    """
+    Resuelve A X = B para varios lados derechos a la vez con GMRES por bloques
+    reiniciado y precondicionado por la derecha.
+
+    Todos los productos son sparse x bloque denso (`A @ V`, `M.matmat(V)`), de
+    modo que un único precondicionador se comparte entre las columnas. Las columnas
+    se procesan en bloques de `block_size` (la ortogonalización crece con el
+    cuadrado del bloque) y las que convergen o se estancan (p. ej. un lado
+    derecho inconsistente, cuyo residuo mínimo no es 0) se excluyen en cada
+    reinicio, para que no frenen al resto del bloque.
+    Retorna X y un diccionario con información de convergencia por columna.
+    Con un `collector` se registran la etapa "solve_block", los contadores de
+    productos y la norma máxima del residuo en cada reinicio. Con `threads` los
+    productos A @ V se reparten por bloques de filas en un pool de hilos.
+    """
+    A = partitioned(A, threads)
+    if collector is not None:
+        A, M = collector.operator(A, "matvec"), collector.operator(M, "precond")
+    B = np.asarray(B, dtype=np.float64)
+    single = B.ndim == 1
+    if single:
+        B = B[:, None]
+
+    X = np.zeros_like(B)
+    infos = []
+    with stage(collector, "solve_block", columns=B.shape[1]):
+        for start in range(0, B.shape[1], block_size):
+            cols = slice(start, start + block_size)
+            X[:, cols], block_info = _block_gmres(A, B[:, cols], M, tol, maxit, restart, collector)
+            infos.append(block_info)
+
+    info = {
+        key: np.concatenate([block_info[key] for block_info in infos])
+        for key in ("info", "converged", "residuals")
+    }
+    info["iterations"] = int(sum(block_info["iterations"] for block_info in infos))
+    if single:
+        X = X[:, 0]
+    return X, info
+
+
+def _block_gmres(A, B, M, tol, maxit, restart, collector=None):
+    """GMRES por bloques reiniciado sobre un bloque de lados derechos (n x s)."""
+    n, s = B.shape
+    X = np.zeros((n, s), dtype=np.float64)
+    iterations = np.zeros(s, dtype=np.int64)
+    eps = np.finfo(np.float64).eps
+
+    previous = np.full(s, np.inf)
+    stalls = np.zeros(s, dtype=np.int64)
+    locked = np.zeros(s, dtype=bool)
+    total = 0
+    while total < maxit:
+        R = B - _apply_block(A, X)
+        res = np.linalg.norm(R, axis=0)
+        if collector is not None:
+            collector.residual(res.max(), stage="solve_block")
+        stalls = np.where(res > (1.0 - _STALL_DECREASE) * previous, stalls + 1, 0)
+        locked |= (stalls >= _STALL_RESTARTS) & (res > tol)
+        previous = res
+        active = np.flatnonzero((res > tol) & ~locked)
+        if active.size == 0:
+            break
+        p = active.size
+
+        V0, S0 = np.linalg.qr(R[:, active])
+        basis = [V0]
+        H = np.zeros(((restart + 1) * p, restart * p), dtype=np.float64)
+        G = np.zeros(((restart + 1) * p, p), dtype=np.float64)
+        G[:p] = S0
+
+        steps = 0
+        Y = None
+        for j in range(restart):
+            W = _apply_block(A, _apply_block(M, basis[j]) if M is not None else basis[j])
+            # Gram-Schmidt modificado por bloques
+            for i, Vi in enumerate(basis):
+                Hij = Vi.T @ W
+                W -= Vi @ Hij
+                H[i * p:(i + 1) * p, j * p:(j + 1) * p] = Hij
+            Vn, Hn = np.linalg.qr(W)
+            H[(j + 1) * p:(j + 2) * p, j * p:(j + 1) * p] = Hn
+            basis.append(Vn)
+            steps = j + 1
+            total += 1
+            iterations[active] += 1
+
+            rows, cols = (steps + 1) * p, steps * p
+            Y = np.linalg.lstsq(H[:rows, :cols], G[:rows], rcond=None)[0]
+            ls_res = np.linalg.norm(G[:rows] - H[:rows, :cols] @ Y, axis=0)
+            # Convergencia de todas las columnas o ruptura del bloque de Krylov
+            breakdown = np.abs(np.diag(Hn)).min() <= eps * max(np.abs(S0).max(), 1.0)
+            if np.all(ls_res <= tol) or breakdown or total >= maxit:
+                break
+
+        Vm = np.hstack(basis[:steps])
+        update = Vm @ Y
+        X[:, active] += _apply_block(M, update) if M is not None else update
+
+    R = B - _apply_block(A, X)
+    res = np.linalg.norm(R, axis=0)
+    converged = res <= tol
+    info = np.where(converged, 0, np.maximum(iterations, 1))
+    return X, {"info": info, "converged": converged, "residuals": res, "iterations": total}
+
 def residual_norm(A, x, b, ord=2):
     """Calcula la norma del residual de forma eficiente."""
     # Evita copia innecesaria usando operaciones in-place cuando sea posible
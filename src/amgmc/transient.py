@@ -0,0 +1,149 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import gammaln
+
+PROPAGATION_METHODS = ("auto", "step", "squaring")
+
+
+def _as_block(X0, n):
+    """Distribuciones iniciales (vector o k x n por filas) como bloque n x k contiguo."""
+    X0 = np.asarray(X0, dtype=np.float64)
+    single = X0.ndim == 1
+    X = X0[None, :] if single else X0
+    if X.shape[1] != n:
+        raise ValueError(f"las distribuciones iniciales deben tener {n} columnas")
+    return np.ascontiguousarray(X.T), single
+
+
+def _check_horizons(horizons):
+    horizons = list(horizons)
+    if any(b < a for a, b in zip(horizons, horizons[1:])) or (horizons and horizons[0] < 0):
+        raise ValueError("los horizontes deben ser no negativos y crecientes")
+    return horizons
+
+
+class _Powers:
+    """
+    Potencias (P^T)^(2^j) calculadas bajo demanda por cuadrados sucesivos. Una
+    potencia se acepta solo si su nnz no supera `fill_limit` veces el de P y si
+    su costo estimado se amortiza frente a 2^j productos con el bloque de k columnas.
+    """
+
+    def __init__(self, PT, k, method, fill_limit):
+        self.powers = [PT]
+        self.k = k
+        self.enabled = method != "step"
+        self.forced = method == "squaring"
+        self.fill_limit = fill_limit
+        self.nnz = max(PT.nnz, 1)
+
+    def _extend(self):
+        last = self.powers[-1]
+        j = len(self.powers) - 1
+        if not self.forced:
+            # Costo del producto sparse ~ nnz * grado medio; ahorro ~ k * 2^j productos con P
+            work = last.nnz * last.nnz / max(last.shape[0], 1)
+            if work > self.k * (2 ** j) * self.nnz:
+                return False
+        square = (last @ last).tocsr()
+        if square.nnz > self.fill_limit * self.nnz:
+            self.enabled = False
+            return False
+        self.powers.append(square)
+        return True
+
+    def advance(self, Y, steps):
+        """Aplica (P^T)^steps a Y descomponiendo `steps` en potencias de 2 disponibles."""
+        while steps > 0:
+            j = steps.bit_length() - 1
+            while self.enabled and j >= len(self.powers) and self._extend():
+                pass
+            j = min(j, len(self.powers) - 1)
+            Y = self.powers[j] @ Y
+            steps -= 2 ** j
+        return Y
+
+
+def propagate_distributions(P, X0, horizons, method="auto", fill_limit=4.0):
+    """
+    Generador de las distribuciones pi_t = pi_0 P^t para cada t de `horizons`
+    (enteros crecientes). `X0` es una distribución (n,) o un bloque k x n con
+    una distribución inicial por fila; cada paso es un producto sparse x bloque
+    denso sobre todas a la vez. Produce pares (t, X_t) con X_t de la misma forma
+    que X0, de modo que la memoria no depende del número de horizontes.
+
+    `method`: "step" (un producto por paso), "squaring" (potencias P^(2^j) por
+    cuadrados, reutilizadas entre horizontes) o "auto" (cuadrados solo cuando
+    el relleno se mantiene bajo `fill_limit` * nnz(P) y su costo se amortiza).
+    """
+    if method not in PROPAGATION_METHODS:
+        raise ValueError(f"método de propagación desconocido: {method!r}")
+    P = sp.csr_matrix(P, dtype=np.float64)
+    Y, single = _as_block(X0, P.shape[0])
+    powers = _Powers(P.T.tocsr(), Y.shape[1], method, fill_limit)
+    current = 0
+    for t in _check_horizons(horizons):
+        Y = powers.advance(Y, int(t) - current)
+        current = int(t)
+        yield t, (Y[:, 0].copy() if single else Y.T.copy())
+
+
+def _poisson_weights(mean, tol):
+    """Pesos de Poisson(mean) truncados cuando la masa restante es menor que `tol`."""
+    weights = []
+    total = 0.0
+    k = 0
+    while total < 1.0 - tol or k <= mean:
+        w = np.exp(-mean + k * np.log(mean) - gammaln(k + 1)) if mean > 0 else float(k == 0)
+        weights.append(w)
+        total += w
+        k += 1
+    return np.array(weights)
+
+
+def propagate_continuous(Q, X0, times, tol=1e-12):
+    """
+    Versión en tiempo continuo: pi(t) = pi(0) exp(Q t) para el generador Q
+    (filas que suman cero) por uniformización, con P = I + Q / lambda y
+    pesos de Poisson(lambda * dt) truncados en `tol`. Cada tiempo se obtiene
+    desde el anterior, así que solo se guarda el bloque actual.
+    """
+    Q = sp.csr_matrix(Q, dtype=np.float64)
+    n = Q.shape[0]
+    rate = float(np.max(-Q.diagonal(), initial=0.0)) or 1.0
+    PT = (sp.identity(n, format="csr") + Q / rate).T.tocsr()
+    Y, single = _as_block(X0, n)
+    current = 0.0
+    for t in _check_horizons(times):
+        weights = _poisson_weights(rate * (t - current), tol)
+        term = Y
+        acc = weights[0] * term
+        for w in weights[1:]:
+            term = PT @ term
+            acc += w * term
+        Y = acc
+        current = t
+        yield t, (Y[:, 0].copy() if single else Y.T.copy())
+
+
+def mixing_curve(P, X0, horizons, pi, **options):
+    """Distancia de variación total 0.5 * ||pi_t - pi||_1 por distribución inicial y horizonte."""
+    pi = np.asarray(pi, dtype=np.float64)
+    for t, X in propagate_distributions(P, X0, horizons, **options):
+        yield t, 0.5 * np.abs(X - pi).sum(axis=-1)
+
+
+def hitting_time_distribution(P, X0, targets, horizons, **options):
+    """
+    P(T_A <= t) para el conjunto de estados `targets` (A): se hacen absorbentes
+    y se acumula la masa que ha llegado a ellos en cada horizonte.
+    """
+    P = sp.csr_matrix(P, dtype=np.float64, copy=True)
+    targets = np.asarray(targets, dtype=np.int64)
+    keep = np.ones(P.shape[0], dtype=np.float64)
+    keep[targets] = 0.0
+    absorbing = sp.diags(keep) @ P + sp.csr_matrix(
+        (np.ones(targets.size), (targets, targets)), shape=P.shape
+    )
+    for t, X in propagate_distributions(absorbing.tocsr(), X0, horizons, **options):
+        yield t, X[..., targets].sum(axis=-1)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from amgmc import builders
+from amgmc.markov import build_transition_matrix, stationary_distribution_power
+from amgmc.builders import (
+    transition_matrix_from_coo,
+    transition_matrix_from_edges,
+    transition_matrix_from_file,
+)
+
+
+def _random_edges(n=50, m=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n, m), rng.integers(0, n, m), rng.random(m)
+
+
+def _dense_reference(src, dst, w, n):
+    P_dense = np.zeros((n, n))
+    np.add.at(P_dense, (src, dst), w)
+    empty = P_dense.sum(axis=1) == 0
+    P_dense[empty, empty] = 1.0
+    return build_transition_matrix(P_dense).toarray()
+
+
+def test_coo_builder_sums_duplicates_and_matches_dense():
+    src, dst, w = _random_edges()
+    P = transition_matrix_from_coo(src, dst, w, n=50)
+    assert np.allclose(P.toarray(), _dense_reference(src, dst, w, 50))
+    assert np.allclose(P.sum(axis=1), 1.0)
+
+
+@pytest.mark.parametrize("dangling", ["self", "uniform", "keep", "error"])
+def test_dangling_policies(dangling):
+    P_kwargs = dict(n=3, dangling=dangling)
+    src, dst = np.array([0, 1]), np.array([1, 0])
+    if dangling == "error":
+        with pytest.raises(ValueError):
+            transition_matrix_from_coo(src, dst, **P_kwargs)
+        return
+    P = transition_matrix_from_coo(src, dst, **P_kwargs).toarray()
+    expected_row = {"self": [0, 0, 1], "uniform": [1 / 3] * 3, "keep": [0, 0, 0]}[dangling]
+    assert np.allclose(P[2], expected_row)
+
+
+def test_hub_dangling_matches_uniform(monkeypatch):
+    src, dst, w = _random_edges(n=60, m=150, seed=2)
+    uniform = transition_matrix_from_coo(src, dst, w, n=60, dangling="uniform")
+    hub = transition_matrix_from_coo(src, dst, w, n=60, dangling="hub")
+    assert hub.shape == (61, 61) and np.allclose(hub.sum(axis=1), 1.0)
+    assert hub.nnz < uniform.nnz
+    pi = stationary_distribution_power(hub, tol=1e-14)[:60]
+    expected = stationary_distribution_power(uniform, tol=1e-14)
+    assert np.allclose(pi / pi.sum(), expected, atol=1e-10)
+
+    monkeypatch.setattr(builders, "UNIFORM_FILL_LIMIT", 100)
+    with pytest.raises(ValueError):
+        transition_matrix_from_coo(src, dst, w, n=60, dangling="uniform")
+
+
+def test_chunked_and_file_builders(tmp_path):
+    src, dst, w = _random_edges(m=2000)
+    reference = transition_matrix_from_coo(src, dst, w).toarray()
+
+    chunks = ((src[i:i + 128], dst[i:i + 128], w[i:i + 128]) for i in range(0, 2000, 128))
+    P = transition_matrix_from_edges(chunks)
+    assert np.allclose(P.toarray(), reference)
+
+    npy = tmp_path / "edges.npy"
+    np.save(npy, np.column_stack([src, dst, w]))
+    assert np.allclose(transition_matrix_from_file(npy, chunk_size=300).toarray(), reference)
+
+    npz = tmp_path / "edges.npz"
+    np.savez(npz, src=src, dst=dst, weight=w)
+    assert np.allclose(transition_matrix_from_file(npz, chunk_size=300).toarray(), reference)
@@ -0,0 +1,71 @@
+import json
+import os
+import numpy as np
+import pytest
+from amgmc.markov import build_transition_matrix, build_singular_system
+from amgmc.cache import SetupCache, matrix_fingerprint
+
+
+def _system(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    P_dense = rng.random((n, n)) * (rng.random((n, n)) < 0.2) + np.eye(n)
+    return build_singular_system(build_transition_matrix(P_dense))
+
+
+def test_fingerprint_depends_on_content_and_params():
+    A = _system()
+    assert matrix_fingerprint(A, max_levels=3) == matrix_fingerprint(A.copy(), max_levels=3)
+    assert matrix_fingerprint(A, max_levels=3) != matrix_fingerprint(A, max_levels=4)
+    assert matrix_fingerprint(A) != matrix_fingerprint(_system(seed=1))
+
+
+def test_memory_tier_returns_same_object():
+    cache = SetupCache()
+    A = _system()
+    h1 = cache.hierarchy(A, max_levels=4, max_coarse=10)
+    assert cache.hierarchy(A.copy(), max_levels=4, max_coarse=10) is h1
+
+
+@pytest.mark.parametrize("kind, params", [
+    ("amg", {"cycle": "W"}),
+    ("svd", {"mode": "full"}),
+    ("svd", {"mode": "truncated", "k": 4}),
+])
+def test_disk_tier_restores_preconditioner(tmp_path, kind, params):
+    A = _system()
+    options = {"hierarchy_options": {"max_levels": 4, "max_coarse": 10}} if kind == "amg" else {}
+    built = SetupCache(directory=tmp_path).preconditioner(A, kind=kind, **options, **params)
+
+    # Un proceso nuevo (caché en memoria vacía) carga los factores desde disco
+    restored = SetupCache(directory=tmp_path).preconditioner(A, kind=kind, **options, **params)
+    assert restored is not built
+    v = np.random.default_rng(3).random(A.shape[0])
+    M1, M2 = built.as_linear_operator(), restored.as_linear_operator()
+    assert np.allclose(M1 @ v, M2 @ v)
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = SetupCache(directory=tmp_path, max_disk_bytes=10**9)
+    a, b = _system(seed=0), _system(seed=1)
+    cache.hierarchy(a, max_levels=2)
+    cache.hierarchy(b, max_levels=2)
+    key_a = matrix_fingerprint(a, kind="hierarchy", max_levels=2)
+    key_b = matrix_fingerprint(b, kind="hierarchy", max_levels=2)
+    os.utime(tmp_path / key_a / "meta.json", (0, 0))
+
+    # Presupuesto para una sola entrada: se expulsa la usada hace más tiempo
+    with open(tmp_path / key_b / "meta.json") as fh:
+        cache.max_disk_bytes = json.load(fh)["nbytes"]
+    cache._evict_disk()
+    assert sorted(p.name for p in tmp_path.iterdir()) == [key_b]
+
+
+def test_amg_entry_does_not_duplicate_hierarchy(tmp_path):
+    A = _system()
+    options = {"max_levels": 4, "max_coarse": 10}
+    cache = SetupCache(directory=tmp_path)
+    pre = cache.preconditioner(A, kind="amg", hierarchy_options=options)
+    assert pre.hierarchy is cache.hierarchy(A, **options)
+    key = matrix_fingerprint(A, kind="amg", hierarchy=options)
+    with open(tmp_path / key / "meta.json") as fh:
+        assert sorted(json.load(fh)["arrays"]) == ["coarse_pinv", "hierarchy_key"]
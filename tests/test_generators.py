@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from amgmc.generators import GENERATORS, make_chain, birth_death_chain, pagerank_chain
+from amgmc.markov import is_stochastic_irreducible, stationary_distribution_power
+
+
+@pytest.mark.parametrize("family", sorted(GENERATORS))
+def test_generated_chains_are_stochastic_and_irreducible(family):
+    P = make_chain(family, 400)
+    assert P.shape[0] >= 300
+    assert np.allclose(np.asarray(P.sum(axis=1)).ravel(), 1.0)
+    assert is_stochastic_irreducible(P)
+
+
+def test_birth_death_stationary_is_geometric():
+    P = birth_death_chain(30, birth=0.3, death=0.6)
+    pi = stationary_distribution_power(P, tol=1e-14)
+    assert np.allclose(pi[1:] / pi[:-1], 0.5)
+
+
+def test_pagerank_hub_matches_teleportation():
+    n, alpha = 200, 0.85
+    P = pagerank_chain(n, alpha=alpha, seed=3)
+    dense = P.toarray()[:n, :n] / alpha
+    dangling = dense.sum(axis=1) == 0
+    dense[dangling] = 1.0 / n
+    G = alpha * dense + (1 - alpha) / n
+    G[dangling] = 1.0 / n
+    pi = stationary_distribution_power(P, tol=1e-14)[:n]
+    expected = stationary_distribution_power(sp.csr_matrix(G), tol=1e-14)
+    assert np.allclose(pi / pi.sum(), expected, atol=1e-10)
+
+
+def test_unknown_family():
+    with pytest.raises(ValueError):
+        make_chain("toro", 10)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from amgmc.markov import build_singular_system
+from amgmc.generators import pagerank_chain, tandem_queue_chain
+from amgmc.hierarchy import MAX_COARSENING_RATIO, build_amg_hierarchy, strength_of_connection
+from amgmc.preconditioner import AMGPreconditioner
+from amgmc.solvers import solve_singular_system_lgmres
+
+
+def _grid_chain(k):
+    n = k * k
+    i = np.arange(n)
+    x, y = i % k, i // k
+    rows, cols = [], []
+    for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+        ok = (x + dx >= 0) & (x + dx < k) & (y + dy >= 0) & (y + dy < k)
+        rows.append(i[ok])
+        cols.append((i + dx + dy * k)[ok])
+    r, c = np.concatenate(rows), np.concatenate(cols)
+    P = sp.csr_matrix((np.ones(r.size), (r, c)), shape=(n, n))
+    return sp.diags(1.0 / np.asarray(P.sum(axis=1)).ravel()) @ P
+
+
+def test_strength_of_connection_is_symmetric_without_diagonal():
+    A = build_singular_system(_grid_chain(6).tocsr())
+    S = strength_of_connection(A, theta=0.25)
+    assert S.diagonal().sum() == 0
+    assert (S - S.T).nnz == 0
+
+
+@pytest.mark.parametrize("method", ["greedy", "mis"])
+@pytest.mark.parametrize("max_agg_size", [4, 8])
+def test_aggregation_hierarchy_is_bounded_and_preserves_nullspace(method, max_agg_size):
+    A = build_singular_system(_grid_chain(20).tocsr())
+    hierarchy = build_amg_hierarchy(A, max_levels=10, max_coarse=10, method=method,
+                                    max_agg_size=max_agg_size)
+    sizes = [level.A.shape[0] for level in hierarchy.levels]
+    assert all(a > b for a, b in zip(sizes, sizes[1:]))
+    assert hierarchy.operator_complexity() < 2.0
+    for level in hierarchy.levels[1:]:
+        # Los estados sueltos pueden anexarse a un agregado lleno (hasta el doble)
+        assert np.bincount(level.aggregates).max() <= 2 * max_agg_size
+        # El prolongador 0/1 mantiene A_c 1 = 0
+        assert np.allclose(level.A @ np.ones(level.A.shape[0]), 0.0)
+
+
+def test_unknown_method_raises():
+    A = build_singular_system(_grid_chain(4).tocsr())
+    with pytest.raises(ValueError):
+        build_amg_hierarchy(A, method="bogus")
+
+
+@pytest.mark.parametrize("method", ["greedy", "mis"])
+@pytest.mark.parametrize("family", ["tandem_queue", "pagerank"])
+def test_coarsening_does_not_stall(family, method):
+    P = tandem_queue_chain(99) if family == "tandem_queue" else pagerank_chain(10000)
+    A = build_singular_system(P).tocsr()
+    hierarchy = build_amg_hierarchy(A, max_levels=10, max_coarse=50, method=method)
+    sizes = [level.A.shape[0] for level in hierarchy.levels]
+    assert all(b <= MAX_COARSENING_RATIO * a for a, b in zip(sizes, sizes[1:]))
+    # En el nivel fino casi no quedan agregados de un solo estado
+    assert (np.bincount(hierarchy.levels[1].aggregates) == 1).mean() < 0.05
+
+    M = AMGPreconditioner(hierarchy)
+    assert sizes[-1] <= M.max_coarse_direct
+    b = A @ np.random.default_rng(0).random(A.shape[0])
+    x, info = solve_singular_system_lgmres(A, b, M=M.as_linear_operator(), tol=1e-8, maxit=100)
+    assert info["converged"]
+    assert np.linalg.norm(A @ x - b) <= 1e-8
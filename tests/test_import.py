@@ -0,0 +1,23 @@
+import json
+import subprocess
+import sys
+import pytest
+import amgmc
+
+_PROBE = "import json, sys, amgmc; print(json.dumps(sorted(sys.modules)))"
+
+
+def test_import_is_lazy():
+    out = subprocess.run([sys.executable, "-c", _PROBE], capture_output=True, text=True,
+                         check=True)
+    heavy = {"scipy", "scipy.sparse", "scipy.sparse.linalg", "numba", "numpy", "amgmc.markov"}
+    assert heavy.isdisjoint(json.loads(out.stdout))
+    assert out.stderr == ""
+
+
+def test_lazy_attributes_resolve():
+    from amgmc.solvers import solve_singular_system_lgmres
+    assert amgmc.solve_singular_system_lgmres is solve_singular_system_lgmres
+    assert "Collector" in dir(amgmc)
+    with pytest.raises(AttributeError):
+        amgmc.not_a_name
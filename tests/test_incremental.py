@@ -0,0 +1,63 @@
+import numpy as np
+import scipy.sparse as sp
+from amgmc.markov import build_transition_matrix, replace_csr_rows, stationary_distribution_power
+from amgmc.incremental import IncrementalChain
+
+
+def _random_chain(n=60, density=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    P_dense = rng.random((n, n)) * (rng.random((n, n)) < density)
+    P_dense += np.eye(n, k=1) + np.eye(n, k=-(n - 1))  # ciclo para irreducibilidad
+    return build_transition_matrix(P_dense)
+
+
+def test_replace_csr_rows_same_and_new_pattern():
+    A = sp.random(20, 20, density=0.2, format="csr", random_state=1)
+    reference = A.toarray()
+    rows = np.array([3, 7])
+    same = A[rows].copy()
+    same.data *= 2.0
+    delta = replace_csr_rows(A, rows, same)
+    reference[rows] *= 2.0
+    assert np.allclose(A.toarray(), reference)
+    assert np.allclose(delta.toarray(), reference[rows] / 2.0)
+
+    new = sp.csr_matrix(np.eye(20)[[0, 19]])
+    replace_csr_rows(A, rows, new)
+    reference[rows] = np.eye(20)[[0, 19]]
+    assert np.allclose(A.toarray(), reference)
+
+
+def test_stationary_warm_start_uses_fewer_iterations():
+    P = _random_chain()
+    pi = stationary_distribution_power(P, tol=1e-12)
+    _, cold = stationary_distribution_power(P, tol=1e-12, return_info=True)
+    _, warm = stationary_distribution_power(P, tol=1e-12, return_info=True, x0=pi)
+    assert warm["iterations"] < cold["iterations"]
+
+
+def test_incremental_chain_update_matches_rebuild():
+    P = _random_chain()
+    chain = IncrementalChain(P, tol=1e-11)
+    rng = np.random.default_rng(5)
+    rows = np.array([4, 30])
+    new_rows = rng.random((2, P.shape[0])) * (rng.random((2, P.shape[0])) < 0.2)
+    new_rows[:, 0] += 1.0
+    new_rows /= new_rows.sum(axis=1, keepdims=True)
+
+    info = chain.update_rows(rows, new_rows)
+    expected = P.toarray()
+    expected[rows] = new_rows
+    assert np.allclose(chain.P.toarray(), expected)
+    assert info["residual"] < 1e-11
+
+    pi = stationary_distribution_power(sp.csr_matrix(expected), tol=1e-14)
+    assert np.abs(chain.pi - pi).sum() < 1e-9
+
+    # Los operadores gruesos coinciden con el producto de Galerkin recalculado
+    A = sp.identity(P.shape[0]) - sp.csr_matrix(expected)
+    for level in chain.hierarchy.levels[1:]:
+        A = level.R_op @ A @ level.P_op
+        assert np.allclose(level.A.toarray(), A.toarray())
+    x, solve_info = chain.solve(np.zeros(P.shape[0]))
+    assert solve_info["converged"]
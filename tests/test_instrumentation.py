@@ -0,0 +1,58 @@
+import json
+import numpy as np
+import scipy.sparse as sp
+from amgmc.instrumentation import Collector
+from amgmc.generators import grid_random_walk
+from amgmc.markov import build_singular_system, stationary_distribution_power
+from amgmc.hierarchy import build_amg_hierarchy
+from amgmc.preconditioner import AMGPreconditioner
+from amgmc.solvers import solve_singular_system_lgmres, solve_singular_system_block
+
+
+def _system(m=20):
+    P = grid_random_walk((m, m), laziness=0.1)
+    A = build_singular_system(P).tocsr()
+    b = A @ np.random.default_rng(0).random(A.shape[0])
+    return P, A, b
+
+
+def test_collector_records_pipeline():
+    P, A, b = _system()
+    seen = []
+    collector = Collector(callbacks=[lambda stage, it, res: seen.append((stage, it))])
+
+    hierarchy = build_amg_hierarchy(A, max_levels=5, max_coarse=20, collector=collector)
+    with collector.stage("preconditioner"):
+        M = AMGPreconditioner(hierarchy).as_linear_operator()
+    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, collector=collector)
+    solve_matvecs = collector.counters["matvec"]
+    _, stationary = stationary_distribution_power(P, tol=1e-8, method="anderson",
+                                                  collector=collector, return_info=True)
+    stationary_distribution_power(P, tol=1e-8, method="gauss_seidel", collector=collector)
+
+    assert info["converged"]
+    assert {"hierarchy", "preconditioner", "solve", "stationary"} <= set(collector.timers)
+    assert collector.counters["matvec"] > 0
+    assert collector.counters["precond"] > 0
+    # Los productos con P^T y los barridos no se suman a los del solver
+    assert collector.counters["matvec"] == solve_matvecs
+    assert collector.counters["stationary.matvec"] == stationary["iterations"]
+    assert collector.counters["stationary.sweep"] > 0
+    assert len(collector.residuals["solve"]) > 0
+    assert seen and seen[0] == ("solve", 1)
+
+    levels = [r for r in collector.records if r["kind"] == "hierarchy"][0]
+    assert levels["levels"][0]["size"] == A.shape[0]
+    assert levels["operator_complexity"] == hierarchy.operator_complexity()
+    records = json.loads(collector.to_json())
+    assert any(r["kind"] == "counter" and r["name"] == "precond" for r in records)
+
+
+def test_block_solver_counts_columns():
+    _, A, b = _system(8)
+    B = np.column_stack([b, 2 * b, 3 * b])
+    collector = Collector()
+    X, info = solve_singular_system_block(A, B, tol=1e-8, collector=collector)
+    assert np.all(info["converged"])
+    assert collector.counters["matvec"] >= 3 * info["iterations"]
+    assert collector.residuals["solve_block"][-1] <= 1e-8
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from amgmc.kernels import NUMBA_AVAILABLE, TransposeMatvec, galerkin_aggregate, use_numba
+from amgmc.generators import graph_random_walk
+from amgmc.markov import build_singular_system, stationary_distribution_power
+from amgmc.hierarchy import build_amg_hierarchy, greedy_aggregation, strength_of_connection, aggregation_operators
+from amgmc.smoothers import JacobiSmoother, SORSmoother
+
+BACKENDS = ["scipy", "numba"]
+
+
+def _system(n=300):
+    P = graph_random_walk(n, avg_degree=5, seed=2)
+    return P, build_singular_system(P).tocsr()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_transpose_matvec_matches_explicit_transpose(backend):
+    P, _ = _system()
+    x = np.random.default_rng(0).random(P.shape[0])
+    assert np.allclose(TransposeMatvec(P, backend=backend)(x), P.T.tocsr() @ x)
+
+
+def test_transpose_matvec_column_blocks():
+    # Fuerza varios bloques de columnas aunque la máquina tenga un solo hilo
+    P, _ = _system()
+    x = np.random.default_rng(0).random(P.shape[0])
+    op = TransposeMatvec(P, backend="numba")
+    if op.compiled:
+        op._bounds = np.array([0, 40, 41, 200, P.shape[0]], dtype=np.int64)
+    assert np.allclose(op(x), P.T.tocsr() @ x)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_galerkin_aggregate_matches_triple_product(backend):
+    _, A = _system()
+    aggregates, m = greedy_aggregation(strength_of_connection(A))
+    P_op, R_op = aggregation_operators(aggregates, m)
+    A_c = galerkin_aggregate(A, aggregates, m, backend=backend)
+    assert np.allclose(A_c.toarray(), (R_op @ A @ P_op).toarray())
+
+
+@pytest.mark.parametrize("smoother, options", [
+    (JacobiSmoother, {"omega": 0.7}),
+    (SORSmoother, {"omega": 1.3, "sweep": "symmetric"}),
+])
+def test_compiled_smoothers_match_scipy(smoother, options):
+    _, A = _system()
+    rng = np.random.default_rng(1)
+    b, x0 = rng.random(A.shape[0]), rng.random(A.shape[0])
+    expected = smoother(A, backend="scipy", **options)(x0.copy(), b, 3)
+    result = smoother(A, backend="numba", **options)(x0.copy(), b, 3)
+    assert np.allclose(result, expected)
+
+
+@pytest.mark.parametrize("method", ["power", "anderson", "gauss_seidel"])
+def test_stationary_backends_agree(method):
+    P, _ = _system()
+    expected = stationary_distribution_power(P, tol=1e-13, method=method)
+    result = stationary_distribution_power(P, tol=1e-13, method=method, backend="numba")
+    assert np.abs(result - expected).sum() < 1e-10
+
+
+def test_hierarchy_backend_and_unknown_backend():
+    _, A = _system()
+    h_scipy = build_amg_hierarchy(A, max_levels=4, max_coarse=10)
+    h_numba = build_amg_hierarchy(A, max_levels=4, max_coarse=10, backend="numba")
+    for a, b in zip(h_scipy.levels, h_numba.levels):
+        assert np.allclose(a.A.toarray(), b.A.toarray())
+    with pytest.raises(ValueError):
+        use_numba("cuda")
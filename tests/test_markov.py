@@ -1,5 +1,8 @@
 import numpy as np
-from amgmc.markov import build_transition_matrix, stationary_distribution_power
+import pytest
+from amgmc.markov import (build_transition_matrix, chain_structure, is_stochastic_irreducible,
+                          stationary_distribution_power)
+from amgmc.iad import stationary_distribution_iad
 
 def test_stationary_distribution_power_basic():
     P_dense = np.array([[0.5, 0.5],[0.5, 0.5]])
@@ -7,3 +10,99 @@ def test_stationary_distribution_power_basic():
     pi = stationary_distribution_power(P, maxit=1000, tol=1e-14)
     assert np.isclose(pi.sum(), 1.0)
     assert np.all(pi >= 0)
+
+
+def _ncd_chain(n_blocks=6, block_size=12, eps=1e-5, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_blocks * block_size
+    P_dense = np.zeros((n, n))
+    for k in range(n_blocks):
+        s = slice(k * block_size, (k + 1) * block_size)
+        P_dense[s, s] = rng.random((block_size, block_size)) + 0.01
+    P_dense += eps * rng.random((n, n))
+    return build_transition_matrix(P_dense)
+
+
+def _exact_stationary(P):
+    n = P.shape[0]
+    M = np.eye(n) - P.toarray().T
+    M[-1, :] = 1.0
+    rhs = np.zeros(n)
+    rhs[-1] = 1.0
+    return np.linalg.solve(M, rhs)
+
+
+def test_stationary_distribution_power_reports_iterations():
+    P = build_transition_matrix(np.array([[0.9, 0.1], [0.2, 0.8]]))
+    pi, info = stationary_distribution_power(P, tol=1e-14, return_info=True)
+    assert info["converged"]
+    assert info["iterations"] > 1
+    assert np.allclose(pi, [2.0 / 3.0, 1.0 / 3.0])
+
+
+@pytest.mark.parametrize("blocks", ["auto", "given", "amg"])
+def test_stationary_distribution_iad_ncd_chain(blocks):
+    from amgmc.generators import ncd_chain
+    from amgmc.iad import ncd_blocks
+    P = ncd_chain(50, 100, eps=1e-4)
+    labels, m = ncd_blocks(P)
+    assert m == 50 and np.array_equal(labels[::100], np.unique(labels))
+    options = {"auto": {}, "given": {"blocks": np.arange(5000) // 100},
+               "amg": {"epsilon": None}}[blocks]
+    pi, info = stationary_distribution_iad(P, tol=1e-12, maxit=50, return_info=True, **options)
+    assert info["converged"]
+    assert info["iterations"] <= 20
+    expected = stationary_distribution_power(P, method="eigs", tol=1e-14)
+    assert np.abs(pi - expected).sum() < 1e-9
+
+
+def test_is_stochastic_irreducible_diagnostics():
+    P = build_transition_matrix(np.array([[0.5, 0.5], [0.5, 0.5]]))
+    assert is_stochastic_irreducible(P) is True
+
+    # 0 -> {1, 2}; {1, 2} cerrada; 3 absorbente; 4 transitorio hacia 0 y 3
+    P_dense = np.array([
+        [0.0, 0.5, 0.5, 0.0, 0.0],
+        [0.0, 0.0, 1.0, 0.0, 0.0],
+        [0.0, 1.0, 0.0, 0.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0, 0.0],
+        [0.5, 0.0, 0.0, 0.5, 0.0],
+    ])
+    P = build_transition_matrix(P_dense)
+    assert is_stochastic_irreducible(P) is False
+    report = chain_structure(P)
+    assert not report
+    assert report.stochastic and not report.irreducible
+    assert report.n_components == 4
+    assert sorted(sorted(c.tolist()) for c in report.closed_classes) == [[1, 2], [3]]
+    assert report.transient_states.tolist() == [0, 4]
+
+
+def test_is_stochastic_irreducible_rejects_substochastic():
+    P = build_transition_matrix(np.array([[0.5, 0.5], [0.5, 0.5]])) * 0.9
+    assert not is_stochastic_irreducible(P)
+
+
+@pytest.mark.parametrize("method", ["power", "anderson", "gauss_seidel", "sor", "eigs"])
+def test_stationary_distribution_methods(method):
+    P = _ncd_chain(eps=1e-3)
+    pi, info = stationary_distribution_power(P, maxit=20000, tol=1e-12, method=method, return_info=True)
+    assert info["converged"]
+    assert info["method"] == method
+    assert len(info["residual_history"]) >= 1 and info["time"] >= 0.0
+    assert np.abs(pi - _exact_stationary(P)).sum() < 1e-8
+
+
+def test_eigs_handles_tiny_chains():
+    # ARPACK no admite n <= 2; "eigs" pasa a la descomposición densa
+    P = build_transition_matrix(np.array([[0.9, 0.1], [0.3, 0.7]]))
+    pi, info = stationary_distribution_power(P, method="eigs", return_info=True)
+    assert info["converged"]
+    assert np.allclose(pi, [0.75, 0.25])
+
+
+def test_accelerated_methods_need_fewer_iterations():
+    P = _ncd_chain(eps=1e-3)
+    _, plain = stationary_distribution_power(P, maxit=20000, return_info=True)
+    _, anderson = stationary_distribution_power(P, maxit=20000, method="anderson", return_info=True)
+    assert anderson["iterations"] < plain["iterations"] / 10
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from amgmc.generators import graph_random_walk
+from amgmc.markov import build_singular_system, stationary_distribution_power
+from amgmc.outofcore import MemmapCSR, open_memmap_csr, save_memmap_csr, write_memmap_csr
+from amgmc.solvers import solve_singular_system_lgmres
+
+
+def test_memmap_csr_products_match_in_memory(tmp_path):
+    P = graph_random_walk(300, seed=1)
+    save_memmap_csr(P, tmp_path / "P", block_rows=64)
+    M = open_memmap_csr(tmp_path / "P", block_nnz=500)
+    assert isinstance(M, MemmapCSR)
+    assert M.shape == P.shape and M.nnz == P.nnz
+    assert len(list(M.row_blocks())) > 1
+    x = np.random.default_rng(0).random(300)
+    assert np.allclose(M @ x, P @ x)
+    assert np.allclose(M.T @ x, P.T @ x)
+    X = np.random.default_rng(1).random((300, 3))
+    assert np.allclose(M.matmat(X), P @ X)
+    assert (M.tocsr() != P).nnz == 0
+
+
+def test_write_memmap_csr_streams_row_blocks(tmp_path):
+    P = graph_random_walk(100, seed=2)
+    M = write_memmap_csr(tmp_path / "P", (P[i:i + 7] for i in range(0, 100, 7)), 100)
+    assert (M.tocsr() != P).nnz == 0
+
+
+def test_stationary_and_lgmres_accept_memmap(tmp_path):
+    P = graph_random_walk(400, seed=3)
+    M = open_memmap_csr(save_memmap_csr(P, tmp_path / "P").path, block_nnz=1000)
+    pi_ref = stationary_distribution_power(P, tol=1e-13)
+    for method in ("power", "anderson"):
+        pi = stationary_distribution_power(M, tol=1e-13, method=method)
+        assert np.allclose(pi, pi_ref, atol=1e-10)
+    with pytest.raises(ValueError):
+        stationary_distribution_power(M, method="sor")
+
+    A = build_singular_system(M)
+    b = build_singular_system(P) @ np.random.default_rng(4).random(400)
+    x, info = solve_singular_system_lgmres(A, b, tol=1e-10)
+    assert info["converged"]
+    assert np.linalg.norm(A @ x - b) <= 1e-9
@@ -0,0 +1,27 @@
+import numpy as np
+import scipy.sparse as sp
+from amgmc.markov import build_transition_matrix, build_singular_system
+from amgmc.parallel import solve_many
+
+
+def _chains(count, n=30):
+    rng = np.random.default_rng(0)
+    for k in range(count):
+        P_dense = rng.random((n, n))
+        A = build_singular_system(build_transition_matrix(P_dense.copy()))
+        b = A @ rng.random(n)
+        # Alternar entrada densa y sparse ya normalizada
+        yield (P_dense if k % 2 == 0 else build_transition_matrix(P_dense.copy())), b
+
+
+def test_solve_many_streams_all_results():
+    expected = list(_chains(6))
+    results = list(solve_many(_chains(6), workers=2, max_pending=3))
+    assert sorted(index for index, _, _ in results) == list(range(6))
+    for index, x, info in results:
+        P, b = expected[index]
+        if not sp.issparse(P):
+            P = build_transition_matrix(P.copy())
+        A = build_singular_system(P)
+        assert info["converged"]
+        assert np.linalg.norm(A @ x - b) < 1e-8
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from amgmc.generators import graph_random_walk
+from amgmc.hierarchy import build_amg_hierarchy
+from amgmc.markov import build_singular_system, replace_csr_rows, stationary_distribution_power
+from amgmc.partitioned import PartitionedOperator, nnz_balanced_bounds, partitioned
+from amgmc.preconditioner import AMGPreconditioner
+from amgmc.solvers import solve_singular_system_lgmres, solve_singular_system_block
+
+
+def test_nnz_balanced_bounds_cover_rows():
+    P = graph_random_walk(500, seed=0)
+    bounds = nnz_balanced_bounds(P.indptr, 4)
+    assert bounds[0] == 0 and bounds[-1] == 500
+    block_nnz = np.diff(P.indptr[bounds])
+    assert block_nnz.max() <= 1.2 * P.nnz / 4
+
+
+def test_partitioned_operator_matches_csr_products():
+    P = graph_random_walk(400, seed=1)
+    op = PartitionedOperator(P, threads=3, blocks=5)
+    rng = np.random.default_rng(0)
+    x = rng.random(400)
+    X = rng.random((400, 4))
+    assert np.allclose(op @ x, P @ x)
+    assert np.allclose(op.matmat(X), P @ X)
+    assert np.allclose(op.T @ x, P.T @ x)
+    out = np.empty(400)
+    assert op.matvec_into(x, out) is out
+    # Las modificaciones in-place de A se ven sin reconstruir el operador
+    replace_csr_rows(P, [0, 7], np.eye(400)[[3, 3]])
+    assert np.allclose(op @ x, P @ x)
+    assert partitioned(P, None) is P
+
+
+def test_threaded_power_krylov_and_amg_match_serial():
+    P = graph_random_walk(600, seed=2)
+    pi_ref = stationary_distribution_power(P, tol=1e-13)
+    for method in ("power", "anderson"):
+        pi = stationary_distribution_power(P, tol=1e-13, method=method, threads=3)
+        assert np.allclose(pi, pi_ref, atol=1e-10)
+
+    A = build_singular_system(P)
+    b = A @ np.random.default_rng(3).random(600)
+    hierarchy = build_amg_hierarchy(A, max_levels=10, max_coarse=50)
+    serial = AMGPreconditioner(hierarchy)
+    threaded = AMGPreconditioner(hierarchy, threads=3)
+    assert np.allclose(serial.apply(b), threaded.apply(b))
+
+    M = threaded.as_linear_operator()
+    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, threads=3)
+    assert info["converged"]
+    assert np.linalg.norm(A @ x - b) <= 1e-9
+    X, info = solve_singular_system_block(A, np.column_stack([b, 2 * b]), M=M, tol=1e-10,
+                                          threads=3)
+    assert np.all(info["converged"])
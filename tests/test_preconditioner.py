@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import scipy.sparse.linalg as spla
+from amgmc.generators import grid_random_walk
+from amgmc.instrumentation import Collector
+from amgmc.markov import build_transition_matrix, build_singular_system
+from amgmc.hierarchy import build_amg_hierarchy
+from amgmc.preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+from amgmc.solvers import solve_singular_system_lgmres, residual_norm
+
+
+def _birth_death_system(n=60):
+    P_dense = np.zeros((n, n))
+    idx = np.arange(n)
+    np.add.at(P_dense, (idx, np.maximum(idx - 1, 0)), 0.4)
+    np.add.at(P_dense, (idx, np.minimum(idx + 1, n - 1)), 0.5)
+    P_dense[idx, idx] += 0.1
+    return build_singular_system(build_transition_matrix(P_dense))
+
+
+@pytest.mark.parametrize("cycle", ["V", "W", "F"])
+@pytest.mark.parametrize("smoother", ["jacobi", "gauss_seidel", "sor"])
+def test_amg_preconditioner_lgmres_converges(cycle, smoother):
+    A = _birth_death_system()
+    y = np.random.default_rng(0).random(A.shape[0])
+    b = A @ y
+    hierarchy = build_amg_hierarchy(A, max_levels=10, max_coarse=8)
+    M = AMGPreconditioner(hierarchy, cycle=cycle, smoother=smoother).as_linear_operator()
+    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, maxit=500)
+    assert info["converged"]
+    assert residual_norm(A, x, b) < 1e-9
+
+
+def test_amg_preconditioner_rejects_large_coarse_level():
+    A = _birth_death_system()
+    hierarchy = build_amg_hierarchy(A, max_levels=1)
+    with pytest.raises(ValueError):
+        AMGPreconditioner(hierarchy, max_coarse_direct=10)
+
+
+@pytest.mark.parametrize("base", ["jacobi", "ilu"])
+def test_truncated_svd_preconditioner(base):
+    A = _birth_death_system(200)
+    pre = SVDBasedPreconditioner(A, k=6, mode="truncated", base=base)
+    assert pre._A_pinv is None
+    assert pre._U.shape == (200, 6) and pre._V.shape == (200, 6)
+
+    # Exacta sobre el subespacio deflactado: M^{-1} (A v) = v
+    M = pre.as_linear_operator()
+    keep = pre._s_inv > 0
+    for v in pre._V[:, keep].T:
+        assert np.allclose(M @ (A @ v), v, atol=1e-8)
+
+    b = A @ np.random.default_rng(1).random(A.shape[0])
+    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, maxit=500)
+    assert info["converged"]
+    assert residual_norm(A, x, b) < 1e-9
+
+
+def test_truncated_svd_deflation_beats_its_base():
+    A = build_singular_system(grid_random_walk((50, 50), laziness=0.1)).tocsr()
+    b = A @ np.random.default_rng(2).random(A.shape[0])
+    pre = SVDBasedPreconditioner(A, k=16, mode="truncated", base="jacobi")
+    base = spla.LinearOperator(A.shape, matvec=pre._base_solve)
+
+    counts = []
+    for M in (base, pre.as_linear_operator()):
+        collector = Collector()
+        _, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, maxit=500,
+                                               collector=collector)
+        assert info["converged"]
+        counts.append(collector.counters["matvec"])
+    # Los modos lentos deflactados ahorran buena parte de las iteraciones
+    assert counts[1] < 0.6 * counts[0]
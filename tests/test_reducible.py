@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from amgmc.generators import birth_death_chain
+from amgmc.reducible import limiting_distributions
+
+
+def _gambler_chain():
+    # 0, 1, 2 transitorios (1 <-> 2 forman una SCC), {3, 4} periódica, {5} absorbente
+    P = np.zeros((6, 6))
+    P[0, [0, 1, 5]] = [0.2, 0.5, 0.3]
+    P[1, [2, 3]] = [0.6, 0.4]
+    P[2, [1, 5]] = [0.7, 0.3]
+    P[3, 4] = P[4, 3] = 1.0
+    P[5, 5] = 1.0
+    return P
+
+
+def test_absorption_and_class_distributions_match_dense():
+    P = _gambler_chain()
+    result = limiting_distributions(sp.csr_matrix(P), workers=2)
+    assert len(result.classes) == 2
+    T = [0, 1, 2]
+    N = np.linalg.inv(np.eye(3) - P[np.ix_(T, T)])
+    for c, states in enumerate(result.classes):
+        expected = N @ P[np.ix_(T, states)].sum(axis=1)
+        assert np.allclose(result.absorption[T, c], expected)
+        assert np.allclose(result.absorption[states, c], 1.0)
+    assert np.allclose(result.absorption.sum(axis=1), 1.0)
+    periodic = [c for c, s in enumerate(result.classes) if s.size == 2][0]
+    assert np.allclose(result.stationary[periodic], [0.5, 0.5])
+
+
+def test_limit_matches_cesaro_average():
+    P = _gambler_chain()
+    result = limiting_distributions(sp.csr_matrix(P))
+    x0 = np.array([1.0, 0, 0, 0, 0, 0])
+    x, avg = x0.copy(), np.zeros(6)
+    steps = 4000
+    for _ in range(steps):
+        x = x @ P
+        avg += x / steps
+    assert np.allclose(result.limit(x0), avg, atol=1e-2)
+
+
+def test_gamblers_ruin_absorption_is_monotone():
+    # Cadena de nacimiento y muerte con ambos extremos absorbentes (ruina del jugador)
+    P = birth_death_chain(300).tolil()
+    P[0, :] = 0
+    P[0, 0] = 1.0
+    P[299, :] = 0
+    P[299, 299] = 1.0
+    result = limiting_distributions(P.tocsr())
+    assert len(result.classes) == 2
+    assert np.allclose(result.absorption.sum(axis=1), 1.0)
+    upper = [c for c, s in enumerate(result.classes) if s[0] == 299][0]
+    assert np.all(np.diff(result.absorption[:, upper]) >= -1e-12)
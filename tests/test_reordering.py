@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from amgmc.generators import grid_random_walk
+from amgmc.markov import stationary_distribution_power
+from amgmc.reordering import ReorderedChain, Reordering, bandwidth, compute_ordering
+
+
+def _shuffled_grid(seed=0):
+    P = grid_random_walk((30, 30), laziness=0.1)
+    shuffle = Reordering(np.random.default_rng(seed).permutation(P.shape[0]))
+    return shuffle.apply(P)
+
+
+@pytest.mark.parametrize("method", ["rcm", "bfs", "scc"])
+def test_ordering_is_a_permutation_and_apply_matches_indexing(method):
+    P = _shuffled_grid()
+    perm = compute_ordering(P, method)
+    assert np.array_equal(np.sort(perm), np.arange(P.shape[0]))
+    P_perm = Reordering(perm).apply(P)
+    assert abs(P_perm - P[perm][:, perm]).max() == 0
+
+
+def test_rcm_reduces_bandwidth():
+    P = _shuffled_grid()
+    P_perm = Reordering(compute_ordering(P, "rcm")).apply(P)
+    assert bandwidth(P_perm) < bandwidth(P) / 5
+
+
+def test_scc_ordering_is_block_upper_triangular():
+    # 0 -> 1 <-> 2 (clase cerrada) y 3 -> 0 transitorio
+    P = sp.csr_matrix(np.array([
+        [0.5, 0.5, 0.0, 0.0],
+        [0.0, 0.0, 1.0, 0.0],
+        [0.0, 1.0, 0.0, 0.0],
+        [0.5, 0.0, 0.0, 0.5],
+    ]))
+    P_perm = Reordering(compute_ordering(P, "scc")).apply(P).toarray()
+    assert np.allclose(np.tril(P_perm, -1)[np.tril(P_perm, -1) > 0], 1.0)  # solo la clase 1<->2
+    assert np.count_nonzero(np.tril(P_perm, -1)) == 1
+
+
+def test_reordered_chain_maps_results_back():
+    P = _shuffled_grid(seed=1)
+    chain = ReorderedChain.from_matrix(P, "rcm")
+    pi, info = chain.stationary_distribution(tol=1e-13, return_info=True)
+    assert info["converged"]
+    assert np.allclose(pi, stationary_distribution_power(P, tol=1e-13), atol=1e-10)
+
+    A = (sp.identity(P.shape[0]) - P).tocsr()
+    b = A @ np.random.default_rng(2).random(P.shape[0])
+    x, info = chain.solve(b, tol=1e-10)
+    assert info["converged"]
+    assert np.linalg.norm(A @ x - b) <= 1e-9
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from amgmc.generators import birth_death_chain, graph_random_walk
+from amgmc.markov import stationary_distribution_power
+from amgmc.metrics import l1_error
+from amgmc.sampling import TrajectorySampler, _build_alias
+
+
+def test_alias_tables_reproduce_row_probabilities():
+    P = graph_random_walk(50, seed=0)
+    prob = np.empty(P.nnz)
+    alias = np.empty(P.nnz, dtype=np.int64)
+    _build_alias(P.indptr, P.data, prob, alias)
+    for i in range(50):
+        start, stop = P.indptr[i], P.indptr[i + 1]
+        deg = stop - start
+        # P(k) = (prob[k] + sum de (1 - prob[j]) con alias[j] = k) / deg
+        mass = prob[start:stop].copy()
+        np.add.at(mass, alias[start:stop] - start, 1.0 - prob[start:stop])
+        assert np.allclose(mass / deg, P.data[start:stop])
+
+
+@pytest.mark.parametrize("method,backend", [("alias", "scipy"), ("cdf", "scipy"),
+                                            ("alias", "numba")])
+def test_empirical_distribution_matches_stationary(method, backend):
+    P = birth_death_chain(20)
+    pi = stationary_distribution_power(P, tol=1e-14)
+    sampler = TrajectorySampler(P, method=method, backend=backend, seed=1)
+    empirical = sampler.empirical_distribution(5000, steps=600, burn_in=300)
+    assert l1_error(empirical, pi) < 0.03
+
+
+def test_one_step_transition_frequencies():
+    P = graph_random_walk(10, seed=3)
+    sampler = TrajectorySampler(P, method="cdf", seed=0)
+    states = np.zeros(200000, dtype=np.int64)
+    sampler.step(states)
+    freq = np.bincount(states, minlength=10) / states.size
+    assert np.allclose(freq, P[0].toarray().ravel(), atol=5e-3)
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+from amgmc.generators import grid_random_walk
+from amgmc.markov import build_singular_system, stationary_distribution_power
+from amgmc.service import SolveService, start_server
+
+
+def _chain():
+    return grid_random_walk((12, 12), laziness=0.1)
+
+
+def test_concurrent_requests_are_coalesced_and_deduplicated():
+    P = _chain()
+    A = build_singular_system(P)
+    rng = np.random.default_rng(0)
+    B = A @ rng.random((A.shape[0], 6))
+
+    async def main():
+        service = SolveService(batch_window=0.05, preconditioner="amg",
+                               preconditioner_options={"hierarchy_options": {"max_coarse": 20}})
+        key = service.register(P)
+        calls = []
+        original = service._block_solve
+        service._block_solve = lambda state, B: calls.append(B.shape[1]) or original(state, B)
+        requests = [service.solve(key, B[:, j]) for j in range(6)]
+        requests.append(service.solve(key, B[:, 0]))  # Idéntica a una en curso
+        results = await asyncio.gather(*requests)
+        return service, calls, results
+
+    service, calls, results = asyncio.run(main())
+    assert calls == [6]
+    for j, (x, info) in enumerate(results[:6]):
+        assert info["converged"] and info["batch_size"] == 6
+        assert np.linalg.norm(A @ x - B[:, j]) <= 1e-9
+    assert np.array_equal(results[6][0], results[0][0])
+    assert not service._inflight
+
+
+def test_backpressure_limits_admitted_requests():
+    P = _chain()
+    A = build_singular_system(P)
+    B = A @ np.random.default_rng(1).random((A.shape[0], 5))
+
+    async def main():
+        service = SolveService(max_pending=2, batch_window=0.01)
+        key = service.register(P)
+        sizes = []
+        original = service._block_solve
+        service._block_solve = lambda state, B: sizes.append(B.shape[1]) or original(state, B)
+        await asyncio.gather(*(service.solve(key, B[:, j]) for j in range(5)))
+        return sizes
+
+    sizes = asyncio.run(main())
+    assert max(sizes) <= 2 and sum(sizes) == 5
+
+
+def test_failed_setup_is_retried():
+    P = _chain()
+    b = build_singular_system(P) @ np.ones(P.shape[0])
+
+    async def main():
+        service = SolveService()
+        key = service.register(P)
+        original = service._build_preconditioner
+        service._build_preconditioner = lambda A: 1 / 0
+        with pytest.raises(ZeroDivisionError):
+            await service.solve(key, b)
+        service._build_preconditioner = original
+        return await service.solve(key, b)
+
+    x, info = asyncio.run(main())
+    assert info["converged"]
+
+
+def test_socket_protocol_serves_stationary_and_solve():
+    P = _chain()
+    A = build_singular_system(P)
+    b = A @ np.random.default_rng(2).random(A.shape[0])
+
+    async def main():
+        service = SolveService()
+        key = service.register(P)
+        server = await start_server(service)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for i, request in enumerate([{"op": "stationary", "chain": key},
+                                      {"op": "solve", "chain": key, "b": b.tolist()},
+                                      {"op": "nope"}]):
+            writer.write((json.dumps({**request, "id": i}) + "\n").encode())
+        writer.write(b"{no es json\n")
+        await writer.drain()
+        responses = [json.loads(await reader.readline()) for _ in range(4)]
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return {r["id"]: r for r in responses}
+
+    responses = asyncio.run(main())
+    assert np.allclose(responses[0]["pi"], stationary_distribution_power(P), atol=1e-10)
+    assert responses[1]["converged"]
+    assert np.linalg.norm(A @ np.array(responses[1]["x"]) - b) <= 1e-9
+    assert "error" in responses[2]
+    assert "error" in responses[None]
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from amgmc.markov import build_transition_matrix, build_singular_system
+from amgmc.hierarchy import build_amg_hierarchy
+from amgmc.preconditioner import AMGPreconditioner, SVDBasedPreconditioner
+from amgmc.solvers import solve_singular_system_block, solve_singular_system_lgmres, residual_norm
+from amgmc.generators import grid_random_walk, make_chain
+
+
+def _random_system(n=80, seed=0):
+    rng = np.random.default_rng(seed)
+    P_dense = rng.random((n, n)) * (rng.random((n, n)) < 0.1) + np.eye(n) * 0.1
+    P_dense[np.arange(n), (np.arange(n) + 1) % n] += 0.5
+    return build_singular_system(build_transition_matrix(P_dense))
+
+
+@pytest.mark.parametrize("preconditioner", [None, "amg", "svd"])
+def test_block_solver_multiple_rhs(preconditioner):
+    A = _random_system()
+    n = A.shape[0]
+    Y = np.random.default_rng(1).random((n, 12))
+    B = A @ Y
+    M = None
+    if preconditioner == "amg":
+        hierarchy = build_amg_hierarchy(A, max_levels=5, max_coarse=10)
+        M = AMGPreconditioner(hierarchy).as_linear_operator()
+    elif preconditioner == "svd":
+        M = SVDBasedPreconditioner(A, k=4, mode="truncated").as_linear_operator()
+
+    X, info = solve_singular_system_block(A, B, M=M, tol=1e-9, maxit=500)
+    assert X.shape == B.shape
+    assert np.all(info["converged"])
+    assert np.all(info["info"] == 0)
+    assert np.all(np.linalg.norm(B - A @ X, axis=0) <= 1e-9)
+
+
+def test_block_solver_single_rhs_and_zero_column():
+    A = _random_system()
+    b = A @ np.random.default_rng(2).random(A.shape[0])
+    x, info = solve_singular_system_block(A, b, tol=1e-9)
+    assert x.shape == b.shape
+    assert info["converged"].all()
+
+    B = np.column_stack([b, np.zeros_like(b)])
+    X, info = solve_singular_system_block(A, B, tol=1e-9)
+    assert np.allclose(X[:, 1], 0.0)
+    assert info["converged"].all()
+
+
+def test_block_solver_locks_inconsistent_column():
+    A = build_singular_system(make_chain("birth_death", 300, seed=1)).tocsr()
+    rng = np.random.default_rng(0)
+    b = A @ rng.random(A.shape[0])
+    B = np.column_stack([b, rng.random(A.shape[0])])  # La segunda no está en la imagen de A
+    X, info = solve_singular_system_block(A, B, tol=1e-10, maxit=1000)
+    assert info["converged"].tolist() == [True, False]
+    assert np.linalg.norm(A @ X[:, 0] - b) <= 1e-10
+    # El estancamiento de la inconsistente no frena a la otra columna
+    assert info["iterations"] < 1000
+
+
+def test_mixed_precision_refinement_reaches_double_tolerance():
+    A = build_singular_system(grid_random_walk((30, 30), laziness=0.1)).tocsr()
+    b = A @ np.random.default_rng(1).random(A.shape[0])
+    hierarchy = build_amg_hierarchy(A, max_levels=6, max_coarse=50, dtype=np.float32)
+    assert all(level.A.dtype == np.float32 for level in hierarchy.levels)
+    M = AMGPreconditioner(hierarchy).as_linear_operator()
+    assert M.dtype == np.float32
+
+    x, info = solve_singular_system_lgmres(A, b, M=M, tol=1e-10, dtype=np.float32,
+                                           A_low=hierarchy.levels[0].A)
+    assert info["converged"]
+    assert info["refinements"] >= 2
+    assert x.dtype == np.float64
+    assert residual_norm(A, x, b) <= 1e-10
+
+
+def test_deflated_solver_normalizes_and_recycles():
+    from amgmc.instrumentation import Collector
+    from amgmc.markov import stationary_distribution_power
+    from amgmc.solvers import solve_singular_system_deflated
+
+    P = grid_random_walk((20, 20), laziness=0.1)
+    A = build_singular_system(P)
+    pi = stationary_distribution_power(P, tol=1e-14)
+    rng = np.random.default_rng(0)
+    b = A @ rng.random(A.shape[0])
+
+    x, info = solve_singular_system_deflated(A, b, tol=1e-10, constraint=pi)
+    assert info["converged"]
+    assert residual_norm(A, x, b) < 1e-9
+    assert abs(pi @ x) < 1e-12
+
+    # b inconsistente: con el núcleo izquierdo se resuelve su parte consistente
+    x, info = solve_singular_system_deflated(A, b + 0.1, tol=1e-10, left_null=pi)
+    assert info["converged"]
+    assert abs(x.sum()) < 1e-10
+
+    # Lados derechos relacionados: el subespacio reciclado da un buen punto inicial
+    recycle = []
+    counts = []
+    b0 = A @ rng.random(A.shape[0])
+    for _ in range(2):
+        collector = Collector()
+        b = b0 + 1e-3 * (A @ rng.random(A.shape[0]))
+        _, info = solve_singular_system_deflated(A, b, tol=1e-10, recycle=recycle,
+                                                 collector=collector)
+        assert info["converged"]
+        counts.append(collector.counters["matvec"])
+    assert len(recycle) == 2 and counts[1] < counts[0]
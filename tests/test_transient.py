@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from scipy.linalg import expm
+from amgmc.generators import birth_death_chain, graph_random_walk
+from amgmc.markov import stationary_distribution_power
+from amgmc.transient import (
+    hitting_time_distribution,
+    mixing_curve,
+    propagate_continuous,
+    propagate_distributions,
+)
+
+
+@pytest.mark.parametrize("method", ["step", "squaring", "auto"])
+def test_propagation_matches_matrix_powers(method):
+    P = graph_random_walk(80, seed=0)
+    X0 = np.random.default_rng(0).random((5, 80))
+    X0 /= X0.sum(axis=1, keepdims=True)
+    horizons = [0, 1, 3, 10, 37]
+    results = list(propagate_distributions(P, X0, horizons, method=method, fill_limit=100))
+    assert [t for t, _ in results] == horizons
+    D = P.toarray()
+    for t, X in results:
+        assert X.shape == X0.shape
+        assert np.allclose(X, X0 @ np.linalg.matrix_power(D, t))
+
+
+def test_single_distribution_and_mixing_curve():
+    P = birth_death_chain(50)
+    x0 = np.zeros(50)
+    x0[0] = 1.0
+    t, x = next(propagate_distributions(P, x0, [5]))
+    assert x.shape == (50,) and np.isclose(x.sum(), 1.0)
+    pi = stationary_distribution_power(P, tol=1e-14)
+    distances = [d for _, d in mixing_curve(P, x0, [1, 10, 100, 1000], pi)]
+    assert np.all(np.diff(distances) <= 1e-12)
+    assert distances[-1] < 1e-3
+
+
+def test_hitting_time_distribution_is_monotone_cdf():
+    P = birth_death_chain(30)
+    x0 = np.zeros(30)
+    x0[0] = 1.0
+    cdf = [p for _, p in hitting_time_distribution(P, x0, [29], [10, 50, 200, 2000])]
+    assert cdf[0] == 0.0  # No se puede llegar en menos de 29 pasos
+    assert np.all(np.diff(cdf) >= 0) and cdf[-1] <= 1.0 + 1e-12
+
+
+def test_uniformization_matches_expm():
+    rng = np.random.default_rng(1)
+    Q = rng.random((20, 20)) * (rng.random((20, 20)) < 0.3)
+    np.fill_diagonal(Q, 0.0)
+    np.fill_diagonal(Q, -Q.sum(axis=1))
+    x0 = np.full(20, 1.0 / 20)
+    for t, x in propagate_continuous(sp.csr_matrix(Q), x0, [0.5, 2.0, 3.0]):
+        assert np.allclose(x, x0 @ expm(Q * t), atol=1e-10)